@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+import victor.batch as batch
+import victor.document as document
+import victor.svg as svg
+from victor.__main__ import main
+from victor.editor import Editor
+from victor.exceptions import CommandError
+from victor.path import Path
+from victor.path_group import PathGroup
+
+def make_document(offset):
+    root = PathGroup()
+
+    # a bumpy line, which simplifies to its ends
+    xs = np.arange(100.)
+    wave = root.append_path(Path((0, offset)))
+    for x, y in zip(xs[1:], offset + .01 * np.sin(xs[1:])):
+        wave.append((x, y))
+
+    return root
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.inputs = self.path('inputs')
+        self.outputs = self.path('outputs')
+
+        os.makedirs(os.path.join(self.inputs, 'more'))
+
+        for i in range(3):
+            document.save(os.path.join(self.inputs, 'd{}.victor'.format(i)), make_document(i))
+
+        svg.write(os.path.join(self.inputs, 'more', 'e.svg'), make_document(10))
+
+        with open(os.path.join(self.inputs, 'notes.txt'), 'w') as fd:
+            fd.write('not a drawing')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.tempdir.name, *names)
+
+    def test_find_documents(self):
+        found = list(batch.find_documents([ self.inputs ]))
+        names = [ 'd0.victor', 'd1.victor', 'd2.victor', os.path.join('more', 'e.svg') ]
+
+        self.assertEqual(found, [ (os.path.join(self.inputs, name), name) for name in names ])
+
+    def test_simplify(self):
+        editor = Editor()
+        editor.set_document(make_document(0))
+        editor.run_ex_command(':simplify 2')
+
+        wave, = editor.groups.children
+        assert_array_equal(wave.approximate(), [ (0, 0), (99, .01 * np.sin(99)) ])
+
+    def test_processes_give_the_same_results(self):
+        run = lambda output_dir, processes: sorted(
+            (os.path.basename(source), error)
+            for source, output, seconds, error in batch.run_batch(
+                batch.find_documents([ self.inputs ]),
+                output_dir, '.svg', [ ':simplify 2' ], processes=processes, chunksize=2,
+            )
+        )
+
+        self.assertEqual(run(self.path('one'), 1), run(self.path('many'), 2))
+
+        for name in ('d0.svg', 'd1.svg', 'd2.svg', os.path.join('more', 'e.svg')):
+            with open(self.path('one', name)) as one, open(self.path('many', name)) as many:
+                self.assertEqual(one.read(), many.read())
+
+        wave, = svg.read(self.path('many', 'd1.svg')).walk_paths()
+        self.assertEqual(len(wave), 2)
+
+    def test_failures_are_reported(self):
+        bad = self.path('bad.victor')
+        with open(bad, 'w') as fd:
+            fd.write('not a drawing')
+
+        # a malformed attribute fails in the parser, not in the file format
+        broken = self.path('broken.svg')
+        with open(broken, 'w') as fd:
+            fd.write('<svg><polyline stroke="#zzz" points="0,0 1,1"/></svg>')
+
+        results = sorted(batch.run_batch(batch.find_documents([ bad, broken ]), self.outputs, processes=2))
+        (source, output, seconds, error), (broken_source, _, _, broken_error) = results
+
+        self.assertEqual(source, bad)
+        self.assertIn('not a VIctor document', error)
+        self.assertFalse(os.path.exists(output))
+
+        self.assertEqual(broken_source, broken)
+        self.assertIsNotNone(broken_error)
+
+    def test_names_keep_their_directories(self):
+        for directory in ('a', 'b'):
+            os.makedirs(self.path('nested', directory))
+            svg.write(self.path('nested', directory, 'x.svg'), make_document(0))
+
+        results = list(batch.run_batch(batch.find_documents([ self.path('nested') ]), self.outputs))
+
+        self.assertEqual([ output for source, output, seconds, error in results ], [
+            os.path.join(self.outputs, 'a', 'x.svg'), os.path.join(self.outputs, 'b', 'x.svg'),
+        ])
+        self.assertTrue(all(os.path.exists(output) for source, output, seconds, error in results))
+
+    def test_colliding_outputs_are_refused(self):
+        sources = [ os.path.join(self.inputs, 'd0.victor'), self.path('d0.svg') ]
+        svg.write(sources[1], make_document(0))
+
+        with self.assertRaises(CommandError):
+            batch.run_batch(batch.find_documents(sources), self.outputs)
+
+        # written over the document it came from
+        with self.assertRaises(CommandError):
+            batch.run_batch(batch.find_documents([ self.inputs ]), self.inputs, '.victor')
+
+        self.assertFalse(os.path.exists(self.outputs))
+
+    def test_batch_from_the_command_line(self):
+        env = dict(os.environ)
+        env.pop('DISPLAY', None)
+
+        result = subprocess.run(
+            [ sys.executable, '-m', 'victor', 'batch', self.inputs,
+              '-d', self.outputs, '-t', 'png', '-j', '2', '--size', '64' ],
+            env=env, stdout=subprocess.PIPE, universal_newlines=True, check=True,
+        )
+
+        self.assertEqual(sorted(os.listdir(self.outputs)), [ 'd0.png', 'd1.png', 'd2.png', 'more' ])
+        self.assertEqual(os.listdir(os.path.join(self.outputs, 'more')), [ 'e.png' ])
+        self.assertIn('4 documents, 0 failed', result.stdout)
+
+    def test_edit_is_refused_with_a_command(self):
+        for argv in ([ '-e', 'x.victor', 'batch', self.inputs, '-d', self.outputs ],
+                     [ '-e', 'x.victor', 'render', 'x.victor', 'x.png' ]):
+            with self.assertRaises(SystemExit) as raised:
+                main(argv)
+
+            self.assertEqual(raised.exception.code, 2)
+
+        self.assertFalse(os.path.exists(self.outputs))
+
+if __name__ == '__main__':
+    unittest.main()
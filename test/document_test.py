@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+import victor.document as document
+from victor.scene_codec import encode
+from victor.exceptions import DocumentError
+from victor.path import Path
+from victor.path_group import PathGroup
+
+def make_document():
+    root = PathGroup()
+
+    path = root.append_path(Path((0, 0), (255, 0, 0, 255)))
+    for i in range(1, 40):
+        path.append((i, i * i))
+
+    group = root.append_group()
+    group.translate(10, 20)
+    group.scale(2, 2)
+    group.append_path(Path((5, 5))).append((6, 7))
+
+    return root
+
+class DocumentTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, 'drawing.victor')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_round_trip(self):
+        root = make_document()
+        document.save(self.filename, root, { 'a' : (1, 2) })
+
+        loaded, marks = document.load(self.filename)
+        self.assertEqual(marks, { 'a' : (1., 2.) })
+
+        paths, loaded_paths = list(root.walk_paths()), list(loaded.walk_paths())
+        self.assertEqual(len(loaded_paths), 2)
+
+        for a, b in zip(paths, loaded_paths):
+            self.assertEqual(b.color, a.color)
+            assert_array_equal(b.parameters, a.parameters)
+            assert_array_equal(b.approximate(), a.approximate())
+            assert_array_equal(b.bounds, a.bounds)
+
+        assert_array_equal(loaded.children[1].transform, root.children[1].transform)
+        assert_array_equal(loaded.bounds, root.bounds)
+
+    def test_points_are_mapped_from_the_file(self):
+        document.save(self.filename, make_document())
+
+        loaded, _ = document.load(self.filename)
+        path = loaded.children[0]
+
+        self.assertIsInstance(path.positions.base, np.memmap)
+        self.assertEqual(path.positions.strides, (16, 8))
+
+    def test_loaded_paths_grow_into_memory(self):
+        document.save(self.filename, make_document())
+
+        loaded, _ = document.load(self.filename)
+        path = loaded.children[0]
+        path.append((100, 100))
+
+        self.assertEqual(len(path), 41)
+        self.assertNotIsInstance(path.positions.base, np.memmap)
+        assert_array_equal(path.approximate()[-2:], [ (39, 39 * 39), (100, 100) ])
+        assert_array_equal(loaded.bounds, (0, 0, 100, 39 * 39))
+
+    def test_saving_over_an_open_document(self):
+        document.save(self.filename, make_document())
+
+        loaded, _ = document.load(self.filename)
+        loaded.children[0].append((-1, -1))
+        document.save(self.filename, loaded)
+
+        reloaded, _ = document.load(self.filename)
+        assert_array_equal(reloaded.children[0].approximate(), loaded.children[0].approximate())
+        self.assertEqual(os.listdir(self.tempdir.name), [ 'drawing.victor' ])
+
+    def test_empty_document(self):
+        document.save(self.filename, PathGroup())
+
+        loaded, marks = document.load(self.filename)
+        self.assertEqual((loaded.children, marks), ([ ], { }))
+
+    def test_rejects_other_files(self):
+        with open(self.filename, 'wb') as fd:
+            fd.write(b'not a drawing')
+
+        with self.assertRaises(DocumentError):
+            document.load(self.filename)
+
+    def test_rejects_truncated_files(self):
+        document.save(self.filename, make_document())
+
+        with open(self.filename, 'r+b') as fd:
+            fd.truncate(200)
+
+        with self.assertRaises(DocumentError):
+            document.load(self.filename)
+
+    def write_header(self, header):
+        with open(self.filename, 'wb') as fd:
+            fd.write(document.MAGIC + bytes([ document.VERSION ]))
+            fd.write(document._u64.pack(len(header)))
+            fd.write(header)
+
+    def test_rejects_malformed_headers(self):
+        root = { 'type' : 'group', 'transform' : np.eye(3), 'children' : [ ] }
+        path = { 'type' : 'path', 'color' : [ 0, 0, 0, 255 ], 'bounds' : np.zeros(4), 'offset' : 0 }
+
+        headers = [
+            # an array of a dtype numpy does not know
+            encode({ 'root' : root }).replace(b'<f8', b'<q9'),
+            encode([ 1, 2 ]),
+            encode({ 'root' : root, 'marks' : [ 'a' ] }),
+            encode({ 'root' : dict(root, children=[ dict(path, count=0) ]) }),
+            encode({ 'root' : dict(root, children=[ dict(path, count=1) ]) }),
+        ]
+
+        for header in headers:
+            self.write_header(header)
+
+            with self.assertRaises(DocumentError):
+                document.load(self.filename)
+
+if __name__ == '__main__':
+    unittest.main()
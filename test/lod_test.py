@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from victor.lod import douglas_peucker, level_for_zoom, tolerance
+
+class LodTest(unittest.TestCase):
+    def test_straight_line_keeps_its_ends(self):
+        points = np.stack([ np.arange(100.), np.zeros(100) ], axis=1)
+        assert_array_equal(douglas_peucker(points, .5), [ 0, 99 ])
+
+    def test_corners_are_kept(self):
+        points = np.array([ (0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2.1) ])
+        assert_array_equal(douglas_peucker(points, .5), [ 0, 2, 4, 5 ])
+
+    def test_noise_below_tolerance_is_dropped(self):
+        random = np.random.RandomState(0)
+        xs = np.linspace(0, 1000, 100000)
+        points = np.stack([ xs, random.uniform(-.1, .1, len(xs)) ], axis=1)
+
+        kept = douglas_peucker(points, tolerance(0))
+        self.assertEqual(len(kept), 2)
+
+        kept = douglas_peucker(points, .05)
+        self.assertGreater(len(kept), 2)
+
+    def test_short_paths(self):
+        assert_array_equal(douglas_peucker(np.zeros((1, 2)), 1.), [ 0 ])
+        assert_array_equal(douglas_peucker(np.zeros((2, 2)), 1.), [ 0, 1 ])
+
+    def test_level_for_zoom(self):
+        self.assertEqual([ level_for_zoom(z) for z in (4., 1., .75, .5, .3, .25) ], [ 0, 0, 0, 1, 1, 2 ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import contextlib
+import time
+import unittest
+import pyglet.window.key as pkey
+from numpy.testing import assert_array_equal
+
+import victor.normal_dispatcher as dispatcher
+from victor.macro import Macros, QuietKeystrokes
+from victor.normal_dispatcher import *
+from victor.vector import *
+
+from test.normal_dispatcher_test import MockApp, MockKeystrokes
+
+def press(key, modifiers=0):
+    return NormalEvent(ON_KEY_PRESS, key, modifiers)
+
+def release(key):
+    return NormalEvent(ON_KEY_RELEASE, key)
+
+class MacroTest(unittest.TestCase):
+    def setUp(self):
+        self.app = MockApp()
+        self.quiet_calls = 0
+
+        self.state = dispatcher.construct_dispatcher(self.app)
+        self.app.macros = self.macros = Macros(self.state, self.quiet)
+
+    @contextlib.contextmanager
+    def quiet(self):
+        self.quiet_calls += 1
+        yield
+
+    def send(self, *events):
+        for event in events:
+            self.macros.dispatch(event)
+
+    def record(self, register, *events):
+        self.send(press(pkey.Q), press(getattr(pkey, register.upper())))
+        self.send(*events)
+        self.send(press(pkey.Q))
+
+    def test_record(self):
+        self.record('a', press(pkey.H), release(pkey.H), TIMER_EVENT)
+
+        self.assertIsNone(self.macros.recording)
+        self.assertEqual(self.macros.registers, { 'a' : [ press(pkey.H), release(pkey.H) ] })
+        assert_array_equal(self.app.cursor.position, vec2i(-1, 0))
+
+    def test_replay_with_a_count(self):
+        self.record('a', press(pkey.H), release(pkey.H), press(pkey.H), release(pkey.H))
+
+        self.send(press(pkey._3), press(pkey._2, pkey.MOD_SHIFT), press(pkey.A))
+
+        assert_array_equal(self.app.cursor.position, vec2i(-8, 0))
+        self.assertEqual(self.quiet_calls, 1)
+
+        # replayed events are not recorded again
+        self.assertEqual(len(self.macros.registers['a']), 4)
+
+    def test_replay_of_an_empty_register_does_nothing(self):
+        self.send(press(pkey.AT), press(pkey.B), press(pkey.H))
+        assert_array_equal(self.app.cursor.position, vec2i(-1, 0))
+
+    def test_nested_replays(self):
+        self.record('a', press(pkey.H), release(pkey.H))
+        self.macros.registers['b'] = [ press(pkey.AT), press(pkey.A) ] * 2
+
+        self.send(press(pkey.AT), press(pkey.B))
+        assert_array_equal(self.app.cursor.position, vec2i(-3, 0))
+        self.assertEqual(self.quiet_calls, 1)
+
+    def test_recursive_replay_stops(self):
+        self.macros.registers['a'] = [ press(pkey.H), release(pkey.H), press(pkey.AT), press(pkey.A) ]
+
+        self.send(press(pkey.AT), press(pkey.A))
+        assert_array_equal(self.app.cursor.position, vec2i(-Macros.max_depth, 0))
+
+    def test_quiet_keystrokes_apply_the_last_clear(self):
+        keystrokes = MockKeystrokes()
+        keystrokes.clear_time = 0
+        keystrokes.clear_delay = 1.
+
+        quiet = QuietKeystrokes(keystrokes)
+        quiet.set_clear_time(5)
+        quiet.set_clear_time(7)
+        quiet.apply(keystrokes, 7)
+
+        self.assertTrue(keystrokes.is_clear_pending)
+        self.assertEqual(keystrokes.clear_time, 8)
+
+    def test_long_replays_are_fast(self):
+        events = [ press(pkey.H), release(pkey.H), press(pkey.G), press(pkey.X) ] * 25000
+        self.macros.registers['a'] = events
+
+        start = time.perf_counter()
+        self.send(press(pkey.AT), press(pkey.A))
+        elapsed = time.perf_counter() - start
+
+        assert_array_equal(self.app.cursor.position, vec2i(-25000, 0))
+        self.assertLess(elapsed, 1.)
+
+if __name__ == '__main__':
+    unittest.main()
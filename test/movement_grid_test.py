@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+from victor.vector import *
+from victor.movement_grid import MovementGrid, scales
+
+class MovementGridTest(unittest.TestCase):
+    def test_spacing_follows_scale(self):
+        grid = MovementGrid(512, 512)
+        self.assertEqual(grid.spacing, scales[3])
+
+        grid.scale_up()
+        self.assertEqual(grid.spacing, scales[4])
+
+        for _ in range(len(scales)):
+            grid.scale_down()
+
+        self.assertEqual(grid.spacing, scales[0])
+        self.assertFalse(grid.visible)
+
+    def test_lines_cross_the_rect(self):
+        grid = MovementGrid(512, 512)
+
+        lines = grid.lines((-5, 30, 45, 50))
+
+        # x = 0, 20, 40 then y = 40
+        assert_array_almost_equal(lines, [
+            [ 0, 30 ], [ 0, 50 ], [ 20, 30 ], [ 20, 50 ], [ 40, 30 ], [ 40, 50 ],
+            [ -5, 40 ], [ 45, 40 ],
+        ])
+
+    def test_cover_grows_to_whole_cells(self):
+        grid = MovementGrid(512, 512)
+
+        self.assertEqual(grid.cover((-5, 30, 45, 50)), (-20, 20, 60, 60))
+        self.assertEqual(grid.cover((-15, 25, 55, 45)), grid.cover((-5, 30, 45, 50)))
+
+    def test_shown_only_when_lines_are_apart(self):
+        grid = MovementGrid(512, 512)
+
+        self.assertTrue(grid.shown(1))
+        self.assertFalse(grid.shown(.1))
+
+        grid.visible = False
+        self.assertFalse(grid.shown(1))
+
+    def test_toggle_visibility(self):
+        grid = MovementGrid(512, 512)
+
+        grid.toggle_visibility()
+        self.assertFalse(grid.visible)
+
+        grid.toggle_visibility()
+        self.assertTrue(grid.visible)
+
+    def test_single_point_moves(self):
+        grid = MovementGrid(512, 512)
+        grid.scale = 2  # spacing 10
+
+        pos = vec2i(20, 30)
+        assert_array_almost_equal(grid.up(pos), [ 20, 40 ])
+        assert_array_almost_equal(grid.right(pos, 3), [ 50, 30 ])
+        assert_array_almost_equal(grid.left(pos), [ 10, 30 ])
+        assert_array_almost_equal(grid.down(pos, 2), [ 20, 10 ])
+        assert_array_almost_equal(grid.left(vec2f(25, 30)), [ 20, 30 ])
+
+    def test_batches_match_single_points(self):
+        grid = MovementGrid(512, 512)
+        points = np.random.RandomState(0).uniform(-100, 100, (1000, 2))
+        multipliers = np.arange(1000) % 4 + 1
+
+        assert_array_almost_equal(grid.snap(points), [ grid.snap(p) for p in points ])
+
+        for move in (grid.up, grid.down, grid.left, grid.right):
+            expected = [ move(p, m) for p, m in zip(points, multipliers) ]
+            assert_array_almost_equal(move(points, multipliers), expected)
+            self.assertEqual(move(points).shape, (1000, 2))
+
+if __name__ == '__main__':
+    unittest.main()
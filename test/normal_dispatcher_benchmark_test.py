@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of normal mode event dispatch.
+
+Run on its own to see the rates:
+
+    python -m test.normal_dispatcher_benchmark_test
+"""
+
+import sys
+import time
+import unittest
+import pyglet.window.key as pkey
+
+import victor.normal_dispatcher as dispatcher
+from victor.normal_dispatcher import *
+
+from test.normal_dispatcher_test import MockApp
+
+def events_per_second(send, events, seconds=.1):
+    count, start = 0, time.perf_counter()
+
+    while True:
+        for event in events:
+            send(event)
+
+        count += len(events)
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds: return count / elapsed
+
+class NormalDispatcherBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.app = MockApp()
+        self.state = dispatcher.construct_dispatcher(self.app)
+
+    def report(self, name, rate):
+        sys.stderr.write('\n{}: {:,.0f} events/s '.format(name, rate))
+
+    def test_key_repeat_storm(self):
+        # auto-repeat of a key without a binding
+        press = NormalEvent(ON_KEY_PRESS, pkey.X)
+        interned = NormalEvent._count
+
+        rate = events_per_second(self.state.send, [ press ] * 100)
+        self.report('key repeat', rate)
+
+        self.assertIs(NormalEvent(ON_KEY_PRESS, pkey.X), press)
+        self.assertEqual(NormalEvent._count, interned)
+
+    def test_timer_storm(self):
+        # ticks while a movement key is held down
+        self.state.send(NormalEvent(ON_KEY_PRESS, pkey.H))
+        interned = NormalEvent._count
+
+        rate = events_per_second(self.state.send, [ TIMER_EVENT ] * 100)
+        self.report('timer', rate)
+
+        self.assertEqual(NormalEvent._count, interned)
+        self.assertEqual(self.state.gi_frame.f_locals['current_state'].__name__, 'moving')
+
+    def test_construction_returns_interned_events(self):
+        rate = events_per_second(
+            lambda args: NormalEvent(*args),
+            [ (ON_KEY_PRESS, pkey.H, pkey.MOD_NUMLOCK), (ON_KEY_RELEASE, pkey.H) ] * 50,
+        )
+        self.report('construction', rate)
+
+        self.assertIs(NormalEvent(ON_KEY_PRESS, pkey.H, pkey.MOD_NUMLOCK), NormalEvent(ON_KEY_PRESS, pkey.H))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ from numpy.testing.utils import assert_array_equal
 import victor.normal_dispatcher as dispatcher
 from victor.normal_dispatcher import *
 from victor.vector import *;
+from victor.viewport import Viewport
 
 class MockGrid(object):
     def __init__(self):
@@ -40,6 +41,7 @@ class MockApp(object):
         self.grid = MockGrid()
         self.keystrokes = MockKeystrokes()
         self.marks = { };
+        self.viewport = Viewport(512, 512)
         self.time = 0
         self.current_multiplier = None
         self.down_action = None
@@ -83,6 +85,28 @@ class NormalDispatcherTest(unittest.TestCase):
         state.send(NormalEvent(TIMER_FIRE));
         assert_array_equal(app.cursor.position, vec2i(-11, 0))
 
+    def test_fast_move_is_smooth_between_ticks(self):
+        app = MockApp()
+        app.time = 0
+
+        state = dispatcher.init_state(dispatcher.default_state, app, None)
+        state.send(NormalEvent(ON_KEY_PRESS, pkey.H))
+
+        app.time = 0.65
+        state.send(TIMER_EVENT)
+        assert_array_equal(app.cursor.position, vec2i(-4, 0))
+
+    def test_timer_events_are_wanted_only_while_moving(self):
+        app = MockApp()
+        app.time = 0
+
+        state = dispatcher.init_state(dispatcher.default_state, app, None)
+        self.assertFalse(state.send(NormalEvent(ON_KEY_PRESS, pkey.G)))
+        self.assertTrue(state.send(NormalEvent(ON_KEY_PRESS, pkey.H)))
+        self.assertTrue(state.send(TIMER_EVENT))
+        self.assertFalse(state.send(NormalEvent(ON_KEY_RELEASE, pkey.H)))
+        self.assertFalse(state.send(NormalEvent(ON_KEY_PRESS, pkey.M)))
+
     def test_fast_move_doesnt_keep_moving_after_key_release(self):
         app = MockApp()
         app.time = 0
@@ -155,6 +179,30 @@ class NormalDispatcherTest(unittest.TestCase):
         state.send(NormalEvent(ON_KEY_PRESS, pkey.S, pkey.MOD_SHIFT))
         self.assertEqual(app.grid.scale, 2)
 
+    def test_zoom_about_cursor(self):
+        app = MockApp()
+        app.cursor.position = vec2i(100, 100)
+
+        state = dispatcher.init_state(dispatcher.default_state, app, None)
+        state.send(NormalEvent(ON_KEY_PRESS, pkey.Z))
+        self.assertEqual(app.viewport.zoom, 2)
+
+        state.send(NormalEvent(ON_KEY_PRESS, pkey._3))
+        state.send(NormalEvent(ON_KEY_PRESS, pkey.Z, pkey.MOD_SHIFT))
+        self.assertEqual(app.viewport.zoom, .25)
+        assert_array_equal(app.viewport.to_window(app.cursor.position), (100, 100))
+
+    def test_pan(self):
+        app = MockApp()
+
+        state = dispatcher.init_state(dispatcher.default_state, app, None)
+        state.send(NormalEvent(ON_KEY_PRESS, pkey.L, pkey.MOD_CTRL))
+        state.send(NormalEvent(ON_KEY_PRESS, pkey._2))
+        state.send(NormalEvent(ON_KEY_PRESS, pkey.K, pkey.MOD_CTRL))
+
+        assert_array_equal(app.viewport.center, (256 + 128, 256 + 256))
+        assert_array_equal(app.cursor.position, vec2i(0, 0))
+
     def test_switch_to_ex_mode(self):
         app = MockApp()
         state = dispatcher.init_state(dispatcher.default_state, app, None)
@@ -173,6 +221,16 @@ class NormalDispatcherTest(unittest.TestCase):
         event = NormalEvent(ON_KEY_PRESS, pkey.A, pkey.MOD_NUMLOCK)
         self.assertFalse(event.modifiers)
 
+    def test_events_are_interned_and_immutable(self):
+        event = NormalEvent(ON_KEY_PRESS, pkey.H, pkey.MOD_CTRL)
+
+        self.assertIs(NormalEvent(ON_KEY_PRESS, pkey.H, pkey.MOD_CTRL | pkey.MOD_NUMLOCK), event)
+        self.assertIsNot(NormalEvent(ON_KEY_PRESS, pkey.H), event)
+        self.assertIs(dispatcher.lookup(event), dispatcher.pan)
+
+        with self.assertRaises(AttributeError):
+            event.key = pkey.J
+
     def test_certain_modifier_key_presses_do_not_change_state(self):
         app = MockApp()
         state = dispatcher.init_state(dispatcher.default_state, app, None)
@@ -0,0 +1,116 @@
+import unittest
+
+from numpy.testing import assert_array_equal
+
+from victor.path import Path
+from victor.path_group import PathGroup, PathGroupListener
+from victor.vector import *
+
+class RecordingListener(PathGroupListener):
+    def __init__(self):
+        self.events = [ ]
+
+    def child_added(self, group, child):
+        self.events.append(('child_added', group, child))
+
+    def path_extended(self, path, start):
+        self.events.append(('path_extended', path, start))
+
+    def transform_changed(self, group):
+        self.events.append(('transform_changed', group))
+
+class PathGroupTest(unittest.TestCase):
+    def test_world_composes_ancestor_transforms(self):
+        root = PathGroup()
+        child = root.append_group()
+        grandchild = child.append_group()
+
+        root.translate(10, 0)
+        child.scale(2, 2)
+        grandchild.translate(1, 1)
+
+        p = vec3f(1, 1, 1)
+        assert_array_equal(p.dot(grandchild.world), (14, 4, 1))
+
+    def test_world_is_cached_until_an_ancestor_moves(self):
+        root = PathGroup()
+        child = root.append_group()
+        sibling = root.append_group()
+
+        world = child.world
+        self.assertIs(child.world, world)
+
+        sibling.translate(5, 5)
+        self.assertIs(child.world, world)
+
+        root.translate(5, 5)
+        self.assertIsNot(child.world, world)
+        assert_array_equal(child.world, translate(5, 5))
+
+    def test_listeners_see_descendant_changes(self):
+        root = PathGroup()
+        listener = RecordingListener()
+        root.listeners.append(listener)
+
+        group = root.append_group()
+        path = group.append_path(Path((0, 0)))
+        path.append((1, 1))
+        group.translate(1, 0)
+
+        self.assertEqual(listener.events, [
+            ('child_added', root, group),
+            ('child_added', group, path),
+            ('path_extended', path, 1),
+            ('transform_changed', group),
+        ])
+
+    def test_bounds_grow_with_appends(self):
+        root = PathGroup()
+        group = root.append_group()
+        group.translate(10, 0)
+
+        path = group.append_path(Path((0, 0)))
+        assert_array_equal(root.bounds, (10, 0, 10, 0))
+
+        path.append((1, -2))
+        assert_array_equal(path.bounds, (0, -2, 1, 0))
+        assert_array_equal(group.bounds, (0, -2, 1, 0))
+        assert_array_equal(root.bounds, (10, -2, 11, 0))
+
+    def test_bounds_follow_transforms(self):
+        root = PathGroup()
+        group = root.append_group()
+        group.append_path(Path((1, 1))).append((2, 3))
+
+        bounds = root.bounds
+        group.scale(2, 2)
+
+        self.assertIsNot(root.bounds, bounds)
+        assert_array_equal(root.bounds, (2, 2, 4, 6))
+
+        root.translate(5, 5)
+        assert_array_equal(root.bounds, (2, 2, 4, 6))
+        assert_array_equal(root.world_bounds, (7, 7, 9, 11))
+
+    def test_append_existing_group(self):
+        root = PathGroup()
+        listener = RecordingListener()
+        root.listeners.append(listener)
+
+        group = PathGroup()
+        group.translate(1, 0)
+        group.append_path(Path((0, 0)))
+
+        self.assertIs(root.append_group(group), group)
+        self.assertIs(group.parent, root)
+        self.assertEqual(listener.events, [ ('child_added', root, group) ])
+        assert_array_equal(root.bounds, (1, 0, 1, 0))
+
+    def test_empty_group_has_empty_bounds(self):
+        root = PathGroup()
+        root.append_group().translate(5, 5)
+
+        self.assertGreater(root.bounds[0], root.bounds[2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+
+from victor.path import Path
+
+def make_path(*points):
+    path = Path(points[0])
+    for p in points[1:]:
+        path.append(p)
+    return path
+
+class PathTest(unittest.TestCase):
+    def test_append_grows_past_initial_capacity(self):
+        points = [ (i, 2 * i) for i in range(100) ]
+        path = make_path(*points)
+
+        self.assertEqual(len(path), 100)
+        assert_array_equal(path.approximate(), points)
+        assert_array_equal(path.parameters, np.arange(100.))
+
+    def test_from_columns_uses_the_arrays(self):
+        ts = np.arange(3.)
+        positions = np.array([ (0., 1.), (2., -1.), (4., 5.) ])
+        positions.flags.writeable = False
+
+        path = Path.from_columns(ts, positions, (1, 2, 3, 4))
+
+        self.assertIs(path.positions, positions)
+        assert_array_equal(path.bounds, (0, -1, 4, 5))
+        self.assertEqual(path.color, (1, 2, 3, 4))
+
+        path.append((6, 6))
+        assert_array_equal(path.approximate(), [ (0, 1), (2, -1), (4, 5), (6, 6) ])
+        assert_array_equal(path.parameters, np.arange(4.))
+
+    def test_approximate_is_a_view(self):
+        path = make_path((0, 0), (10, 0))
+        positions = path.approximate()
+
+        self.assertTrue(np.shares_memory(positions, path.positions))
+        self.assertFalse(positions.flags.writeable)
+
+    def test_coarse_levels_are_simplified_and_cached(self):
+        path = make_path(*[ (i, 0) for i in range(50) ])
+
+        coarse = path.approximate(1)
+        assert_array_equal(coarse, [ (0, 0), (49, 0) ])
+        self.assertIs(path.approximate(1), coarse)
+
+        path.append((49, 10))
+        assert_array_equal(path.approximate(1), [ (0, 0), (49, 0), (49, 10) ])
+        self.assertEqual(len(path.approximate(0)), 51)
+
+    def test_evaluate(self):
+        path = make_path((0, 0), (10, 0), (10, 20))
+
+        assert_array_equal(path.evaluate(0.), (0, 0))
+        assert_array_equal(path.evaluate(.5), (5, 0))
+        assert_array_equal(path.evaluate(1.25), (10, 5))
+        assert_array_equal(path.evaluate(2.), (10, 20))
+
+        self.assertIsNone(path.evaluate(-.1))
+        self.assertIsNone(path.evaluate(2.1))
+
+    def test_evaluate_many_matches_evaluate(self):
+        path = make_path((0, 0), (10, 0), (10, 20), (-5, 3))
+        ts = np.linspace(0, 3, 1001)
+
+        expected = [ path.evaluate(t) for t in ts ]
+        assert_array_almost_equal(path.evaluate_many(ts), expected)
+
+    def test_evaluate_many_out_of_range_is_nan(self):
+        path = make_path((0, 0), (10, 0))
+        out = path.evaluate_many([ -1., .5, 2. ])
+
+        self.assertTrue(np.isnan(out[0]).all())
+        assert_array_equal(out[1], (5, 0))
+        self.assertTrue(np.isnan(out[2]).all())
+
+if __name__ == '__main__':
+    unittest.main()
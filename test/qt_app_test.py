@@ -0,0 +1,178 @@
+import os
+import tempfile
+import time
+import unittest
+from mock import patch
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtGui import QKeyEvent
+from PyQt5.QtWidgets import QApplication
+
+import pyglet.window.key as pkey
+
+import victor.document as document
+import victor.mode as vmode
+import victor.normal_dispatcher as vnd
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.qt_app import QTVictorGLWindow, normal_event, overlay_lines
+from victor.vector import *
+
+class QTVictorGLWindowTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([ ])
+
+    def setUp(self):
+        self.window = QTVictorGLWindow(self.app)
+
+        for name, value in (('isExposed', True), ('paint', None)):
+            patcher = patch.object(self.window, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # the first frame is always drawn
+        self.window.render_now()
+
+    def process(self, duration=0.):
+        end = time.time() + duration
+        while True:
+            self.app.processEvents()
+            if time.time() >= end: break
+            time.sleep(.005)
+
+    def counts(self):
+        return self.window.frames_drawn, self.window.frames_skipped
+
+    def test_clean_window_skips_frames(self):
+        self.window.render_now()
+        self.window.render_now()
+
+        self.assertEqual(self.counts(), (1, 2))
+        self.assertEqual(self.window.paint.call_count, 1)
+
+    def test_invalidations_share_a_frame(self):
+        self.window.invalidate()
+        self.window.invalidate()
+        self.process()
+
+        self.assertEqual(self.counts(), (2, 0))
+
+    def test_watched_groups_invalidate(self):
+        group = PathGroup()
+        self.window.watch(group)
+
+        path = Path(vec2f(0, 0))
+        group.append_path(path)
+        self.process()
+
+        path.append(vec2f(1, 1))
+        self.process()
+
+        self.assertEqual(self.counts(), (3, 0))
+
+    def test_animating_draws_continuously(self):
+        self.window.animating = True
+        self.window.invalidate()
+        for _ in range(3): self.process()
+        self.window.animating = False
+        self.process()
+
+        self.assertGreaterEqual(self.window.frames_drawn, 4)
+
+    def test_frame_rate_cap(self):
+        self.window.max_fps = 10
+        self.window.invalidate()
+        self.process()
+
+        self.assertEqual(self.counts(), (1, 0))
+
+        self.process(.2)
+        self.assertEqual(self.counts(), (2, 0))
+
+    def type(self, keys, modifiers=Qt.NoModifier):
+        for key, text in keys:
+            for kind in (QEvent.KeyPress, QEvent.KeyRelease):
+                self.app.sendEvent(self.window, QKeyEvent(kind, key, modifiers, text))
+
+    def test_edits_invalidate(self):
+        window = self.window
+        spacing, view = window.grid.spacing, window.viewport.matrix.copy()
+
+        edits = [
+            lambda: self.type([ (Qt.Key_L, 'l') ]),
+            lambda: self.type([ (Qt.Key_M, 'm'), (Qt.Key_A, 'a') ]),
+            lambda: self.type([ (Qt.Key_S, 'S') ], Qt.ShiftModifier),
+            lambda: self.type([ (Qt.Key_L, '') ], Qt.ControlModifier),
+            lambda: window.current_group.append_path(Path(vec2f(0, 0))),
+        ]
+
+        for i, edit in enumerate(edits):
+            edit()
+            self.process()
+            self.assertEqual(self.counts(), (i + 2, 0))
+
+        self.assertTrue(window.overlay_dirty)
+        assert_array_equal(window.marks['a'], window.cursor.position)
+        self.assertGreater(window.grid.spacing, spacing)
+        self.assertFalse(np.array_equal(window.viewport.matrix, view))
+
+    def test_keys_go_through_the_dispatcher(self):
+        start = tuple(self.window.cursor.position)
+        self.type([ (Qt.Key_B, 'b'), (Qt.Key_L, 'l'), (Qt.Key_A, 'a') ])
+        self.process()
+
+        path, = self.window.groups.children
+        self.assertEqual(len(path), 2)
+        self.assertEqual(tuple(path.approximate()[0]), start)
+        self.assertGreater(self.window.cursor.position[0], start[0])
+        self.assertEqual(self.counts()[0], 2)
+
+    def test_ex_commands_open_documents(self):
+        root = PathGroup()
+        root.append_path(Path((0, 0))).append((5, 5))
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'drawing.victor')
+            document.save(filename, root)
+
+            self.type([ (Qt.Key_Colon, ':') ])
+            self.assertEqual(self.window.mode, vmode.EX)
+
+            self.type([ (Qt.Key_E, 'e'), (Qt.Key_Space, ' ') ])
+            self.type([ (Qt.Key_unknown, c) for c in filename ])
+            self.type([ (Qt.Key_Return, '\r') ])
+
+        self.assertEqual(self.window.mode, vmode.NORMAL)
+        self.assertEqual(self.window.filename, filename)
+        self.assertEqual(len(list(self.window.groups.walk_paths())), 1)
+
+class NormalEventTest(unittest.TestCase):
+    def test_translation(self):
+        self.assertIs(normal_event(vnd.ON_KEY_PRESS, Qt.Key_H, Qt.ControlModifier),
+                      vnd.NormalEvent(vnd.ON_KEY_PRESS, pkey.H, pkey.MOD_CTRL))
+        self.assertIs(normal_event(vnd.ON_KEY_PRESS, Qt.Key_A, Qt.ShiftModifier),
+                      vnd.NormalEvent(vnd.ON_KEY_PRESS, pkey.A, pkey.MOD_SHIFT))
+
+        # shift made the character, so it is not kept
+        self.assertIs(normal_event(vnd.ON_KEY_PRESS, Qt.Key_At, Qt.ShiftModifier),
+                      vnd.NormalEvent(vnd.ON_KEY_PRESS, pkey.AT))
+
+        self.assertIs(normal_event(vnd.ON_KEY_PRESS, Qt.Key_Escape, Qt.NoModifier), vnd.ESCAPE_EVENT)
+        self.assertIsNone(normal_event(vnd.ON_KEY_PRESS, Qt.Key_F1, Qt.NoModifier))
+
+class OverlayTest(unittest.TestCase):
+    def test_cursor_and_marks(self):
+        positions, colors = overlay_lines((10, 10), [ (0, 0), (5, 5) ])
+
+        self.assertEqual(positions.shape, (12, 2))
+        self.assertEqual(colors.shape, (12, 4))
+        assert_array_equal(positions[:2], [ [ 4, 10 ], [ 16, 10 ] ])
+
+if __name__ == '__main__':
+    unittest.main()
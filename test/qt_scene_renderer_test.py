@@ -0,0 +1,147 @@
+import unittest
+from mock import MagicMock
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.qt_scene_renderer import QtSceneRenderer
+from victor.qt_vertex_buffer import QtArrayBuffer
+
+class RecordingArray(QtArrayBuffer):
+    """
+    A QtArrayBuffer with its data but no GPU buffer.
+    """
+    def reserve(self, count):
+        if count > self.capacity:
+            data = np.zeros((max(count, 2 * self.capacity), self.size), self.dtype)
+            data[:self.count] = self.data[:self.count]
+            self.data, self.capacity = data, len(data)
+
+    def set_region(self, start, rows):
+        rows = np.asarray(rows, self.dtype).reshape(-1, self.size)
+        self.reserve(start + len(rows))
+        self.data[start:start + len(rows)] = rows
+        self.count = max(self.count, start + len(rows))
+
+    def bind(self): pass
+    def release(self): pass
+
+class RecordingVertices(object):
+    def __init__(self):
+        self.positions = RecordingArray(np.float32, 2)
+        self.colors = RecordingArray(np.uint8, 4)
+
+    def set_region(self, start, positions, colors):
+        self.positions.set_region(start, positions)
+        self.colors.set_region(start, colors)
+
+class QtSceneRendererTest(unittest.TestCase):
+    def setUp(self):
+        self.root = PathGroup()
+        self.vertices = RecordingVertices()
+        self.indices = RecordingArray(np.uint32, 1)
+        self.renderer = QtSceneRenderer(self.root, self.vertices, self.indices)
+
+    def lines(self):
+        """
+        The visible segments, as pairs of world positions.
+        """
+        self.renderer.update()
+
+        pairs = self.indices.data[:2 * self.renderer.end].reshape(-1, 2)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+
+        positions = self.vertices.positions.data
+        return sorted(tuple(map(tuple, positions[pair].tolist())) for pair in pairs)
+
+    def test_strips_become_line_pairs(self):
+        a = self.root.append_path(Path((0, 0)))
+        a.append((1, 0))
+        a.append((1, 1))
+
+        b = self.root.append_path(Path((5, 5)))
+
+        self.assertEqual(self.lines(), [ ((0, 0), (1, 0)), ((1, 0), (1, 1)) ])
+
+        b.append((6, 6))
+        self.assertEqual(len(self.lines()), 3)
+
+    def test_relocated_paths_are_not_drawn_twice(self):
+        a = self.root.append_path(Path((0, 0)))
+        for i in range(1, 20):
+            a.append((i, 0))
+
+        lines = self.lines()
+        self.assertEqual(len(lines), 19)
+        self.assertEqual(len(set(lines)), 19)
+
+    def test_vertices_are_in_world_coordinates(self):
+        group = self.root.append_group()
+        a = group.append_path(Path((0, 0)))
+        a.append((1, 1))
+
+        group.translate(10, 20)
+        self.assertEqual(self.lines(), [ ((10, 20), (11, 21)) ])
+
+        self.root.scale(2, 2)
+        self.assertEqual(self.lines(), [ ((20, 40), (22, 42)) ])
+
+    def test_levels_of_detail(self):
+        a = self.root.append_path(Path((0, 0)))
+        for i in range(1, 100):
+            a.append((i, 0))
+        a.append((99, 10))
+
+        self.assertEqual(len(self.lines()), 100)
+
+        self.renderer.set_level(2)
+        self.assertEqual(self.lines(), [ ((0, 0), (99, 0)), ((99, 0), (99, 10)) ])
+
+        self.renderer.set_level(0)
+        self.assertEqual(len(self.lines()), 100)
+
+    def test_one_draw_call(self):
+        a = self.root.append_path(Path((0, 0)))
+        a.append((1, 1))
+
+        group = self.root.append_group()
+        group.translate(5, 5)
+        b = group.append_path(Path((0, 0)))
+        b.append((1, 1))
+
+        self.renderer.vertices = MagicMock()
+        self.renderer.vertices.set_region = self.vertices.set_region
+
+        gl = MagicMock()
+        self.renderer.draw(gl, MagicMock(), 0, 1)
+
+        self.assertEqual(gl.glDrawElements.call_count, 1)
+        self.assertEqual(gl.glDrawElements.call_args[0][1], 2 * self.renderer.end)
+
+    def test_culled_draw_uses_only_visible_segments(self):
+        a = self.root.append_path(Path((0, 0)))
+        a.append((1, 1))
+        a.append((2, 2))
+
+        b = self.root.append_path(Path((1000, 0)))
+        b.append((1001, 1))
+
+        self.renderer.vertices = MagicMock()
+        self.renderer.vertices.set_region = self.vertices.set_region
+        self.renderer.visible_indices = visible = RecordingArray(np.uint32, 1)
+
+        gl = MagicMock()
+        self.renderer.draw(gl, MagicMock(), 0, 1, (-10, -10, 10, 10))
+
+        self.assertEqual(gl.glDrawElements.call_args[0][1], 4)
+        offset = self.renderer.slots[a].offset
+        self.assertEqual(visible.data[:4, 0].tolist(), [ offset, offset + 1, offset + 1, offset + 2 ])
+
+        gl.reset_mock()
+        self.renderer.draw(gl, MagicMock(), 0, 1, (-10, -10, 2000, 10))
+        self.assertEqual(gl.glDrawElements.call_args[0][1], 2 * self.renderer.end)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from mock import patch, MagicMock
+
+import numpy as np
+
+from victor.qt_vertex_buffer import QtVertexBuffer
+
+@patch('victor.qt_vertex_buffer.QOpenGLVertexArrayObject')
+@patch('victor.qt_vertex_buffer.QOpenGLBuffer')
+class QtVertexBufferTest(unittest.TestCase):
+    def buffers(self, QOpenGLBuffer):
+        position_buffer, color_buffer = MagicMock(), MagicMock()
+        QOpenGLBuffer.side_effect = [ position_buffer, color_buffer ]
+        return position_buffer, color_buffer
+
+    def test_buffers_are_created_lazily(self, QOpenGLBuffer, QOpenGLVertexArrayObject):
+        vertices = QtVertexBuffer()
+        self.assertFalse(QOpenGLBuffer.called)
+
+        vertices.extend([ (0, 0) ], [ (0, 0, 0, 255) ])
+        self.assertEqual(QOpenGLBuffer.call_count, 2)
+        self.assertEqual(QOpenGLVertexArrayObject.call_count, 1)
+        self.assertEqual((vertices.count, vertices.capacity), (1, 16))
+
+    def test_extend_uploads_only_new_rows(self, QOpenGLBuffer, QOpenGLVertexArrayObject):
+        position_buffer, color_buffer = self.buffers(QOpenGLBuffer)
+
+        vertices = QtVertexBuffer()
+        for i in range(3):
+            vertices.extend([ (i, i) ], [ (0, 0, 0, 255) ])
+
+        calls = position_buffer.write.call_args_list
+        self.assertEqual([ (c[0][0], c[0][2]) for c in calls ], [ (0, 8), (8, 8), (16, 8) ])
+        self.assertEqual(calls[2][0][1].tolist(), [ [ 2, 2 ] ])
+
+        calls = color_buffer.write.call_args_list
+        self.assertEqual([ (c[0][0], c[0][2]) for c in calls ], [ (0, 4), (4, 4), (8, 4) ])
+
+    def test_growing_reuploads_existing_rows(self, QOpenGLBuffer, QOpenGLVertexArrayObject):
+        position_buffer, color_buffer = self.buffers(QOpenGLBuffer)
+
+        vertices = QtVertexBuffer(capacity=2)
+        vertices.extend([ (0, 0), (1, 1) ], np.zeros((2, 4)))
+        position_buffer.reset_mock()
+
+        vertices.extend([ (2, 2) ], np.zeros((1, 4)))
+
+        self.assertEqual(vertices.capacity, 4)
+        position_buffer.allocate.assert_called_once_with(4 * 8)
+
+        offset, data, size = position_buffer.write.call_args_list[0][0]
+        self.assertEqual((offset, size), (0, 16))
+        self.assertEqual(data.tolist(), [ [ 0, 0 ], [ 1, 1 ] ])
+
+    def test_attach_happens_once(self, QOpenGLBuffer, QOpenGLVertexArrayObject):
+        program = MagicMock()
+
+        vertices = QtVertexBuffer()
+        vertices.extend([ (0, 0) ], [ (0, 0, 0, 255) ])
+        vertices.attach(program, 0, 1)
+        vertices.attach(program, 0, 1)
+
+        self.assertEqual(program.setAttributeBuffer.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
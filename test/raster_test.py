@@ -0,0 +1,131 @@
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+import victor.document as document
+import victor.raster as raster
+from victor.path import Path
+from victor.path_group import PathGroup
+
+def read_png(filename):
+    with open(filename, 'rb') as fd:
+        data = fd.read()
+
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    i, idat = 8, b''
+
+    while i < len(data):
+        size, = struct.unpack('>I', data[i:i + 4])
+        kind, body = data[i + 4:i + 8], data[i + 8:i + 8 + size]
+        i += 12 + size
+
+        if kind == b'IHDR': width, height = struct.unpack('>II', body[:8])
+        if kind == b'IDAT': idat += body
+
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, 1 + 4 * width)
+    assert not rows[:, 0].any()
+
+    return rows[:, 1:].reshape(height, width, 4)
+
+def make_document():
+    root = PathGroup()
+
+    # a red diagonal and a black cross inside a group
+    diagonal = root.append_path(Path((0, 0), (255, 0, 0, 255)))
+    diagonal.append((100, 50))
+
+    group = root.append_group()
+    group.translate(50, 25)
+    group.append_path(Path((-10, 0))).append((10, 0))
+    group.append_path(Path((0, -10))).append((0, 10))
+
+    return root
+
+class RasterTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tempdir.name, 'drawing.victor')
+        document.save(self.source, make_document())
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def output(self, name='out.png'):
+        return os.path.join(self.tempdir.name, name)
+
+    def test_fit_keeps_the_aspect_ratio(self):
+        width, height, matrix = raster.fit((0, 0, 100, 50), 201)
+
+        self.assertEqual((width, height), (201, 101))
+        assert_array_equal(np.array([ 0, 50, 1 ]).dot(matrix)[:2], (0, 0))
+        assert_array_equal(np.array([ 100, 0, 1 ]).dot(matrix)[:2], (200, 100))
+
+    def test_render_strip(self):
+        root = make_document()
+        width, height, matrix = raster.fit(root.world_bounds, 101)
+        image = raster.render_strip(root, matrix, width, 0, height)
+
+        self.assertEqual(image.shape, (51, 101, 4))
+
+        # y grows downwards in the image
+        assert_array_equal(image[50, 0], (255, 0, 0, 255))
+        assert_array_equal(image[0, 100], (255, 0, 0, 255))
+        assert_array_equal(image[25, 40:61, :3], 0)
+        assert_array_equal(image[15:36, 50, :3], 0)
+        assert_array_equal(image[0, 0], raster.BACKGROUND)
+
+    def test_strips_match_the_whole_image(self):
+        self.assertEqual(raster.render(self.source, self.output(), 101, tile=7), (101, 51))
+
+        root = make_document()
+        width, height, matrix = raster.fit(root.world_bounds, 101)
+        assert_array_equal(read_png(self.output()), raster.render_strip(root, matrix, width, 0, height))
+
+    def test_processes_render_the_same_image(self):
+        raster.render(self.source, self.output('one.png'), 300, tile=16)
+        raster.render(self.source, self.output('many.png'), 300, tile=16, processes=2)
+
+        assert_array_equal(read_png(self.output('one.png')), read_png(self.output('many.png')))
+
+    def test_strips_in_flight_are_bounded(self):
+        test = self
+        submitted = [ ]
+
+        class Job(object):
+            def __init__(self, value):
+                self.value = value
+
+            def get(self):
+                test.assertLessEqual(len(submitted) - self.value, 3)
+                return self.value
+
+        class Pool(object):
+            def apply_async(self, func, args):
+                submitted.append(args[0])
+                return Job(func(*args))
+
+        results = list(raster._in_order(Pool(), lambda x: x, range(10), 3))
+
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(submitted, list(range(10)))
+
+    def test_render_from_the_command_line(self):
+        env = dict(os.environ)
+        env.pop('DISPLAY', None)
+
+        subprocess.check_call(
+            [ sys.executable, '-m', 'victor', 'render', self.source, self.output(), '--size', '64' ],
+            env=env, stdout=subprocess.DEVNULL,
+        )
+
+        self.assertEqual(read_png(self.output()).shape, (33, 64, 4))
+
+if __name__ == '__main__':
+    unittest.main()
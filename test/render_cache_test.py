@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from mock import patch
+
+from victor.render_cache import RenderCache, scene_key
+
+class RenderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tempdir.name, 'renders')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_scene_key_is_stable(self):
+        a = { 'top': { 'xform': np.eye(4), 'children': [ ] }, 'canvas': [ 512, 512 ] }
+        b = { 'canvas': [ 512, 512 ], 'top': { 'children': [ ], 'xform': np.eye(4) } }
+
+        self.assertEqual(scene_key(a), scene_key(b))
+        self.assertNotEqual(scene_key(a), scene_key(a, { 'size': 1024 }))
+
+        b['top']['xform'][0, 3] = 1
+        self.assertNotEqual(scene_key(a), scene_key(b))
+
+    def test_hits_and_misses(self):
+        cache = RenderCache(self.directory)
+
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', b'image')
+        self.assertEqual(cache.get('a'), b'image')
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_disk_tier_survives_a_new_instance(self):
+        RenderCache(self.directory).put('a', b'image')
+
+        cache = RenderCache(self.directory)
+        self.assertEqual(cache.get('a'), b'image')
+        self.assertIn('a', cache.memory)
+
+    def test_memory_evicts_least_recently_used(self):
+        cache = RenderCache(self.directory, memory_bytes=10)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        cache.get('a')
+        cache.put('c', b'cccc')
+
+        self.assertEqual(list(cache.memory), [ 'a', 'c' ])
+        self.assertEqual(cache.memory_used, 8)
+
+    def test_disk_evicts_down_to_budget(self):
+        cache = RenderCache(self.directory, disk_bytes=10)
+        for i, key in enumerate('abc'):
+            cache.put(key, b'xxxx')
+            os.utime(os.path.join(self.directory, key), (i, i))
+
+        cache.put('d', b'xxxx')
+        self.assertEqual(sorted(os.listdir(self.directory)), [ 'c', 'd' ])
+
+    def test_disk_is_listed_once(self):
+        os.makedirs(self.directory)
+
+        for i, key in enumerate('abc'):
+            path = os.path.join(self.directory, key)
+            with open(path, 'wb') as fd: fd.write(b'xxxx')
+            os.utime(path, (i, i))
+
+        cache = RenderCache(self.directory, disk_bytes=10)
+        self.assertEqual(cache.disk_used, 12)
+
+        with patch('os.scandir', side_effect=AssertionError('listed again')):
+            cache.get('a')
+            cache.put('d', b'xxxx')
+
+        # a was used since, so b and c were the oldest
+        self.assertEqual(sorted(os.listdir(self.directory)), [ 'a', 'd' ])
+        self.assertEqual(cache.disk_used, 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,306 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from mock import patch
+
+import numpy as np
+
+import victor.render_server as server
+from victor.exceptions import RenderCancelled, RenderError
+from victor.frame import FrameReader, FrameWriter, RawFrame
+from victor.render_cache import RenderCache
+from victor.render_worker import CommandRenderer, RenderProcess, RenderWorker
+
+STUB_RENDERER = r'''
+import json, os, sys, time
+scene_path, render_path = sys.argv[1:]
+with open(scene_path) as fd: scene = json.load(fd)
+time.sleep(scene.get('sleep', 0))
+if scene.get('fail'): sys.exit('boom')
+if scene.get('crash'): os._exit(3)
+scene['pid'] = os.getpid()
+with open(render_path, 'w') as fd: json.dump(scene, fd)
+'''
+
+STUB_FRAME_RENDERER = r'''
+import numpy as np
+def render(scene):
+    image = np.zeros((scene['height'], scene['width'], 4), dtype=np.uint8)
+    image[..., 0] = np.arange(scene['width'])
+    image[..., 3] = 255
+    return image
+'''
+
+def wait_for(worker, timeout=10.):
+    end = time.time() + timeout
+    while time.time() < end:
+        finished = worker.poll()
+        if finished is not None: return finished
+        if not worker.busy: return worker.poll()
+        time.sleep(.01)
+
+class RenderWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+        self.stub = os.path.join(self.tempdir.name, 'stub.py')
+        with open(self.stub, 'w') as fd: fd.write(STUB_RENDERER)
+
+        self.worker = RenderWorker(self.make_renderer())
+
+    def make_renderer(self):
+        command = '"{}" "{}" {{scene_path}} {{render_path}}'.format(sys.executable, self.stub)
+        return CommandRenderer(command, self.tempdir.name)
+
+    def tearDown(self):
+        self.worker.close()
+        self.tempdir.cleanup()
+
+    def read(self, finished):
+        key, data = finished
+        scene = json.loads(data.decode('utf-8'))
+        scene.pop('pid')
+        return key, scene
+
+    def test_render(self):
+        self.worker.submit({ 'id': 1 }, 'key')
+        self.assertEqual(self.read(wait_for(self.worker)), ('key', { 'id': 1 }))
+        self.assertIsNone(self.worker.poll())
+
+    def test_new_job_supersedes_running_job(self):
+        self.worker.submit({ 'id': 1, 'sleep': 5 })
+        time.sleep(.5)
+        self.worker.submit({ 'id': 2 })
+
+        start = time.time()
+        self.assertEqual(self.read(wait_for(self.worker)), (None, { 'id': 2 }))
+        self.assertLess(time.time() - start, 4)
+
+    def test_cancel(self):
+        self.worker.submit({ 'id': 1, 'sleep': 5 })
+        time.sleep(.5)
+        self.worker.cancel()
+
+        self.assertIsNone(wait_for(self.worker, timeout=4))
+
+    def test_failed_render_publishes_nothing(self):
+        self.worker.submit({ 'fail': True })
+        self.assertIsNone(wait_for(self.worker))
+        self.assertIn('boom', self.worker.error)
+
+    def test_fills_the_cache(self):
+        cache = RenderCache(os.path.join(self.tempdir.name, 'cache'))
+        worker = RenderWorker(self.make_renderer(), cache)
+
+        try:
+            worker.submit({ 'id': 1 }, 'key')
+            key, data = wait_for(worker)
+
+            # stored after publishing, so wait for the worker to go idle
+            end = time.time() + 5
+            while 'key' not in cache and time.time() < end:
+                time.sleep(.01)
+
+            self.assertEqual(cache.get('key'), data)
+        finally:
+            worker.close()
+
+    def test_answers_from_the_cache(self):
+        cache = RenderCache(os.path.join(self.tempdir.name, 'cache'))
+        worker = RenderWorker(self.make_renderer(), cache)
+
+        try:
+            worker.submit({ 'id': 1 })
+            key, data = wait_for(worker)
+
+            end = time.time() + 5
+            while key not in cache and time.time() < end:
+                time.sleep(.01)
+
+            # a second render would come back with another pid
+            worker.submit({ 'id': 1 })
+            self.assertEqual(wait_for(worker), (key, data))
+            self.assertEqual(cache.hits, 1)
+        finally:
+            worker.close()
+
+    def test_unexpected_errors_are_reported(self):
+        class BrokenRenderer(object):
+            def begin(self): pass
+            def render(self, scene): raise ValueError('broken')
+            def cancel(self): pass
+            def close(self): pass
+
+        worker = RenderWorker(BrokenRenderer())
+        try:
+            worker.submit({ })
+            self.assertIsNone(wait_for(worker))
+            self.assertFalse(worker.busy)
+            self.assertEqual(worker.error, 'broken')
+        finally:
+            worker.close()
+
+class RenderProcessWorkerTest(RenderWorkerTest):
+    def make_renderer(self):
+        return RenderProcess('script:' + self.stub)
+
+class RenderProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+        stub = os.path.join(self.tempdir.name, 'stub.py')
+        with open(stub, 'w') as fd: fd.write(STUB_RENDERER)
+
+        self.renderer = RenderProcess('script:' + stub)
+
+    def tearDown(self):
+        self.renderer.close()
+        self.tempdir.cleanup()
+
+    def render(self, scene):
+        return json.loads(self.renderer.render(scene).decode('utf-8'))
+
+    def test_process_is_reused(self):
+        first = self.render({ 'id': 1 })
+        second = self.render({ 'id': 2 })
+
+        self.assertEqual(second['id'], 2)
+        self.assertEqual(first['pid'], second['pid'])
+
+    def test_errors_do_not_end_the_process(self):
+        pid = self.render({ })['pid']
+
+        with self.assertRaises(RenderError):
+            self.renderer.render({ 'fail': True })
+
+        self.assertEqual(self.render({ })['pid'], pid)
+
+    def test_sends_patches_after_the_first_scene(self):
+        statuses = [ ]
+        write_message = server.write_message
+
+        def record(stream, status, payload):
+            statuses.append(status)
+            write_message(stream, status, payload)
+
+        with patch('victor.render_server.write_message', record):
+            self.render({ 'id': 1, 'children': [ ] })
+            self.assertEqual(self.render({ 'id': 1, 'children': [ 'a' ] })['children'], [ 'a' ])
+
+            with self.assertRaises(RenderError):
+                self.renderer.render({ 'fail': True })
+
+            self.assertEqual(self.render({ 'id': 2 }), { 'id': 2, 'pid': self.renderer.process.pid })
+
+        self.assertEqual(statuses, [ server.SCENE, server.PATCH, server.PATCH, server.SCENE ])
+
+    def test_cancels_while_sending_keep_the_stream(self):
+        results = [ ]
+
+        def render():
+            try:
+                results.append(self.renderer.render({ 'pad': 'x' * (8 << 20) }))
+            except RenderCancelled:
+                results.append(None)
+
+        thread = threading.Thread(target=render)
+        thread.start()
+
+        # cancels land while the request is still going over the pipe
+        end = time.time() + 20
+        while thread.is_alive() and time.time() < end:
+            self.renderer.cancel()
+            time.sleep(.001)
+
+        thread.join(timeout=1)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(results), 1)
+
+        self.renderer.begin()
+        self.assertEqual(self.render({ 'id': 2 })['id'], 2)
+
+    def test_cancels_before_the_render_are_kept(self):
+        self.renderer.begin()
+        self.renderer.cancel()
+
+        with self.assertRaises(RenderCancelled):
+            self.renderer.render({ 'sleep': 5 })
+
+        self.renderer.begin()
+        self.assertEqual(self.render({ 'id': 2 })['id'], 2)
+
+    def test_restarts_after_a_crash(self):
+        pid = self.render({ })['pid']
+
+        with self.assertRaises(RenderError):
+            self.renderer.render({ 'crash': True })
+
+        self.assertNotEqual(self.render({ })['pid'], pid)
+
+class RawFrameRenderTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+        with open(os.path.join(self.tempdir.name, 'stub_frames.py'), 'w') as fd:
+            fd.write(STUB_FRAME_RENDERER)
+
+        self.frames = os.path.join(self.tempdir.name, 'frames')
+        os.makedirs(self.frames)
+
+        self.environ = patch.dict(os.environ, { 'PYTHONPATH': self.tempdir.name })
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        self.tempdir.cleanup()
+
+    def render(self, frames):
+        renderer = RenderProcess('stub_frames:render', frames=frames)
+        try:
+            return renderer.render({ 'width': 7, 'height': 3 })
+        finally:
+            renderer.close()
+
+    def check(self, frame):
+        self.assertEqual((frame.width, frame.height), (7, 3))
+
+        pixels = np.frombuffer(frame.data, dtype=np.uint8).reshape(3, 7, 4)
+        self.assertEqual(pixels[2, :, 0].tolist(), list(range(7)))
+        self.assertTrue((pixels[..., 3] == 255).all())
+
+    def test_frames_are_mapped_from_files(self):
+        frame = self.render(self.frames)
+
+        self.assertIsInstance(frame, RawFrame)
+        self.assertEqual(os.listdir(self.frames), [ 'frame-0' ])
+        self.assertFalse(memoryview(frame.data).readonly)
+        self.check(frame)
+
+    def test_resized_frames_leave_mapped_ones_alone(self):
+        writer, reader = FrameWriter(self.frames, slots=1), FrameReader(self.frames)
+        small = np.full((3, 7, 4), 9, dtype=np.uint8)
+
+        name = writer.write(RawFrame.from_array(small))
+        mapped = reader.read(name, 7, 3)
+
+        # a smaller frame into the same slot must not cut the mapped one short
+        writer.write(RawFrame.from_array(np.zeros((1, 1, 4), dtype=np.uint8)))
+        self.assertEqual(bytes(mapped.data), small.tobytes())
+
+        writer.write(RawFrame.from_array(np.ones((1, 1, 4), dtype=np.uint8)))
+        self.assertEqual(bytes(reader.read(name, 1, 1).data), bytes([ 1 ] * 4))
+
+        writer.close()
+
+    def test_frames_fall_back_to_the_pipe(self):
+        data = self.render(None)
+
+        self.assertIsInstance(data, bytes)
+        self.check(RawFrame.from_bytes(data))
+
+if __name__ == '__main__':
+    unittest.main()
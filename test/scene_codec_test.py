@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from victor.scene_codec import apply_patch, decode, diff, encode
+
+def make_scene():
+    return {
+        'top' : {
+            'xform' : np.eye(4),
+            'children' : [
+                { 'type' : 'mesh', 'points' : np.arange(12, dtype=np.float32).reshape(4, 3) },
+            ],
+        },
+        'camera' : { 'fov' : 45., 'size' : [ 512, 512 ], 'ortho' : False, 'name' : 'cam' },
+        'extra' : None,
+    }
+
+class SceneCodecTest(unittest.TestCase):
+    def assertSceneEqual(self, a, b):
+        self.assertEqual(encode(a), encode(b))
+
+    def test_round_trip(self):
+        scene = make_scene()
+        decoded = decode(encode(scene))
+
+        self.assertSceneEqual(decoded, scene)
+        self.assertEqual(decoded['camera'], scene['camera'])
+        self.assertEqual(decoded['top']['children'][0]['points'].dtype, np.float32)
+        self.assertTrue(np.array_equal(decoded['top']['xform'], np.eye(4)))
+
+    def test_encoding_is_canonical(self):
+        self.assertEqual(encode({ 'a' : 1, 'b' : 2 }), encode({ 'b' : 2, 'a' : 1 }))
+
+    def test_rejects_trailing_bytes(self):
+        with self.assertRaises(ValueError):
+            decode(encode(1) + b'N')
+
+    def test_unchanged_scene_has_empty_diff(self):
+        self.assertEqual(diff(make_scene(), make_scene()), [ ])
+
+    def test_moving_a_node_sends_only_its_transform(self):
+        old, new = make_scene(), make_scene()
+        new['top']['xform'] = np.eye(4) * 2
+
+        ops = diff(old, new)
+
+        self.assertEqual([ op[:2] for op in ops ], [ [ 'set', [ 'top', 'xform' ] ] ])
+        self.assertSceneEqual(apply_patch(decode(encode(old)), decode(encode(ops))), new)
+
+    def test_adding_a_child_appends_it(self):
+        old, new = make_scene(), make_scene()
+        new['top']['children'].append({ 'type' : 'mesh', 'points' : np.zeros((4, 3)) })
+
+        ops = diff(old, new)
+
+        self.assertEqual([ op[:2] for op in ops ], [ [ 'append', [ 'top', 'children' ] ] ])
+        self.assertLess(len(encode(ops)), len(encode(new)))
+        self.assertSceneEqual(apply_patch(old, ops), new)
+
+    def test_removals(self):
+        old, new = make_scene(), make_scene()
+        del new['extra']
+        new['top']['children'] = [ ]
+        new['camera']['size'] = 512
+
+        self.assertSceneEqual(apply_patch(old, diff(old, new)), new)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+from mock import DEFAULT, MagicMock, patch
+
+from numpy.testing import assert_array_equal
+
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.scene_renderer import SceneRenderer
+
+patch_gl = patch.multiple(
+    'pyglet.gl',
+    glPushMatrix=DEFAULT,
+    glPopMatrix=DEFAULT,
+    glMultMatrixf=DEFAULT,
+)
+
+def uploads(vertices):
+    return [ (c[0][0], len(c[0][1])) for c in vertices.set_region.call_args_list ]
+
+class SceneRendererTest(unittest.TestCase):
+    def setUp(self):
+        self.root = PathGroup()
+        self.vertices = MagicMock()
+        self.renderer = SceneRenderer(self.root, self.vertices)
+
+    @patch_gl
+    def test_untransformed_tree_is_one_draw_call(self, **gl):
+        a = self.root.append_path(Path((0, 0)))
+        a.append((1, 1))
+
+        group = self.root.append_group()
+        b = group.append_path(Path((5, 5)))
+        b.append((6, 6))
+        b.append((7, 7))
+
+        self.renderer.draw()
+
+        self.assertEqual(self.vertices.multi_draw.call_count, 1)
+        assert_array_equal(self.renderer.firsts, [ 0, 4 ])
+        assert_array_equal(self.renderer.counts, [ 2, 3 ])
+
+    def test_append_uploads_only_new_vertices(self):
+        a = self.root.append_path(Path((0, 0)))
+        a.append((1, 1))
+        self.renderer.update()
+
+        a.append((2, 2))
+        self.renderer.update()
+
+        self.assertEqual(uploads(self.vertices), [ (0, 2), (2, 1) ])
+        assert_array_equal(self.renderer.counts, [ 3 ])
+
+    def test_path_outgrowing_its_slot_moves_to_the_end(self):
+        a = self.root.append_path(Path((0, 0)))
+        b = self.root.append_path(Path((9, 9)))
+        self.renderer.update()
+
+        for i in range(4):
+            a.append((i, i))
+        self.renderer.update()
+
+        assert_array_equal(self.renderer.firsts, [ 8, 4 ])
+        assert_array_equal(self.renderer.counts, [ 5, 1 ])
+        self.assertEqual(uploads(self.vertices)[-1], (8, 5))
+
+    @patch_gl
+    def test_transformed_groups_are_drawn_under_their_world_matrix(self, **gl):
+        self.root.append_path(Path((0, 0)))
+        group = self.root.append_group()
+        group.append_path(Path((1, 1)))
+        group.append_group().append_path(Path((2, 2)))
+
+        group.translate(10, 20)
+        self.renderer.draw()
+
+        self.assertEqual(self.vertices.multi_draw.call_count, 2)
+
+        counts = [ len(c[0][1]) for c in self.vertices.multi_draw.call_args_list ]
+        self.assertEqual(counts, [ 1, 2 ])
+
+        matrix = list(gl['glMultMatrixf'].call_args_list[1][0][0])
+        self.assertEqual(matrix[12:14], [ 10, 20 ])
+
+    def test_cull_skips_subtrees_and_paths(self):
+        near = self.root.append_path(Path((0, 0)))
+        far = self.root.append_path(Path((1000, 0)))
+
+        group = self.root.append_group()
+        group.translate(2000, 0)
+        inside = group.append_path(Path((0, 0)))
+
+        nested = group.append_group()
+        nested.append_path(Path((5, 5)))
+
+        self.renderer.update()
+        paths = self.renderer.paths
+
+        visible = self.renderer.cull((-10, -10, 10, 10))
+        self.assertEqual([ p for p, v in zip(paths, visible) if v ], [ near ])
+
+        visible = self.renderer.cull((1990, -10, 2010, 10))
+        self.assertEqual([ p for p, v in zip(paths, visible) if v ], [ inside, nested.children[0] ])
+
+    def test_cull_follows_paths_as_they_grow(self):
+        near = self.root.append_path(Path((0, 0)))
+        far = self.root.append_path(Path((1000, 0)))
+
+        self.renderer.update()
+        self.assertEqual(self.renderer.cull((-10, -10, 10, 10)).tolist(), [ True, False ])
+
+        # reaching into the rect is seen without a new layout
+        far.append((5, 5))
+        self.renderer.update()
+
+        self.assertFalse(self.renderer.layout_dirty)
+        self.assertEqual(self.renderer.cull((-10, -10, 10, 10)).tolist(), [ True, True ])
+
+    def test_cull_keeps_flattened_groups(self):
+        group = self.root.append_group()
+        group.scale(0, 1)
+        flat = group.append_path(Path((5, 0)))
+        flat.append((5, 5))
+
+        self.renderer.update()
+
+        visible = self.renderer.cull((-10, -10, 10, 10))
+        self.assertEqual([ p for p, v in zip(self.renderer.paths, visible) if v ], [ flat ])
+
+    @patch_gl
+    def test_draw_skips_invisible_paths(self, **gl):
+        self.root.append_path(Path((0, 0))).append((1, 1))
+        self.root.append_path(Path((1000, 0))).append((1001, 1))
+
+        self.renderer.draw((-10, -10, 10, 10))
+
+        firsts, counts = self.vertices.multi_draw.call_args[0][1:]
+        assert_array_equal(counts, [ 2 ])
+
+    def test_unchanged_paths_are_not_uploaded(self):
+        self.root.append_path(Path((0, 0)))
+        self.renderer.update()
+        self.vertices.set_region.reset_mock()
+
+        self.renderer.update()
+        self.assertFalse(self.vertices.set_region.called)
+
+if __name__ == '__main__':
+    unittest.main()
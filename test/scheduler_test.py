@@ -0,0 +1,45 @@
+import unittest
+
+from victor.scheduler import Ticker
+
+class RecordingClock(object):
+    def __init__(self):
+        self.scheduled = { }
+
+    def schedule(self, callback):
+        self.scheduled[callback] = 0
+
+    def schedule_interval(self, callback, interval):
+        self.scheduled[callback] = interval
+
+    def unschedule(self, callback):
+        self.scheduled.pop(callback, None)
+
+def tick(dt): pass
+
+class TickerTest(unittest.TestCase):
+    def test_schedules_only_while_running(self):
+        clock = RecordingClock()
+        ticker = Ticker(clock, tick)
+        self.assertEqual(clock.scheduled, { })
+
+        ticker.set_running(True)
+        ticker.set_running(True)
+        self.assertEqual(clock.scheduled, { tick : 0 })
+
+        ticker.set_running(None)
+        self.assertFalse(ticker.running)
+        self.assertEqual(clock.scheduled, { })
+
+    def test_interval(self):
+        clock = RecordingClock()
+        ticker = Ticker(clock, tick, .05)
+
+        ticker.start()
+        self.assertEqual(clock.scheduled, { tick : .05 })
+
+        ticker.stop()
+        self.assertEqual(clock.scheduled, { })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from numpy.testing import assert_array_equal
+
+import victor.script as script
+import victor.svg as svg
+import victor.normal_dispatcher as vnd
+from victor.editor import Editor
+from victor.exceptions import CommandError, ScriptError
+
+import pyglet.window.key as pkey
+
+DRAWING = '''
+# an L shape, then a red dot
+b 10l a 5k a
+:set color 255 0 0 255
+b a
+'''
+
+class ScriptTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tempdir.name, name)
+
+    def test_parse_keys(self):
+        press = lambda key, modifiers=0: vnd.NormalEvent(vnd.ON_KEY_PRESS, key, modifiers)
+        release = lambda key, modifiers=0: vnd.NormalEvent(vnd.ON_KEY_RELEASE, key, modifiers)
+
+        self.assertEqual(script.parse_keys('a 2'), [
+            press(pkey.A), release(pkey.A), press(pkey._2), release(pkey._2),
+        ])
+
+        self.assertEqual(script.parse_keys('A<C-h><Esc>@<lt>'), [
+            press(pkey.A, pkey.MOD_SHIFT), release(pkey.A, pkey.MOD_SHIFT),
+            press(pkey.H, pkey.MOD_CTRL), release(pkey.H, pkey.MOD_CTRL),
+            vnd.ESCAPE_EVENT,
+            press(pkey.AT), release(pkey.AT),
+            press(pkey.LESS), release(pkey.LESS),
+        ])
+
+        with self.assertRaises(CommandError):
+            script.parse_keys('<Nope>')
+
+    def test_run_script_draws(self):
+        editor = Editor()
+        script.run_script(editor, DRAWING.splitlines())
+
+        l_shape, dot = editor.groups.children
+
+        assert_array_equal(l_shape.approximate(), [ (320, 200), (520, 200), (520, 300) ])
+        self.assertEqual(tuple(dot.color), (255, 0, 0, 255))
+        self.assertEqual(editor.cursor.position.tolist(), [ 520, 300 ])
+
+    def test_errors_carry_the_line(self):
+        editor = Editor()
+
+        with self.assertRaises(ScriptError) as raised:
+            script.run_script(editor, [ 'b', '# fine', ':nope' ])
+
+        self.assertEqual(raised.exception.line, 3)
+
+    def test_editors_have_their_own_commands(self):
+        first, second = Editor(), Editor()
+        first.ex_commands.register('only', lambda: 'first')
+
+        self.assertEqual(first.run_ex_command(':only'), 'first')
+
+        with self.assertRaises(CommandError):
+            second.run_ex_command(':only')
+
+    def test_batch_from_the_command_line(self):
+        source = self.path('drawing.vic')
+        with open(source, 'w') as fd:
+            fd.write(DRAWING)
+
+        env = dict(os.environ)
+        env.pop('DISPLAY', None)
+
+        subprocess.check_call(
+            [ sys.executable, '-m', 'victor', '--batch', source, '-o', self.path('out.svg') ],
+            env=env,
+        )
+
+        root = svg.read(self.path('out.svg'))
+        assert_array_equal(root.world_bounds, (320, 200, 520, 300))
+
+        result = subprocess.run(
+            [ sys.executable, '-m', 'victor', '--batch', '-' ],
+            input='b\n:nope\n', env=env, stderr=subprocess.PIPE, universal_newlines=True,
+        )
+
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('<stdin>:2:', result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
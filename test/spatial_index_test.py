@@ -0,0 +1,100 @@
+import random
+import unittest
+
+from math import hypot
+
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.spatial_index import QuadTree, SpatialIndex
+
+class QuadTreeTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.points = [ (rng.uniform(-1000, 3000), rng.uniform(-2000, 1000)) for i in range(2000) ]
+
+        self.tree = QuadTree(512.)
+        for i, p in enumerate(self.points):
+            self.tree.insert(i, p)
+
+    def distances(self, pos):
+        return sorted((hypot(p[0] - pos[0], p[1] - pos[1]), i) for i, p in enumerate(self.points))
+
+    def test_nearest_matches_brute_force(self):
+        for pos in [ (0, 0), (2500, -1500), (-5000, 5000), (700.5, 3) ]:
+            self.assertEqual(self.tree.nearest(pos, k=5), self.distances(pos)[:5])
+
+    def test_within_matches_brute_force(self):
+        pos = (1000, -500)
+        expected = [ pair for pair in self.distances(pos) if pair[0] <= 200 ]
+        self.assertEqual(self.tree.within(pos, 200), expected)
+
+    def test_in_rect_matches_brute_force(self):
+        expected = [
+            i for i, (x, y) in enumerate(self.points)
+            if 0 <= x <= 500 and -100 <= y <= 100
+        ]
+        self.assertEqual(sorted(self.tree.in_rect(0, -100, 500, 100)), expected)
+
+    def test_remove(self):
+        nearest = self.tree.nearest((0, 0))[0][1]
+        self.tree.remove(nearest)
+
+        self.assertNotIn(nearest, self.tree)
+        self.assertEqual(self.tree.nearest((0, 0)), self.distances((0, 0))[1:2])
+
+    def test_segments_measure_distance_to_the_closest_point(self):
+        tree = QuadTree()
+        tree.insert('segment', (0, 0), (100, 0))
+        tree.insert('point', (50, 20))
+
+        self.assertEqual(tree.nearest((50, 5)), [ (5., 'segment') ])
+
+class SpatialIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.root = PathGroup()
+        self.index = SpatialIndex()
+        self.root.listeners.append(self.index)
+
+    def test_paths_are_indexed_as_they_grow(self):
+        path = self.root.append_path(Path((0, 0)))
+        path.append((100, 0))
+
+        self.assertEqual(self.index.nearest((90, 3), kinds='vertex'), [ (hypot(10, 3), ('vertex', path, 1)) ])
+        self.assertEqual(self.index.nearest((50, 3), kinds='segment'), [ (3., ('segment', path, 0)) ])
+
+    def test_marks_are_indexed(self):
+        self.index.marks['a'] = (10, 10)
+        self.index.marks['a'] = (20, 20)
+
+        self.assertEqual(self.index.nearest((0, 0)), [ (hypot(20, 20), ('mark', 'a')) ])
+
+        del self.index.marks['a']
+        self.assertEqual(self.index.nearest((0, 0)), [ ])
+
+    def test_group_transforms_are_followed(self):
+        group = self.root.append_group()
+        path = group.append_path(Path((0, 0)))
+
+        group.translate(300, 0)
+
+        self.assertEqual(self.index.in_rect(290, -10, 310, 10), [ ('vertex', path, 0) ])
+        self.assertEqual(self.index.in_rect(-10, -10, 10, 10), [ ])
+
+    def test_stale_groups_are_reindexed_once(self):
+        group = self.root.append_group()
+        nested = group.append_group()
+        path = nested.append_path(Path((0, 0)))
+
+        for i in range(10):
+            nested.translate(1, 0)
+            group.translate(10, 0)
+
+        indexed = [ ]
+        index_path = self.index._index_path
+        self.index._index_path = lambda path, start: indexed.append(path) or index_path(path, start)
+
+        self.assertEqual(self.index.in_rect(105, -1, 115, 1), [ ('vertex', path, 0) ])
+        self.assertEqual(indexed, [ path ])
+
+if __name__ == '__main__':
+    unittest.main()
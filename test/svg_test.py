@@ -0,0 +1,145 @@
+import io
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+import victor.svg as svg
+from victor.exceptions import DocumentError
+from victor.path import Path
+from victor.path_group import PathGroup
+
+def world_points(path):
+    world = path.parent.world
+    return path.approximate().dot(world[:2, :2]) + world[2, :2]
+
+def apply(matrix, point):
+    return np.array([ point[0], point[1], 1. ]).dot(matrix)[:2]
+
+FOREIGN = '''<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">
+  <g style="stroke: #00ff00; stroke-opacity: .5" transform="translate(10 20)">
+    <path d="M 0 0 L 10 0 l 0 10 Z M 50,50 h 5 v 5"/>
+    <line x1="1" y1="2" x2="3" y2="4" stroke="rgb(255, 0, 0)" stroke-opacity="1"/>
+  </g>
+  <rect width="10" height="10"/>
+  <polygon points="0,0 1,0 1,1" transform="scale(2)"/>
+</svg>
+'''
+
+class SvgTest(unittest.TestCase):
+    def test_round_trip(self):
+        root = PathGroup()
+        path = root.append_path(Path((0, 0), (255, 0, 0, 128)))
+        path.append((1.5, 2))
+
+        group = root.append_group()
+        group.translate(3, 4)
+        group.scale(2, .5)
+        group.append_path(Path((1, 1))).append((2, 2))
+
+        loaded = svg.read(io.StringIO(''.join(svg.iter_svg(root))))
+
+        paths, loaded_paths = list(root.walk_paths()), list(loaded.walk_paths())
+        self.assertEqual(len(loaded_paths), 2)
+
+        for a, b in zip(paths, loaded_paths):
+            self.assertEqual(b.color, a.color)
+            assert_array_almost_equal(world_points(b), world_points(a))
+
+    def test_export_streams_long_paths_in_chunks(self):
+        root = PathGroup()
+        path = root.append_path(Path((0, 0)))
+        for i in range(1, 3 * svg.CHUNK):
+            path.append((i, -i))
+
+        chunks = list(svg.iter_svg(root))
+        self.assertLess(max(map(len, chunks)), 20 * svg.CHUNK)
+
+        loaded = svg.read(io.StringIO(''.join(chunks)))
+        assert_array_almost_equal(world_points(next(loaded.walk_paths())), path.approximate())
+
+    def test_import_foreign_shapes(self):
+        root = svg.read(io.StringIO(FOREIGN))
+        paths = list(root.walk_paths())
+
+        self.assertEqual(len(paths), 4)
+        self.assertEqual([ p.color for p in paths ], [
+            (0, 255, 0, 128), (0, 255, 0, 128), (255, 0, 0, 255), (0, 0, 0, 255),
+        ])
+
+        # y is flipped into VIctor's coordinates
+        assert_array_almost_equal(world_points(paths[0]), [ (10, -20), (20, -20), (20, -30), (10, -20) ])
+        assert_array_almost_equal(world_points(paths[1]), [ (60, -70), (65, -70), (65, -75) ])
+        assert_array_almost_equal(world_points(paths[3]), [ (0, 0), (2, 0), (2, -2), (0, 0) ])
+
+    def test_curves_are_flattened(self):
+        subpaths = svg.parse_path_data('M 0 0 Q 1 1 2 0')
+
+        self.assertEqual(len(subpaths[0]), svg.CURVE_SEGMENTS + 1)
+        assert_array_almost_equal(subpaths[0][svg.CURVE_SEGMENTS // 2], (1, .5))
+        assert_array_almost_equal(subpaths[0][-1], (2, 0))
+
+    def test_smooth_curves_reflect_their_control_point(self):
+        smooth, = svg.parse_path_data('M 0 0 Q 1 1 2 0 T 4 0')
+        explicit, = svg.parse_path_data('M 0 0 Q 1 1 2 0 Q 3 -1 4 0')
+        assert_array_almost_equal(smooth, explicit)
+
+        smooth, = svg.parse_path_data('M 0 0 C 0 1 1 1 1 0 s 1 -1 1 0')
+        explicit, = svg.parse_path_data('M 0 0 C 0 1 1 1 1 0 C 1 -1 2 -1 2 0')
+        assert_array_almost_equal(smooth, explicit)
+
+        # without a curve before, the first control point is the current one
+        smooth, = svg.parse_path_data('M 0 0 T 2 0')
+        assert_array_almost_equal(smooth[svg.CURVE_SEGMENTS // 2], (.5, 0))
+
+    def test_arcs_are_flattened(self):
+        arc, = svg.parse_path_data('M 0 0 A 5 5 0 0 1 10 0')
+
+        self.assertEqual(len(arc), svg.CURVE_SEGMENTS + 1)
+        assert_array_almost_equal(arc[svg.CURVE_SEGMENTS // 2], (5, -5))
+        assert_array_almost_equal(np.hypot(*(np.array(arc) - (5, 0)).T), 5)
+
+        # radii too small to reach the end are scaled up
+        arc, = svg.parse_path_data('M 0 0 a 1 1 0 0 0 10 0')
+        assert_array_almost_equal(arc[svg.CURVE_SEGMENTS // 2], (5, 5))
+
+    def test_drawing_after_a_close_starts_a_subpath(self):
+        self.assertEqual(svg.parse_path_data('M 0 0 L 10 0 Z l 0 10'), [
+            [ (0, 0), (10, 0), (0, 0) ], [ (0, 0), (0, 10) ],
+        ])
+
+    def test_unstroked_shapes_are_skipped(self):
+        root = svg.read(io.StringIO(
+            '<svg><line stroke="none" x2="1" y2="1"/>'
+            '<g style="stroke: none"><polyline points="0,0 1,1"/></g>'
+            '<line x2="1" y2="1"/></svg>'
+        ))
+
+        self.assertEqual(len(list(root.walk_paths())), 1)
+
+    def test_transforms_apply_right_to_left(self):
+        m = svg.parse_transform('translate(10, 0) rotate(90) scale(2)')
+        assert_array_almost_equal(apply(m, (1, 0)), (10, 2))
+
+        m = svg.parse_transform('rotate(180 5 5)')
+        assert_array_almost_equal(apply(m, (0, 0)), (10, 10))
+
+    def test_errors(self):
+        with self.assertRaises(DocumentError):
+            svg.read(io.StringIO('<svg><g></svg>'))
+
+        with self.assertRaises(DocumentError):
+            svg.parse_path_data('M 0 0 A 1 1 0 0 2 2')
+
+        with self.assertRaises(DocumentError):
+            svg.parse_path_data('L 1 1')
+
+        for attributes in ('stroke="#zzz"', 'stroke-opacity="half"', 'style="opacity: %"'):
+            with self.assertRaises(DocumentError) as raised:
+                svg.read(io.StringIO('<svg><polyline {} points="0,0 1,1"/></svg>'.format(attributes)))
+
+            self.assertIn(attributes.split('"')[1].split(': ')[-1], str(raised.exception))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from mock import patch, MagicMock
+
+import numpy as np
+
+from victor.vertex_buffer import VertexBuffer
+
+class VertexBufferTest(unittest.TestCase):
+
+    @patch('pyglet.graphics.vertexbuffer.create_buffer')
+    def test_buffers_are_created_lazily(self, create_buffer):
+        vertices = VertexBuffer()
+        self.assertFalse(create_buffer.called)
+        self.assertEqual(vertices.capacity, 0)
+
+        vertices.extend([ (0, 0) ], [ (0, 0, 0, 255) ])
+        self.assertEqual(create_buffer.call_count, 2)
+        self.assertEqual(vertices.capacity, 16)
+        self.assertEqual(vertices.count, 1)
+
+    @patch('pyglet.graphics.vertexbuffer.create_buffer')
+    def test_extend_uploads_only_new_rows(self, create_buffer):
+        position_buffer, color_buffer = MagicMock(), MagicMock()
+        create_buffer.side_effect = [ position_buffer, color_buffer ]
+
+        vertices = VertexBuffer()
+        for i in range(3):
+            vertices.extend([ (i, i) ], [ (0, 0, 0, 255) ])
+
+        offsets = [ c[0][1:] for c in position_buffer.set_data_region.call_args_list ]
+        self.assertEqual(offsets, [ (0, 8), (8, 8), (16, 8) ])
+
+        offsets = [ c[0][1:] for c in color_buffer.set_data_region.call_args_list ]
+        self.assertEqual(offsets, [ (0, 4), (4, 4), (8, 4) ])
+
+    @patch('pyglet.graphics.vertexbuffer.create_buffer')
+    def test_capacity_doubles(self, create_buffer):
+        position_buffer, color_buffer = MagicMock(), MagicMock()
+        create_buffer.side_effect = [ position_buffer, color_buffer ]
+
+        vertices = VertexBuffer(capacity=4)
+        capacities = [ ]
+
+        for i in range(17):
+            vertices.extend(np.zeros((1, 2)), np.zeros((1, 4)))
+            capacities.append(vertices.capacity)
+
+        self.assertEqual(sorted(set(capacities)), [ 4, 8, 16, 32 ])
+        self.assertEqual(
+            [ c[0][0] for c in position_buffer.resize.call_args_list ],
+            [ 8 * 8, 16 * 8, 32 * 8 ]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+from victor.viewport import Viewport
+
+def apply(matrix, point):
+    return np.array([ point[0], point[1], 1. ]).dot(matrix)[:2]
+
+class ViewportTest(unittest.TestCase):
+    def test_default_view_is_pixels(self):
+        viewport = Viewport(512, 256)
+
+        assert_array_almost_equal(viewport.to_window((10, 20)), (10, 20))
+        assert_array_almost_equal(viewport.matrix, np.identity(3))
+        self.assertEqual(viewport.visible_rect(), (0, 0, 512, 256))
+
+    def test_zoom_keeps_the_anchor_in_place(self):
+        viewport = Viewport(512, 512)
+        before = viewport.to_window((100, 50))
+
+        viewport.zoom_by(4, (100, 50))
+
+        assert_array_almost_equal(viewport.to_window((100, 50)), before)
+        assert_array_almost_equal(viewport.to_window((101, 50)) - before, (4, 0))
+        assert_array_almost_equal(apply(viewport.matrix, (101, 50)), viewport.to_window((101, 50)), 4)
+
+    def test_pan_is_in_window_pixels(self):
+        viewport = Viewport(512, 512)
+        viewport.zoom_by(.5)
+        viewport.pan(10, 0)
+
+        assert_array_almost_equal(viewport.center, (276, 256))
+        assert_array_almost_equal(viewport.to_world(viewport.to_window((3, 4))), (3, 4))
+
+    def test_level_follows_zoom(self):
+        viewport = Viewport(512, 512)
+        self.assertEqual(viewport.level, 0)
+
+        viewport.zoom_by(1 / 8.)
+        self.assertEqual(viewport.level, 3)
+
+if __name__ == '__main__':
+    unittest.main()
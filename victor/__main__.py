@@ -1,11 +1,138 @@
+import argparse
+import os
 import sys
+import time
 
-def qt_main():
+def qt_main(document=None):
     from .qt_app import QTVictorApplication
-    app = QTVictorApplication()
+    app = QTVictorApplication(document)
 
     return_code = app.run()
     sys.exit(return_code)
 
+def render_main(args):
+    from .raster import render
+
+    width, height = render(
+        args.input,
+        args.output,
+        args.size,
+        tile=args.tile,
+        processes=args.processes,
+        margin=args.margin,
+    )
+
+    print('{}: {}x{}'.format(args.output, width, height))
+
+def script_main(args):
+    # script sets up pyglet to need no display, so it comes first
+    from .script import run_script, write_output
+    from .editor import Editor
+    from .exceptions import CommandError
+
+    editor = Editor()
+    name = '<stdin>' if args.batch == '-' else args.batch
+
+    try:
+        if args.batch == '-':
+            run_script(editor, sys.stdin)
+        else:
+            with open(args.batch) as fd:
+                run_script(editor, fd)
+
+        if args.batch_output is not None:
+            write_output(editor, args.batch_output)
+    except (CommandError, OSError) as e:
+        sys.stderr.write('{}:{}\n'.format(name, e))
+        sys.exit(1)
+
+def batch_main(args):
+    from .batch import find_documents, run_batch
+    from .exceptions import CommandError
+
+    script = ()
+    if args.script is not None:
+        with open(args.script) as fd:
+            script = fd.readlines()
+
+    extension = '.' + args.to
+    count = failed = 0
+    start = time.perf_counter()
+
+    try:
+        results = run_batch(
+            find_documents(args.inputs),
+            args.output_dir,
+            extension,
+            script,
+            processes=args.processes,
+            chunksize=args.chunksize,
+            size=args.size,
+        )
+    except CommandError as e:
+        sys.stderr.write('{}\n'.format(e))
+        sys.exit(1)
+
+    for source, output, seconds, error in results:
+        count += 1
+
+        if error is None:
+            print('{} -> {} {:.3f}s'.format(source, output, seconds), flush=True)
+        else:
+            failed += 1
+            sys.stderr.write('{}: {}\n'.format(source, error))
+
+    print('{} documents, {} failed, {:.3f}s'.format(count, failed, time.perf_counter() - start))
+
+    if failed:
+        sys.exit(1)
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='victor')
+    parser.add_argument('-e', '--edit', metavar='DOCUMENT', help='a VIctor document to open in the window')
+    parser.add_argument('--batch', metavar='SCRIPT', help='run a script without a window, - for stdin')
+    parser.add_argument('-o', '--output', dest='batch_output', help='with --batch, the SVG, PNG or VIctor document to write')
+    commands = parser.add_subparsers(dest='command')
+
+    render = commands.add_parser('render', help='rasterize a document to PNG without a display')
+    render.add_argument('input', help='a VIctor document, or an .svg file')
+    render.add_argument('output', help='the PNG file to write')
+    render.add_argument('--size', type=int, default=1024, help='pixels along the longer side')
+    render.add_argument('--margin', type=int, default=0, help='pixels left blank around the drawing')
+    render.add_argument('--tile', type=int, default=256, help='rows rendered at a time')
+    render.add_argument('--processes', type=int, default=1, help='processes rendering tiles')
+    render.set_defaults(main=render_main)
+
+    batch = commands.add_parser('batch', help='process many documents over several processes')
+    batch.add_argument('inputs', nargs='+', help='documents, or directories searched for .svg and .victor files')
+    batch.add_argument('-d', '--output-dir', required=True, help='the directory outputs are written to')
+    batch.add_argument('-t', '--to', default='svg', help='the extension of the outputs: svg, png or victor')
+    batch.add_argument('-s', '--script', help='a script run against every document before it is written')
+    batch.add_argument('-j', '--processes', type=int, default=os.cpu_count() or 1, help='worker processes')
+    batch.add_argument('--chunksize', type=int, help='documents handed to a worker at a time')
+    batch.add_argument('--size', type=int, default=1024, help='pixels along the longer side of PNG outputs')
+    batch.set_defaults(main=batch_main)
+
+    return parser
+
+def main(argv=None):
+    parser = make_parser()
+    args = parser.parse_args(argv)
+
+    if args.edit is not None and (args.batch is not None or args.command is not None):
+        parser.error('--edit opens the window, so it cannot be used with --batch or a command')
+
+    if args.batch is not None:
+        script_main(args)
+        return
+
+    if args.batch_output is not None:
+        parser.error('--output requires --batch')
+
+    if args.command is None:
+        qt_main(args.edit)
+
+    args.main(args)
+
 if __name__ == '__main__':
-    qt_main()
+    main()
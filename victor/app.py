@@ -1,4 +1,5 @@
 import collections
+import io
 import pyglet
 import pyglet.gl as gl
 import pyglet.window.key as pkey
@@ -10,51 +11,57 @@ import time
 import os
 import numpy as np
 
-from itertools import chain
-
-
 import victor.mode as vmode
 from victor.command_area import CommandArea
 from victor.cursor import Cursor
+from victor.editor import Editor
 from victor.keystroke import Keystrokes
+from victor.frame import RawFrame
 from victor.movement_grid import MovementGrid
+from victor.render_cache import RenderCache
+from victor.render_worker import CommandRenderer, RenderProcess, RenderWorker
+from victor.scheduler import Ticker
+from victor.vertex_buffer import VertexBuffer
+import victor.settings as settings
 
-from .command import CommandError, register_ex_command, run_ex_command
+from .command import CommandError
 
-from victor.path_group import PathGroup
 from victor.path import Path
+from victor.scene_renderer import SceneRenderer
+from victor.vector import affine4f
 
 import victor.normal_dispatcher as vnd
 
 import pathlib
 
-FILE = Path(__file__).absolute()
+FILE = pathlib.Path(__file__).absolute()
 HERE = FILE.parent
 DATA = HERE / 'data'
 
-class VIctorApp(pyglet.window.Window):
+class VIctorApp(pyglet.window.Window, Editor):
     def __init__(self, *args, **kwargs):
-        self.window_shape = (512, 512)
+        pyglet.window.Window.__init__(self, 512, 512, caption="victor")
 
-        super(VIctorApp, self).__init__(
-            self.window_shape[0],
-            self.window_shape[1],
-            caption="victor",
-        )
+        self.tempdir = tempfile.TemporaryDirectory()
 
-        self.set_default_options()
+        self.image = None
+        self.render_requested = False
+        self.render_cache = RenderCache(
+            settings.RENDER_CACHE_PATH,
+            settings.RENDER_CACHE_MEMORY_BYTES,
+            settings.RENDER_CACHE_DISK_BYTES,
+        )
 
-        self.tempdir = tempfile.TemporaryDirectory()
+        # the worker fills the cache, off the UI thread
+        self.render_worker = RenderWorker(self.make_renderer(), self.render_cache)
 
-        self.mode = vmode.NORMAL
-        self.down_action = None
         self.text_event = None
-
         self.batch = pyglet.graphics.Batch()
 
-        self.setup_cursor()
+        self.grid_lines = VertexBuffer()
+        self.grid_key = None
 
-        self.marks = dict()
+        Editor.__init__(self, 512, 512)
 
         self.command_area = CommandArea(
             0,
@@ -63,22 +70,10 @@ class VIctorApp(pyglet.window.Window):
             self.batch
         )
 
-        self.keystrokes = Keystrokes(
-            self.window_shape[0] - 90,
-            0,
-            70,
-            self.batch
-        )
-
-        self.current_multiplier = None
-        self.normal_dispatcher = vnd.construct_dispatcher(self)
-        self.set_ex_commands()
-
-        self.groups = self.current_group = PathGroup()
-        self.current_path = None
-
-        self.time = time.time()
-        pyglet.clock.schedule_interval(self.on_timer_fire, .05)
+        # nothing runs on a timer unless something is moving or rendering
+        self.motion_timer = Ticker(pyglet.clock, self.on_timer_fire)
+        self.render_timer = Ticker(pyglet.clock, self.on_render_poll, .05)
+        self.keystrokes_clear_time = None
 
         gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
         gl.glEnable(gl.GL_BLEND)
@@ -93,21 +88,38 @@ class VIctorApp(pyglet.window.Window):
             self.options['gridcolor']
         )
 
-        self.grid.reset_batch()
+
+    def setup_keystrokes(self):
+        self.keystrokes = Keystrokes(
+            self.window_shape[0] - 90,
+            0,
+            70,
+            self.batch
+        )
+
+
+    def make_renderer(self):
+        if settings.RENDER_BACKEND == 'command':
+            return CommandRenderer(settings.RENDER_COMMAND, self.tempdir.name)
+
+        frames = os.path.join(self.tempdir.name, 'frames')
+        os.makedirs(frames, exist_ok=True)
+
+        return RenderProcess(settings.RENDER_SERVER_SPEC, settings.RENDER_PYTHON, frames)
 
 
     def set_ex_commands(self):
-        register_ex_command('line', self.draw_line)
-        register_ex_command('marks', self.show_marks)
-        register_ex_command('set', self.set_option)
-        register_ex_command('quad', self.add_quad)
-        register_ex_command('draw', self.reset_image)
+        Editor.set_ex_commands(self)
+
+        register = self.ex_commands.register
+        register('line', self.draw_line)
+        register('quad', self.add_quad)
+        register('draw', self.reset_image)
 
 
-    def set_default_options(self):
-        self.options = {}
-        self.options["color"] = (0, 0, 0, 255)
-        self.options["gridcolor"] = (0, 0, 255, 50)
+    def set_document(self, groups, marks=()):
+        Editor.set_document(self, groups, marks)
+        self.renderer = SceneRenderer(groups)
 
 
     def set_mode(self, mode):
@@ -126,15 +138,38 @@ class VIctorApp(pyglet.window.Window):
 
     def run_command(self):
         try:
-            run_ex_command(self.command_area.text)
+            self.run_ex_command(self.command_area.text)
         except CommandError as e:
             sys.stderr.write('%s\n' % str(e))
         self.set_mode(vmode.NORMAL)
 
 
+    def dispatch(self, event):
+        """
+        Send a NormalEvent to the dispatcher, running the motion timer for as
+        long as the dispatcher's state asks for timer events.
+        """
+        self.motion_timer.set_running(Editor.dispatch(self, event))
+
+        keystrokes = self.keystrokes
+        if keystrokes.is_clear_pending and keystrokes.clear_time != self.keystrokes_clear_time:
+            self.keystrokes_clear_time = keystrokes.clear_time
+            pyglet.clock.schedule_once(self.on_clear_keystrokes, keystrokes.clear_time - self.time)
+
+
     def on_timer_fire(self, dt):
-        self.time = time.time()
-        self.normal_dispatcher.send(vnd.NormalEvent(vnd.TIMER_FIRE))
+        self.dispatch(vnd.TIMER_EVENT)
+
+
+    def on_clear_keystrokes(self, dt):
+        self.keystrokes.clear_text(time.time())
+
+
+    def on_render_poll(self, dt):
+        self.update_image()
+
+        if not self.render_worker.busy:
+            self.render_timer.stop()
 
 
     def dispatch_both(self):
@@ -156,17 +191,17 @@ class VIctorApp(pyglet.window.Window):
                 self.set_mode(vmode.NORMAL)
 
             self.keystrokes.push_text("^[")
-            self.normal_dispatcher.send(vnd.NormalEvent(vnd.ESCAPE))
+            self.dispatch(vnd.ESCAPE_EVENT)
 
             # don't close window
             return pyglet.event.EVENT_HANDLED
 
         elif self.is_normal_mode():
-            self.normal_dispatcher.send(vnd.NormalEvent(vnd.ON_KEY_PRESS, symbol, modifiers))
+            self.dispatch(vnd.NormalEvent(vnd.ON_KEY_PRESS, symbol, modifiers))
 
     def on_key_release(self, symbol, modifiers):
         if self.is_normal_mode():
-            self.normal_dispatcher.send(vnd.NormalEvent(vnd.ON_KEY_RELEASE, symbol, modifiers))
+            self.dispatch(vnd.NormalEvent(vnd.ON_KEY_RELEASE, symbol, modifiers))
 
     def on_text(self, text):
         if self.is_ex_mode():
@@ -187,17 +222,6 @@ class VIctorApp(pyglet.window.Window):
             if not self.command_area.has_focus:
                 self.set_mode(vmode.NORMAL)
 
-    def current_position(self):
-        return (self.cursor.x, self.cursor.y)
-
-    def start_path(self):
-        self.current_path = Path(self.cursor.position)
-        self.paths.append(self.current_path)
-
-    def append_path(self):
-        if self.current_path:
-            self.current_path.append(self.cursor.position)
-
     def draw_line(self, *args):
         if len(args) != 2:
             self.error("line requires two arguments", args)
@@ -205,9 +229,10 @@ class VIctorApp(pyglet.window.Window):
             start = self.marks[args[0]]
             end = self.marks[args[1]]
 
-            self.batch.add(2, pyglet.gl.GL_LINES, None,
-                ('v2i', (start[0], start[1], end[0], end[1])),
-                ('c4B', tuple(chain(self.options["color"], self.options["color"]))))
+            # marks are world points, so the line joins the document
+            line = Path(start, self.options["color"])
+            line.append(end)
+            self.current_group.append_path(line)
 
     def add_quad(self, *args):
         if len(args) != 4:
@@ -230,68 +255,6 @@ class VIctorApp(pyglet.window.Window):
 
             self.scene.data['top'].children.append(mesh)
 
-    def show_marks(self, *args):
-        for key, value in sorted(self.marks.items()):
-            print(key, value)
-
-    def set_option(self, *args):
-        if len(args) < 2:
-            raise CommandError("No option specified")
-
-        option = args[0]
-        if option == "color":
-            if len(args) != 5:
-                raise CommandError("color must have 4 arguments")
-            self.options["color"] = tuple(map(int, args[1:]))
-        elif option == "gridcolor":
-            pass
-
-
-    def error(self, *args):
-        print(args)
-
-
-    @property
-    def image(self):
-        import json
-
-        attrs = self.__dict__
-        image = attrs.get('image')
-
-        if image is not None:
-            return image
-
-        tempdir = self.tempdir.name
-
-        scene_path = os.path.join(tempdir, 'victor_scene.yaml')
-        render_path = os.path.join(tempdir, 'victor_render.tiff')
-
-        with open(scene_path, 'w') as fd:
-            json.dump(self.scene.convert_to_dict(), fd, sort_keys=True, indent=4)
-
-        # TODO: Make asynchronous
-        handsome_path = '/Users/bracket/src/handsome'
-
-        activate = os.path.join(handsome_path, 'venv', 'bin', 'activate')
-        renderer_path = os.path.join(handsome_path, 'examples', '005_scene.py')
-        render = 'python {}'.format(renderer_path)
-
-        command = 'source {activate} && {render} {scene_path} {render_path}'.format(
-            activate = activate,
-            render = render,
-            scene_path = scene_path,
-            render_path = render_path
-        )
-
-        import subprocess as sp
-        out = sp.check_output(command, shell=True)
-
-        image = pyglet.image.load(render_path)
-        attrs['image'] = image
-
-        return image
-
-
     @property
     def scene(self):
         from sweatervest import parse_scene
@@ -310,7 +273,39 @@ class VIctorApp(pyglet.window.Window):
 
 
     def reset_image(self):
-        self.__dict__.pop('image', None)
+        self.render_requested = True
+
+        # the worker keys the scene and looks it up in the cache
+        self.render_worker.submit(self.scene.convert_to_dict())
+        self.render_timer.start()
+
+
+    def update_image(self):
+        finished = self.render_worker.poll()
+        if finished is None:
+            return
+
+        key, image = finished
+        self.load_image(image)
+
+
+    def load_image(self, image):
+        """
+        Display a rendered image: a RawFrame, RawFrame.to_bytes() output or
+        encoded image bytes, which are decoded by pyglet as a fallback.
+        """
+        if not isinstance(image, RawFrame):
+            image = RawFrame.from_bytes(image) or image
+
+        if isinstance(image, RawFrame):
+            data = pyglet.image.ImageData(
+                image.width, image.height, 'RGBA', image.pixels(), pitch=-4 * image.width
+            )
+
+            # upload now, so the frame's memory is free to be reused
+            self.image = data.get_texture()
+        else:
+            self.image = pyglet.image.load('victor_render.tiff', file=io.BytesIO(image))
 
 
     def move_square(self):
@@ -329,11 +324,56 @@ class VIctorApp(pyglet.window.Window):
     def on_draw(self):
         pyglet.gl.glClearColor(1, 1, 1, 1)
         self.clear()
-        self.image.blit(0, 0)
-        self.grid.draw()
+
+        if not self.render_requested:
+            self.reset_image()
+
+        self.update_image()
+
+        if self.image is not None:
+            self.image.blit(0, 0)
+
+        # the command area and cursor sprite stay in window coordinates
+        gl.glPushMatrix()
+        gl.glMultMatrixf((gl.GLfloat * 16)(*affine4f(self.viewport.matrix).flat))
+
+        self.draw_grid()
+        self.renderer.set_level(self.viewport.level)
+        self.renderer.draw(self.viewport.visible_rect())
+
+        gl.glPopMatrix()
+
+        # the cursor's position is in the world, like the points it edits
+        self.cursor.place(self.viewport)
         self.batch.draw()
 
 
+    def draw_grid(self):
+        grid, viewport = self.grid, self.viewport
+
+        if not grid.shown(viewport.zoom):
+            return
+
+        # the lines run out to whole cells, so they are rebuilt only when the
+        # view reaches another cell or the grid changes
+        rect = grid.cover(viewport.visible_rect())
+        key = (grid.spacing, rect, tuple(grid.color))
+
+        if key != self.grid_key:
+            points = grid.lines(rect)
+
+            self.grid_lines.clear()
+            self.grid_lines.extend(points, np.tile(grid.color, (len(points), 1)))
+            self.grid_key = key
+
+        self.grid_lines.draw(gl.GL_LINES)
+
+
+    def on_close(self):
+        self.render_worker.close()
+        super(VIctorApp, self).on_close()
+
+
     def is_normal_mode(self):
         return self.mode == vmode.NORMAL
 
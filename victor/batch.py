@@ -0,0 +1,160 @@
+"""
+Process many documents at once, spread over a pool of processes.
+
+Each document is opened in an Editor of its own, the batch's script runs
+against it (see victor.script), and the result is written to the output
+directory with the batch's extension: .svg to export, .png to rasterize,
+anything else for a VIctor document. Documents found in a directory keep
+their path below it, so in/a/x.svg and in/b/x.svg become out/a/x.svg and
+out/b/x.svg; a batch whose outputs would collide with each other or with
+a document is refused before anything is written. A script of
+
+    :simplify 2
+
+with a .victor extension simplifies a directory of drawings.
+
+Documents are handed to the workers chunksize at a time, which saves a
+round trip per document when they are small. The workers write their
+outputs themselves and send back only a short result per document, which
+run_batch() yields as it arrives, so memory stays flat however many
+documents there are. Results therefore arrive in the order documents
+finish, not the order they were given.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+
+# script sets up pyglet to need no display, so it comes first
+from victor.script import run_script, write_output
+
+import victor.svg as svg
+
+from victor.editor import Editor
+from victor.exceptions import CommandError
+
+__all__ = [
+    'find_documents',
+    'output_name',
+    'process_document',
+    'run_batch',
+]
+
+EXTENSIONS = ('.svg', '.victor')
+
+
+def find_documents(paths, extensions=EXTENSIONS):
+    """
+    (source, name) for the files named in paths, and for those below the
+    directories named in paths whose extension is one of extensions, in a
+    stable order. name is the file's path below its directory, or its base
+    name for a file given directly.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, os.path.basename(path)
+            continue
+
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+
+            for filename in sorted(filenames):
+                if filename.lower().endswith(extensions):
+                    source = os.path.join(directory, filename)
+                    yield source, os.path.relpath(source, path)
+
+
+def output_name(name, output_dir, extension):
+    return os.path.join(output_dir, os.path.splitext(name)[0] + extension)
+
+
+def _check_outputs(jobs):
+    """
+    Raise CommandError if two documents would be written to the same file,
+    or one would be written over a document.
+    """
+    key = lambda path: os.path.normcase(os.path.realpath(path))
+
+    sources = { key(source) : source for source, output in jobs }
+    outputs = { }
+
+    for i, (source, output) in enumerate(jobs):
+        j = outputs.setdefault(key(output), i)
+
+        if j != i:
+            raise CommandError('{} and {} would both be written to {}'.format(jobs[j][0], source, output))
+
+        if key(output) in sources:
+            raise CommandError('{} would be written over {}'.format(source, sources[key(output)]))
+
+
+def process_document(source, output, script=(), size=1024):
+    """
+    Open source, run the script lines against it and write the result to
+    output. Returns (source, output, seconds, error), error being None or
+    the message of what went wrong.
+    """
+    start = time.perf_counter()
+    error = None
+
+    try:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        editor = Editor()
+
+        if source.lower().endswith('.svg'):
+            editor.set_document(svg.read(source))
+        else:
+            editor.edit_document(source)
+
+        run_script(editor, script)
+        write_output(editor, output, size)
+
+    except Exception as e:
+        # one bad document must not end the batch
+        error = str(e) or type(e).__name__
+
+    return source, output, time.perf_counter() - start, error
+
+
+_worker = None
+
+
+def _start_worker(script, size):
+    global _worker
+    _worker = (script, size)
+
+
+def _process_worker_document(job):
+    script, size = _worker
+    return process_document(job[0], job[1], script, size)
+
+
+def _run(jobs, script, processes, chunksize, size):
+    if processes <= 1:
+        for source, output in jobs:
+            yield process_document(source, output, script, size)
+        return
+
+    if chunksize is None:
+        # as Pool.map does: about four chunks per worker
+        chunksize = max(1, int(math.ceil(len(jobs) / (4. * processes))))
+
+    with multiprocessing.Pool(processes, _start_worker, (script, size)) as pool:
+        yield from pool.imap_unordered(_process_worker_document, jobs, chunksize)
+
+
+def run_batch(documents, output_dir, extension='.svg', script=(), processes=1, chunksize=None, size=1024):
+    """
+    Process every (source, name) in documents, as find_documents() yields
+    them, writing the outputs below output_dir, over processes worker
+    processes given chunksize documents at a time. Returns an iterator of
+    the process_document() result of each document as it finishes.
+
+    Raises CommandError, before any document is processed, if outputs
+    would collide.
+    """
+    jobs = [ (source, output_name(name, output_dir, extension)) for source, name in documents ]
+    _check_outputs(jobs)
+
+    return _run(jobs, list(script), processes, chunksize, size)
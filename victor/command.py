@@ -1,22 +1,30 @@
 __all__ = [
     'CommandError',
-    'register_ex_command',
-    'run_ex_command',
+    'ExCommands',
 ];
 
-from exceptions import CommandError
+from victor.exceptions import CommandError
 
-ex_commands = { };
+class ExCommands(object):
+    """
+    The ex commands of one editor: names mapped to functions taking the
+    command's arguments as strings.
+    """
+    def __init__(self):
+        self.commands = { };
 
-def run_ex_command(command_line):
-    tokens = command_line[1:].split();
+    def register(self, command, f):
+        self.commands[command] = f;
 
-    f = ex_commands.get(tokens[0], None);
+    def run(self, command_line):
+        tokens = command_line.lstrip(':').split();
 
-    if f is None:
-        raise CommandError('unable to find command {}'.format(tokens[0]));
+        if not tokens:
+            return None;
 
-    return f(*tokens[1:]);
+        f = self.commands.get(tokens[0], None);
 
-def register_ex_command(command, f):
-    ex_commands[command] = f;
+        if f is None:
+            raise CommandError('unable to find command {}'.format(tokens[0]));
+
+        return f(*tokens[1:]);
@@ -1,7 +1,14 @@
 import pyglet
 
 class Cursor(pyglet.sprite.Sprite):
+    """
+    The cursor sprite. position is the cursor's point in the world, where
+    normal mode moves and edits; place() puts the sprite over that point in
+    window coordinates for the current view.
+    """
     def __init__(self, x, y, batch):
+        self.world = (x, y)
+
         image = pyglet.resource.image("cursor.png")
         image.anchor_x = image.width//2 + 1
         image.anchor_y = image.height//2
@@ -9,9 +16,12 @@ class Cursor(pyglet.sprite.Sprite):
         super(Cursor, self).__init__(image, x=x, y=y, batch=batch)
 
     def get_position(self):
-        return (self.x, self.y);
+        return self.world;
 
     def set_position(self, p):
-        self.x, self.y = p;
+        self.world = p;
 
     position = property(get_position, set_position);
+
+    def place(self, viewport):
+        self.x, self.y = viewport.to_window(self.world);
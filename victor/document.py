@@ -0,0 +1,189 @@
+"""
+VIctor's native document format.
+
+A document file is
+
+    magic     8 bytes, b'VICTDOC' and a format version byte
+    size      little endian u64, the size of the header
+    header    a scene_codec encoded dict describing the tree and the marks
+    padding   zeros up to a multiple of 64 bytes
+    data      little endian float64 columns
+
+The header holds everything but the points: groups with their transforms,
+paths with their color, bounds, point count and the offset of their columns
+in the data block, in float64 elements. Each path's columns are stored back
+to back, the n parameters followed by the n x 2 positions, so load() can
+np.memmap the data block and hand paths views of it: opening a document
+reads the header only, and points are paged in as they are drawn.
+
+Paths loaded this way share the read-only mapping until they grow, when
+Path copies them into memory. save() writes to a temporary file and renames
+it over the destination, so saving over the document that is mapped stays
+safe.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+from victor.exceptions import DocumentError
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.scene_codec import decode, encode
+
+__all__ = [
+    'load',
+    'save',
+]
+
+MAGIC = b'VICTDOC'
+VERSION = 1
+
+ALIGNMENT = 64
+
+_u64 = struct.Struct('<Q')
+_column = np.dtype('<f8')
+
+# what a malformed header raises while it is decoded and built
+_malformed = (AttributeError, IndexError, KeyError, TypeError, ValueError, struct.error)
+
+
+def _describe(group, columns):
+    """
+    The header entry for group; appends the columns of its paths to columns
+    as (offset, parameters, positions) triples.
+    """
+    children = [ ]
+
+    for child in group.children:
+        if isinstance(child, PathGroup):
+            children.append(_describe(child, columns))
+            continue
+
+        offset = columns[-1][0] + 3 * len(columns[-1][1]) if columns else 0
+        columns.append((offset, child.parameters, child.approximate()))
+
+        children.append({
+            'type' : 'path',
+            'color' : [ int(c) for c in child.color ],
+            'bounds' : np.array(child.bounds, dtype=_column),
+            'count' : len(child),
+            'offset' : offset,
+        })
+
+    return {
+        'type' : 'group',
+        'transform' : np.array(group.transform, dtype=_column),
+        'children' : children,
+    }
+
+
+def _data_offset(header_size):
+    offset = len(MAGIC) + 1 + _u64.size + header_size
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save(filename, root, marks=None):
+    """
+    Write the tree below root, and optionally a dict of marks, to filename.
+    """
+    columns = [ ]
+
+    header = encode({
+        'root' : _describe(root, columns),
+        'marks' : { str(name) : [ float(x) for x in pos ] for name, pos in (marks or { }).items() },
+    })
+
+    offset = _data_offset(len(header))
+    temp = '{}.{}.tmp'.format(filename, os.getpid())
+
+    try:
+        with open(temp, 'wb') as fd:
+            fd.write(MAGIC + bytes([ VERSION ]))
+            fd.write(_u64.pack(len(header)))
+            fd.write(header)
+            fd.write(bytes(offset - fd.tell()))
+
+            for _, ts, positions in columns:
+                fd.write(np.ascontiguousarray(ts, dtype=_column).data)
+                fd.write(np.ascontiguousarray(positions, dtype=_column).data)
+
+        os.replace(temp, filename)
+
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def _build(entry, group, data):
+    group.transform = entry['transform']
+
+    for child in entry['children']:
+        if child['type'] == 'group':
+            _build(child, group.append_group(), data)
+            continue
+
+        count, offset = child['count'], child['offset']
+
+        # a path always has a point, and its columns lie inside the data
+        if count < 1 or offset < 0 or offset + 3 * count > len(data):
+            raise DocumentError('bad path of {} points at {}'.format(count, offset))
+
+        path = Path.from_columns(
+            data[offset:offset + count],
+            data[offset + count:offset + 3 * count].reshape(count, 2),
+            tuple(child['color']),
+            child['bounds'],
+        )
+
+        group.append_path(path)
+
+
+def load(filename):
+    """
+    Open a document written by save(). Returns the root PathGroup and a dict
+    of marks; the points stay in the file until they are read.
+    """
+    with open(filename, 'rb') as fd:
+        magic = fd.read(len(MAGIC) + 1)
+
+        if magic[:len(MAGIC)] != MAGIC:
+            raise DocumentError('not a VIctor document')
+
+        if magic[len(MAGIC):] != bytes([ VERSION ]):
+            raise DocumentError('unsupported document version {}'.format(magic[-1]))
+
+        size = fd.read(_u64.size)
+        if len(size) != _u64.size:
+            raise DocumentError('truncated header')
+
+        size, = _u64.unpack(size)
+        header = fd.read(size)
+
+        if len(header) != size:
+            raise DocumentError('truncated header')
+
+        try:
+            header = decode(header)
+        except _malformed as e:
+            raise DocumentError('bad header: {}'.format(e))
+
+        offset = _data_offset(size)
+        length = (os.fstat(fd.fileno()).st_size - offset) // _column.itemsize
+
+    if length > 0:
+        data = np.memmap(filename, dtype=_column, mode='r', offset=offset, shape=(length,))
+    else:
+        data = np.zeros(0, dtype=_column)
+
+    root = PathGroup()
+
+    try:
+        _build(header['root'], root, data)
+        marks = { name : tuple(pos) for name, pos in header.get('marks', { }).items() }
+    except _malformed as e:
+        raise DocumentError('bad document: {}'.format(e))
+
+    return root, marks
@@ -0,0 +1,261 @@
+import contextlib
+import time
+
+import numpy as np
+
+import victor.document as document
+import victor.mode as vmode
+import victor.normal_dispatcher as vnd
+import victor.svg as svg
+
+from victor.command import CommandError, ExCommands
+from victor.exceptions import DocumentError
+from victor.lod import douglas_peucker, tolerance
+from victor.macro import Macros, QuietCursor, QuietKeystrokes
+from victor.movement_grid import MovementGrid
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.spatial_index import SpatialIndex
+from victor.viewport import Viewport
+
+__all__ = [ 'Editor', 'simplified' ]
+
+
+def simplified(group, level):
+    """
+    A copy of the tree below group with every path simplified to a level of
+    detail (see victor.lod).
+    """
+    copy = PathGroup()
+    copy.transform = group.transform
+
+    for child in group.children:
+        if isinstance(child, PathGroup):
+            copy.append_group(simplified(child, level))
+            continue
+
+        positions = child.positions[:len(child)]
+        keep = douglas_peucker(positions, tolerance(level)) if level > 0 else np.arange(len(child))
+
+        copy.append_path(Path.from_columns(child.ts[keep], positions[keep], child.color))
+
+    return copy
+
+
+class Editor(object):
+    """
+    The document being edited and everything normal mode handlers and ex
+    commands act on: cursor, marks, grid, view, options, registers.
+
+    An Editor needs no window or display. Its cursor and keystroke display
+    are plain stand-ins, which VIctorApp replaces with sprites and text by
+    overriding setup_cursor() and setup_keystrokes(). Each editor has its
+    own ex commands, so several can live in one process.
+    """
+
+    def __init__(self, width=512, height=512):
+        self.window_shape = (width, height)
+        self.set_default_options()
+
+        self.mode = vmode.NORMAL
+        self.down_action = None
+        self.current_multiplier = None
+        self.time = time.time()
+
+        self.setup_cursor()
+        self.setup_keystrokes()
+        self.viewport = Viewport(width, height)
+
+        self.normal_dispatcher = vnd.construct_dispatcher(self)
+        self.macros = Macros(self.normal_dispatcher, self.replaying)
+
+        self.ex_commands = ExCommands()
+        self.set_ex_commands()
+
+        self.filename = None
+        self.set_document(PathGroup())
+
+
+    def setup_cursor(self):
+        self.cursor = QuietCursor((320, 200))
+
+        self.grid = MovementGrid(
+            self.window_shape[0],
+            self.window_shape[1],
+            self.options['gridcolor']
+        )
+
+
+    def setup_keystrokes(self):
+        self.keystrokes = QuietKeystrokes()
+
+
+    def set_default_options(self):
+        self.options = {}
+        self.options["color"] = (0, 0, 0, 255)
+        self.options["gridcolor"] = (0, 0, 255, 50)
+
+
+    def set_ex_commands(self):
+        register = self.ex_commands.register
+
+        register('marks', self.show_marks)
+        register('set', self.set_option)
+        register('w', self.write_document)
+        register('e', self.edit_document)
+        register('export', self.export_svg)
+        register('import', self.import_svg)
+        register('simplify', self.simplify_document)
+
+
+    def run_ex_command(self, command_line):
+        return self.ex_commands.run(command_line)
+
+
+    def dispatch(self, event):
+        """
+        Send a NormalEvent through the macro recorder to the dispatcher.
+        Returns whether the dispatcher's state wants timer events.
+        """
+        self.time = time.time()
+        return self.macros.dispatch(event)
+
+
+    def switch_to_ex_mode(self):
+        self.mode = vmode.EX
+
+
+    def dispatch_both(self):
+        if self.down_action is None: return
+
+        self.down_action()
+        self.down_action = None
+
+
+    @contextlib.contextmanager
+    def replaying(self):
+        """
+        Hold back updates of the cursor and the keystroke display while a
+        macro replays, applying the last of each when it ends.
+        """
+        cursor, keystrokes = self.cursor, self.keystrokes
+        self.cursor = QuietCursor(cursor.position)
+        self.keystrokes = QuietKeystrokes(keystrokes)
+
+        try:
+            yield
+        finally:
+            quiet_cursor, quiet_keystrokes = self.cursor, self.keystrokes
+            self.cursor, self.keystrokes = cursor, keystrokes
+
+            cursor.position = quiet_cursor.position
+            quiet_keystrokes.apply(keystrokes, self.time)
+
+
+    def current_position(self):
+        return tuple(self.cursor.position)
+
+
+    def set_document(self, groups, marks=()):
+        """
+        Make the tree below groups the document being edited, with a new
+        spatial index. The index is built on its first query, so documents
+        open without visiting their points.
+        """
+        self.groups = self.current_group = groups
+        self.current_path = None
+
+        self.spatial_index = SpatialIndex(self.window_shape[0])
+        self.spatial_index.stale[groups] = None
+        self.marks = self.spatial_index.marks
+        self.marks.update(marks)
+
+        groups.listeners.append(self.spatial_index)
+
+
+    def write_document(self, *args):
+        if len(args) > 1:
+            raise CommandError("w takes at most one file name")
+
+        filename = args[0] if args else self.filename
+        if filename is None:
+            raise CommandError("No file name")
+
+        try:
+            document.save(filename, self.groups, self.marks)
+        except OSError as e:
+            raise CommandError("Unable to write {}: {}".format(filename, e))
+
+        self.filename = filename
+
+
+    def edit_document(self, *args):
+        if len(args) != 1:
+            raise CommandError("e requires a file name")
+
+        filename = args[0]
+
+        try:
+            groups, marks = document.load(filename)
+        except (OSError, DocumentError) as e:
+            raise CommandError("Unable to open {}: {}".format(filename, e))
+
+        self.set_document(groups, marks)
+        self.filename = filename
+
+
+    def export_svg(self, *args):
+        if len(args) != 1:
+            raise CommandError("export requires a file name")
+
+        try:
+            svg.write(args[0], self.groups)
+        except OSError as e:
+            raise CommandError("Unable to write {}: {}".format(args[0], e))
+
+
+    def import_svg(self, *args):
+        if len(args) != 1:
+            raise CommandError("import requires a file name")
+
+        try:
+            group = svg.read(args[0])
+        except (OSError, DocumentError) as e:
+            raise CommandError("Unable to import {}: {}".format(args[0], e))
+
+        # added whole, so listeners hear about it once
+        self.current_group.append_group(group)
+
+
+    def simplify_document(self, *args):
+        if len(args) != 1:
+            raise CommandError("simplify requires a level")
+
+        try:
+            level = int(args[0])
+        except ValueError:
+            raise CommandError("simplify level must be a number")
+
+        self.set_document(simplified(self.groups, level), self.marks)
+
+
+    def show_marks(self, *args):
+        for key, value in sorted(self.marks.items()):
+            print(key, value)
+
+
+    def set_option(self, *args):
+        if len(args) < 2:
+            raise CommandError("No option specified")
+
+        option = args[0]
+        if option == "color":
+            if len(args) != 5:
+                raise CommandError("color must have 4 arguments")
+            self.options["color"] = tuple(map(int, args[1:]))
+        elif option == "gridcolor":
+            pass
+
+
+    def error(self, *args):
+        print(args)
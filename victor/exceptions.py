@@ -1,6 +1,24 @@
 __all__ = [
     'CommandError',
+    'DocumentError',
+    'RenderCancelled',
+    'RenderError',
+    'ScriptError',
 ]
 
 class CommandError(Exception):
     pass
+
+class DocumentError(Exception):
+    pass
+
+class RenderError(Exception):
+    pass
+
+class RenderCancelled(RenderError):
+    pass
+
+class ScriptError(CommandError):
+    def __init__(self, line, message):
+        super(ScriptError, self).__init__('{}: {}'.format(line, message))
+        self.line = line
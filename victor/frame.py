@@ -0,0 +1,150 @@
+import ctypes
+import mmap
+import os
+import struct
+
+__all__ = [
+    'FrameReader',
+    'FrameWriter',
+    'RawFrame',
+]
+
+
+class RawFrame(object):
+    """
+    Uncompressed 8-bit RGBA pixels, top row first.
+
+    data is any buffer of width * height * 4 bytes and is never copied by the
+    frame itself. to_bytes() gives a self-describing encoding that
+    from_bytes() recognizes, so raw frames can sit next to encoded images in a
+    RenderCache.
+    """
+
+    magic = b'VRAW'
+    header = struct.Struct('<4sII')
+
+    def __init__(self, width, height, data):
+        self.width = width
+        self.height = height
+        self.data = data
+
+
+    @property
+    def size(self):
+        return 4 * self.width * self.height
+
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        Wrap a C contiguous (height, width, 4) uint8 array.
+        """
+        height, width = array.shape[:2]
+        return cls(width, height, memoryview(array).cast('B'))
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(cls.magic)] != cls.magic:
+            return None
+
+        _, width, height = cls.header.unpack_from(data)
+        return cls(width, height, memoryview(data)[cls.header.size:])
+
+
+    def to_bytes(self):
+        return self.header.pack(self.magic, self.width, self.height) + bytes(self.data[:self.size])
+
+
+    def pixels(self):
+        """
+        The pixels as something pyglet.image.ImageData accepts, sharing
+        memory with data whenever data is writable.
+        """
+        view = memoryview(self.data)
+
+        if view.readonly:
+            return view[:self.size].tobytes()
+
+        return (ctypes.c_ubyte * self.size).from_buffer(view)
+
+
+class FrameWriter(object):
+    """
+    Writes frames into memory mapped files in directory, cycling through
+    `slots` files so a frame is not overwritten while the reader may still be
+    looking at the previous one.
+
+    Each slot's file stays mapped between frames of the same size. A frame
+    of another size gets a new file: the old map is closed and the old file
+    unlinked rather than resized, so a reader still mapping it keeps valid
+    memory instead of faulting on pages cut off the end.
+    """
+
+    def __init__(self, directory, slots=2):
+        self.directory = directory
+        self.slots = slots
+        self.slot = 0
+        self.maps = [ None ] * slots
+
+
+    def write(self, frame):
+        slot = self.slot
+        name = 'frame-{}'.format(slot)
+        self.slot = (slot + 1) % self.slots
+
+        mapped = self.maps[slot]
+
+        if mapped is None or len(mapped) != frame.size:
+            if mapped is not None:
+                mapped.close()
+
+            mapped = self.maps[slot] = self._map(name, frame.size)
+
+        mapped[:] = memoryview(frame.data)[:frame.size]
+
+        return name
+
+
+    def _map(self, name, size):
+        path = os.path.join(self.directory, name)
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+
+        try:
+            os.ftruncate(fd, size)
+            return mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+
+    def close(self):
+        for mapped in self.maps:
+            if mapped is not None:
+                mapped.close()
+
+        self.maps = [ None ] * self.slots
+
+
+class FrameReader(object):
+    """
+    Maps frames written by a FrameWriter; the returned frames share memory
+    with the files instead of reading them.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+
+    def read(self, name, width, height):
+        size = 4 * width * height
+
+        with open(os.path.join(self.directory, name), 'r+b') as fd:
+            mapped = mmap.mmap(fd.fileno(), size)
+
+        return RawFrame(width, height, memoryview(mapped))
@@ -0,0 +1,74 @@
+"""
+Levels of detail for polylines.
+
+Level 0 is full detail. Level l drops the points that lie within
+tolerance(l) = base_tolerance * 2 ** l world units of the simplified line,
+which is less than half a pixel whenever the view's zoom is at most 2 ** -l;
+level_for_zoom() picks the coarsest such level.
+"""
+
+import math
+
+import numpy as np
+
+__all__ = [
+    'douglas_peucker',
+    'level_for_zoom',
+    'tolerance',
+]
+
+base_tolerance = .5
+
+
+def tolerance(level):
+    return base_tolerance * 2. ** level
+
+
+def level_for_zoom(zoom):
+    return max(0, int(math.floor(-math.log2(zoom))))
+
+
+def _segment_distances(points, a, b):
+    d = b - a
+    length = d.dot(d)
+
+    if length:
+        t = np.clip((points - a).dot(d) / length, 0., 1.)
+        nearest = a + t[:, None] * d
+    else:
+        nearest = a
+
+    return np.hypot(*(points - nearest).T)
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Indices of the points of an (N, 2) polyline that Douglas-Peucker keeps
+    at tolerance; the first and last points are always kept. The spans are
+    processed from a stack, so there is no recursion limit, and the
+    distances within a span are computed in one NumPy call.
+    """
+    count = len(points)
+    if count <= 2:
+        return np.arange(count)
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    spans = [ (0, count - 1) ]
+
+    while spans:
+        a, b = spans.pop()
+        if b - a < 2:
+            continue
+
+        distances = _segment_distances(points[a + 1:b], points[a], points[b])
+        i = int(np.argmax(distances))
+
+        if distances[i] > tolerance:
+            middle = a + 1 + i
+            keep[middle] = True
+            spans.append((a, middle))
+            spans.append((middle, b))
+
+    return np.flatnonzero(keep)
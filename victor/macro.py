@@ -0,0 +1,147 @@
+"""
+Recording and replay of normal mode events.
+
+Macros sits between the app and the dispatcher returned by
+construct_dispatcher(). While a register is being recorded, every event
+sent through dispatch() is appended to it, timer ticks excepted, as replay
+does not wait for them. NormalEvents are interned, so a register is just a
+list of shared instances.
+
+Replaying a register sends its events straight into the dispatcher, count
+times over. The dispatcher is busy handling the event that asked for the
+replay, so the request is only noted then and carried out once that event
+has been handled. Replays within replays run inline, up to max_depth deep,
+which stops a macro that replays itself.
+
+The app's visible side effects are coalesced while a replay runs: quiet, a
+context manager given to Macros, swaps in QuietCursor and QuietKeystrokes
+stand-ins, and the real cursor and keystroke display are updated once,
+when the replay ends.
+"""
+
+import contextlib
+
+from victor.normal_dispatcher import TIMER_EVENT
+
+__all__ = [
+    'Macros',
+    'QuietCursor',
+    'QuietKeystrokes',
+]
+
+
+class Macros(object):
+    max_depth = 100
+
+    def __init__(self, dispatcher, quiet=None):
+        self.send = dispatcher.send
+        self.quiet = quiet or contextlib.nullcontext
+
+        self.registers = { }
+        self.recording = None
+        self.pending = None
+        self.depth = 0
+
+
+    def start(self, register):
+        self.recording = register
+        self.events = self.registers[register] = [ ]
+
+
+    def stop(self):
+        """
+        Stop recording, leaving out the event that asked to stop.
+        """
+        if self.recording is None:
+            return
+
+        if self.events:
+            self.events.pop()
+
+        self.recording = self.events = None
+
+
+    def request(self, register, count=1):
+        self.pending = (register, count)
+
+
+    def dispatch(self, event):
+        """
+        Record event when recording, send it to the dispatcher and carry out
+        any replay it requested. Returns what the dispatcher yielded.
+        """
+        if self.recording is not None and event is not TIMER_EVENT:
+            self.events.append(event)
+
+        result = self.send(event)
+
+        if self.pending is not None:
+            result = self.replay()
+
+        return result
+
+
+    def replay(self):
+        register, count = self.pending
+        self.pending = None
+
+        events = self.registers.get(register)
+        if not events or self.depth >= self.max_depth:
+            return None
+
+        send = self.send
+        result = None
+
+        self.depth += 1
+
+        try:
+            with self.quiet() if self.depth == 1 else contextlib.nullcontext():
+                for _ in range(count):
+                    for event in events:
+                        result = send(event)
+
+                        if self.pending is not None:
+                            result = self.replay()
+        finally:
+            self.depth -= 1
+
+        return result
+
+
+class QuietCursor(object):
+    """
+    Stands in for the cursor sprite during a replay, or without a display.
+    """
+    def __init__(self, position):
+        self.position = position
+
+
+class QuietKeystrokes(object):
+    """
+    Stands in for the keystroke display during a replay, or without a
+    display, remembering the clearing it was asked for.
+    """
+    def __init__(self, keystrokes=None):
+        self.is_clear_pending = False
+        self.clear_time = 0
+        self.clear_delay = 1.0
+
+        if keystrokes is not None:
+            self.is_clear_pending = keystrokes.is_clear_pending
+            self.clear_time = keystrokes.clear_time
+            self.clear_delay = keystrokes.clear_delay
+
+
+    def set_clear_time(self, time):
+        self.is_clear_pending = True
+        self.clear_time = time + self.clear_delay
+
+
+    def clear_text(self, time=None):
+        pass
+
+
+    def apply(self, keystrokes, time):
+        keystrokes.is_clear_pending = self.is_clear_pending
+        keystrokes.clear_time = self.clear_time
+        keystrokes.clear_text(time)
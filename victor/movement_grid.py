@@ -1,167 +1,147 @@
-from itertools import chain
+import math
 
-import array
 import numpy as np
 
-from PyQt5.QtGui import (
-    QMatrix4x4,
-)
-
 __all__ = [ 'MovementGrid' ]
 
 scales = (1, 5, 10, 20, 40, 80)
 
+# grid lines closer than this many pixels would fill the window
+min_spacing = 4.
+
 
 class MovementGrid(object):
-    def __init__(self, width, height, color = (127, 127, 127 , 127)):  
+    """
+    The grid the cursor snaps to. It holds no geometry: the window draws it
+    procedurally from spacing and color, so scaling and resizing cost
+    nothing but a redraw. Windows without shaders draw lines() instead.
+    """
+
+    def __init__(self, width, height, color = (127, 127, 127 , 127)):
         self.width = width
         self.height = height
 
         self.scale = 3
         self.visible = True
+        self.color = color
 
-        c = np.array(color, dtype=np.float32)
-        self.color = array.array('f')
-        c.frombytes(c.tobytes())
 
-        self.program = None
-        self.shader_indices = None
+    @property
+    def spacing(self):
+        return scales[self.scale]
 
 
-    def compile_program(self):
-        if self.program:
-            return
+    def resize(self, width, height):
+        self.width, self.height = width, height
 
-        self.program = program = QOpenGLShaderProgram(self)
 
-        program.addShaderFromSourceCode(
-            QOpenGLShader.Vertex,
-            r'''
-                uniform   highp mat4 xform;
-                attribute highp vec4 position;
+    def toggle_visibility(self):
+        if self.scale == 0:
+            self.scale_up()
+        elif self.scale == 1:
+            self.scale_down()
+        else:
+            self.visible = not self.visible
 
-                void main() {
-                    gl_Position = xform * position;
-                }
-            '''
-        )
 
-        program.addShaderFromSourceCode(
-            QOpenGLShader.Fragment,
-            r'''
-                uniform lowp vec4 color;
+    def scale_up(self):
+        self.scale = min(self.scale + 1, len(scales) - 1)
 
-                void main() {
-                    gl_FragColor = color;
-                }
-            '''
-        )
+        if self.scale >= 1 and not self.visible:
+            self.visible = True
 
-        program.link()
 
-        self.shader_indices = indices = {  }
+    def scale_down(self):
+        self.scale = max(self.scale - 1, 0)
 
-        indices['xform']    = program.uniformLocation('xform')
-        indices['position'] = program.attributeLocation('position')
-        indices['color']    = program.uniformLocation('color')
+        if self.scale < 1 and self.visible:
+            self.visible = False
 
-    
-    def generate_vertices(self):
-        if self.vertices:
-            return
 
-        scale = scales[self.scale]
+    def snap(self, points):
+        """
+        Snap a point, or an (N, 2) array of points, down and left onto the
+        grid.
+        """
+        scale = self.spacing
+        return scale * (np.asarray(points) // scale)
 
-        v = [ ]
 
-        for i in range(scale, self.width, scale):
-            v.append((i, -scale, 0, 1))
-            v.append((i, self.height + scale, 0, 1))
+    def move(self, points, dx, dy, multiplier=1):
+        """
+        Move a point, or an (N, 2) array of points, multiplier grid steps in
+        the direction (dx, dy), each component -1, 0 or 1, and snap the
+        results. multiplier may be a scalar or one value per point.
 
-        for j in range(scale, self.height, scale):
-            v.append((-scale, j, 0, 1))
-            v.append((self.width + scale, j, 0, 1))
+        Moving backwards first steps just off the current line so that a
+        point already on the grid lands on the previous line.
+        """
+        scale = self.spacing
+        multiplier = np.asarray(multiplier, dtype=np.float64)
 
-        v = np.array(v, np.float32)
+        forward = scale * multiplier
+        backward = -(.01 + scale * (multiplier - 1))
 
-        self.vertices = vertices = array.array('f')
-        vertices.frombytes(v.tobytes())
+        step = np.zeros(multiplier.shape + (2,))
 
+        for axis, d in ((0, dx), (1, dy)):
+            if d > 0: step[..., axis] = forward
+            elif d < 0: step[..., axis] = backward
 
-    def render(self, gl):
-        if not self.visible:
-            return
+        return self.snap(np.asarray(points) + step)
 
-        self.generate_vertices()
-        self.compile_program()
 
-        self.program.bind()
+    clamp_left_down = snap
 
-        matrix = QMatrix4x4()
 
-        matrix.ortho(-width, width, -height, height, .1, 100.)
-        matrix.translate(0, 0, -3)
+    def shown(self, zoom):
+        """
+        Whether the grid is drawn at zoom window pixels per world unit.
+        """
+        return self.visible and self.spacing * zoom >= min_spacing
 
-        indices = self.indices
 
-        gl.setUniformValue(indices['matrix'], matrix)
-        gl.setUniformValue(indices['color'], self.color)
+    def cover(self, rect):
+        """
+        rect, a world (x0, y0, x1, y1) box, grown out to whole grid cells.
+        """
+        scale = self.spacing
+        x0, y0, x1, y1 = rect
 
-        gl.glVertexAttribPointer(
-            indices['position'], 4, gl.GL_FLOAT,
-            False, 0, self.vertices
+        return (
+            scale * math.floor(x0 / scale), scale * math.floor(y0 / scale),
+            scale * math.ceil(x1 / scale), scale * math.ceil(y1 / scale),
         )
 
-        self.program.release()
 
+    def lines(self, rect):
+        """
+        The grid lines crossing rect, a world (x0, y0, x1, y1) box, as a
+        (2N, 2) array of GL_LINES endpoints.
+        """
+        x0, y0, x1, y1 = rect
+        scale = self.spacing
 
-    def toggle_visibility(self):
-        if self.scale == 0:
-            self.scale_up()
-        elif self.scale == 1:
-            self.scale_down()
-        else:
-            self.visible = not self.visible
-
-
-    def scale_up(self):
-        self.scale = min(self.scale + 1, len(scales) - 1)
-
-        if self.scale >= 1 and not self.visible:
-            self.visible = True
-
-        self.vertices = None
-
-
-    def scale_down(self):
-        self.scale = max(self.scale - 1, 0)
-
-        if self.scale < 1 and self.visible:
-            self.visible = False
-
-        self.vertices = None
+        xs = scale * np.arange(np.ceil(x0 / scale), np.floor(x1 / scale) + 1)
+        ys = scale * np.arange(np.ceil(y0 / scale), np.floor(y1 / scale) + 1)
 
+        vertical = np.column_stack([ np.repeat(xs, 2), np.tile([ y0, y1 ], len(xs)) ])
+        horizontal = np.column_stack([ np.tile([ x0, x1 ], len(ys)), np.repeat(ys, 2) ])
 
-    def clamp_left_down(self, pos):
-        scale = scales[self.scale]
-        return scale * (pos // scale)
+        return np.concatenate([ vertical, horizontal ])
 
 
     def up(self, pos, multiplier=1):
-        scale = scales[self.scale]
-        return self.clamp_left_down(pos + vec2f(0., scale * multiplier))
+        return self.move(pos, 0, 1, multiplier)
 
 
     def right(self, pos, multiplier=1):
-        scale = scales[self.scale]
-        return self.clamp_left_down(pos + vec2f(scale * multiplier, 0))
+        return self.move(pos, 1, 0, multiplier)
 
 
     def left(self, pos, multiplier=1):
-        scale = scales[self.scale]
-        return self.clamp_left_down(pos - vec2f(.01 + scale*(multiplier - 1), 0))
+        return self.move(pos, -1, 0, multiplier)
 
 
     def down(self, pos, multiplier=1):
-        scale = scales[self.scale]
-        return self.clamp_left_down(pos - vec2f(0, .01 + scale*(multiplier - 1)))
+        return self.move(pos, 0, -1, multiplier)
@@ -5,10 +5,13 @@ from victor import path
 
 __all__ = [
     'construct_dispatcher',
+    'ESCAPE_EVENT',
     'NormalEvent',
     'ON_KEY_PRESS',
     'ON_KEY_RELEASE',
+    'TIMER_EVENT',
     'TIMER_FIRE',
+    'WANTS_TIMER',
 ]
 
 ON_KEY_PRESS   = 0x01
@@ -17,36 +20,83 @@ TIMER_FIRE     = 0x03
 ESCAPE         = 0x04
 
 class NormalEvent(object):
-    def __init__(self, type, key=None, modifiers=0x0):
-        self.type = type
-        self.key = key
-        self.modifiers = modifiers
+    """
+    An immutable, interned normal mode event.
+
+    Constructing an event returns the one instance for its type, key and
+    modifiers, made on first use, so events compare by identity and the
+    steady stream of key repeats and timer ticks allocates nothing. Each
+    instance carries code, a small integer numbering the distinct events,
+    which indexes the dispatch table, and precomputes what default_state
+    asks of every event.
+    """
 
-        self._strip_unwanted_modifiers()
+    __slots__ = ('type', 'key', 'modifiers', 'code', 'is_modifier', 'digit')
 
-    def _strip_unwanted_modifiers(self):
-        if self.modifiers:
-            self.modifiers &= ~pkey.MOD_NUMLOCK
+    _interned = { }
+    _count = 0
 
-    def __eq__(self, other):
-        return (self.type == other.type
-                and self.key == other.key
-                and self.modifiers == other.modifiers)
+    def __new__(cls, type, key=None, modifiers=0x0):
+        if modifiers:
+            modifiers &= ~pkey.MOD_NUMLOCK
 
-    def __hash__(self):
-        return hash((self.type, self.key, self.modifiers))
+        try:
+            return cls._interned[type, key, modifiers]
+        except KeyError:
+            pass
 
+        event = object.__new__(cls)
+        set = object.__setattr__
 
-def init_state(gen, app, event):
+        set(event, 'type', type)
+        set(event, 'key', key)
+        set(event, 'modifiers', modifiers)
+        set(event, 'code', cls._count)
+        set(event, 'is_modifier', key in modifier_keys)
+        set(event, 'digit', digit_keys.get(key)
+            if type == ON_KEY_PRESS and not modifiers else None)
+
+        cls._count += 1
+        cls._interned[type, key, modifiers] = event
+
+        return event
+
+    def __setattr__(self, name, value):
+        raise AttributeError('NormalEvent is immutable')
+
+    def __reduce__(self):
+        return NormalEvent, (self.type, self.key, self.modifiers)
+
+    def __repr__(self):
+        return 'NormalEvent({}, {}, {})'.format(self.type, self.key, self.modifiers)
+
+
+# yielded by a state that wants TIMER_FIRE events until its next yield
+WANTS_TIMER = True
+
+def start_state(gen, app, event):
+    """
+    Start a state, returning the generator, or None for a state that
+    finished at once, and what it first yielded.
+    """
     out = gen(app, event)
-    if out is None: return None
-    next(out)
-    return out
+    if out is None: return None, None
+
+    try:
+        return out, next(out)
+    except StopIteration:
+        return None, None
+
+def init_state(gen, app, event):
+    return start_state(gen, app, event)[0]
 
 def moving(app, event):
     """
     Move the cursor. Holding down the key continues movement and velocity increases
     quadratically after a short delay.
+
+    The distance moved is a function of the time the key has been held, so
+    timer events only need to arrive once per frame, whatever the frame rate.
     """
     pos = app.cursor.position
     d = event.key
@@ -64,12 +114,14 @@ def moving(app, event):
     move_cursor(jump)
     jump += 1
 
+    release = NormalEvent(ON_KEY_RELEASE, d)
+
     while True:
-        event = yield
-        if (event == NormalEvent(ON_KEY_RELEASE, d)): return
-        elif (event == NormalEvent(TIMER_FIRE,)):
+        event = yield WANTS_TIMER
+        if event is release: return
+        elif event is TIMER_EVENT:
             if app.time - time > fast_move_delay:
-                multiplier = jump + pow(((app.time - time - fast_move_delay)//delta), 2)
+                multiplier = jump + int(((app.time - time - fast_move_delay) / delta) ** 2)
                 move_cursor(multiplier)
 
 def marking(app, event):
@@ -87,6 +139,39 @@ def marking(app, event):
                 app.marks[available[event.key]] = app.cursor.position
             return
 
+register_keys = { getattr(pkey, ch.upper()) : ch for ch in 'abcdefghijklmnopqrstuvwxyz' }
+
+def record_macro(app, event):
+    """
+    q[a-z] Record normal mode events into a register, until the next q
+    """
+    if app.macros.recording is not None:
+        app.macros.stop()
+        return
+
+    while True:
+        event = yield
+
+        if event.type == ON_KEY_PRESS:
+            if event.key in register_keys:
+                app.macros.start(register_keys[event.key])
+            return
+
+def replay_macro(app, event):
+    """
+    @[a-z] Replay the events recorded in a register; a count replays them
+    that many times
+    """
+    count = app.current_multiplier or 1
+
+    while True:
+        event = yield
+
+        if event.type == ON_KEY_PRESS:
+            if event.key in register_keys:
+                app.macros.request(register_keys[event.key], count)
+            return
+
 def toggle_grid(app, event):
     """
     Toggle the visibility of the grid
@@ -100,6 +185,36 @@ def scale_grid(app, event):
     if event.modifiers & pkey.MOD_SHIFT: app.grid.scale_up()
     else: app.grid.scale_down()
 
+def zoom(app, event):
+    """
+    Zoom in about the cursor, or out with shift; a count zooms by that
+    many powers of two
+    """
+    factor = 2. ** (app.current_multiplier or 1)
+    if event.modifiers & pkey.MOD_SHIFT: factor = 1. / factor
+
+    app.viewport.zoom_by(factor, app.cursor.position)
+
+pan_directions = {
+    pkey.H: (-1, 0),
+    pkey.J: (0, -1),
+    pkey.K: (0, 1),
+    pkey.L: (1, 0),
+}
+
+def pan(app, event):
+    """
+    Ctrl-[hjkl] Pan the view by a quarter of the window
+    """
+    dx, dy = pan_directions[event.key]
+    multiplier = app.current_multiplier or 1
+    viewport = app.viewport
+
+    viewport.pan(
+        dx * multiplier * viewport.width / 4.,
+        dy * multiplier * viewport.height / 4.
+    )
+
 def start_path(app, event):
     """
     Start a new path
@@ -172,15 +287,43 @@ event_map = {
     NormalEvent(ON_KEY_PRESS, pkey.J): moving,
     NormalEvent(ON_KEY_PRESS, pkey.K): moving,
     NormalEvent(ON_KEY_PRESS, pkey.L): moving,
+    NormalEvent(ON_KEY_PRESS, pkey.H, pkey.MOD_CTRL): pan,
+    NormalEvent(ON_KEY_PRESS, pkey.J, pkey.MOD_CTRL): pan,
+    NormalEvent(ON_KEY_PRESS, pkey.K, pkey.MOD_CTRL): pan,
+    NormalEvent(ON_KEY_PRESS, pkey.L, pkey.MOD_CTRL): pan,
     NormalEvent(ON_KEY_PRESS, pkey.M): marking,
+    NormalEvent(ON_KEY_PRESS, pkey.Q): record_macro,
+    NormalEvent(ON_KEY_PRESS, pkey.AT): replay_macro,
+    NormalEvent(ON_KEY_PRESS, pkey._2, pkey.MOD_SHIFT): replay_macro,
     NormalEvent(ON_KEY_PRESS, pkey.S): scale_grid,
     NormalEvent(ON_KEY_PRESS, pkey.S, pkey.MOD_SHIFT): scale_grid,
     NormalEvent(ON_KEY_PRESS, pkey.SEMICOLON, pkey.MOD_SHIFT): switch_to_ex_mode,
+    NormalEvent(ON_KEY_PRESS, pkey.Z): zoom,
+    NormalEvent(ON_KEY_PRESS, pkey.Z, pkey.MOD_SHIFT): zoom,
 }
 
+TIMER_EVENT = NormalEvent(TIMER_FIRE)
+ESCAPE_EVENT = NormalEvent(ESCAPE)
+
+def build_dispatch_table(event_map):
+    """
+    A list of the handlers in event_map, indexed by the code of their event.
+    """
+    table = [ None ] * NormalEvent._count
+
+    for event, handler in event_map.items():
+        table[event.code] = handler
+
+    return table
+
+dispatch_table = build_dispatch_table(event_map)
+
+def lookup(event):
+    code = event.code
+    return dispatch_table[code] if code < len(dispatch_table) else None
+
 def is_digit_keypress_event(event):
-    return (event.type == ON_KEY_PRESS and event.key in digit_keys
-            and not event.modifiers)
+    return event.digit is not None
 
 def default_state(app, event):
     """
@@ -188,42 +331,45 @@ def default_state(app, event):
     ESCAPE resets the current state.
     Digits act as multipliers to be applied to the next command.
     A modifier key alone does not transition to a new state.
+    Yields whether the current state wants timer events.
     """
 
     current_state = None
+    wants_timer = False
 
     def reset():
         current_state = None
         app.keystrokes.set_clear_time(app.time)
 
     while True:
-        event = yield
+        event = yield wants_timer
+        handler = lookup(event)
 
-        if event == NormalEvent(ESCAPE):
+        if event is ESCAPE_EVENT:
             reset()
             app.current_multiplier = None
 
-        elif event.key in modifier_keys:
+        elif event.is_modifier:
             continue
 
         elif current_state is not None:
             try:
-                current_state.send(event)
+                wants_timer = current_state.send(event)
             except StopIteration:
-                current_state = None
+                current_state, wants_timer = None, False
                 app.keystrokes.set_clear_time(app.time)
             else:
                 app.keystrokes.is_clear_pending = False
 
-        elif event in event_map:
+        elif handler is not None:
             reset()
-            current_state = init_state(event_map[event], app, event)
+            current_state, wants_timer = start_state(handler, app, event)
             app.current_multiplier = None
 
-        elif is_digit_keypress_event(event):
+        elif event.digit is not None:
             if not app.current_multiplier: app.current_multiplier = 0
             else: app.current_multiplier *= 10
-            app.current_multiplier += digit_keys[event.key]
+            app.current_multiplier += event.digit
 
         elif event.type is ON_KEY_PRESS:
             reset()
@@ -256,5 +402,10 @@ def construct_dispatcher(app):
                     # handle events
                     if is_done_handling_events_event: return
 
+        A state that yields WANTS_TIMER is sent TIMER_FIRE events, once per
+        frame, until it next yields something else or returns. The
+        dispatcher in turn yields whether its current state wants them, so
+        the app only runs a timer while one is needed.
+
     """
     return init_state(default_state, app, None)
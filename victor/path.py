@@ -1,45 +1,176 @@
-import pyglet;
+import numpy as np;
+from victor.lod import douglas_peucker, tolerance;
 from victor.vector import *;
 
 __all__ = [ 'Path' ];
 
-def _pairwise(seq):
-    from itertools import tee, izip;
-    a, b = tee(iter(seq)); 
-    next(b);
-    return izip(a, b);
-
 class Path(object):
+    """
+    A polyline stored as columns: a float64 parameter per point and an Nx2
+    float64 array of positions. Both columns grow by doubling, so append is
+    amortized O(1) and the used prefix can be handed out as views. bounds,
+    the (x0, y0, x1, y1) box around the points, grows with them.
+    """
+
+    initial_capacity = 16;
+
     def __init__(self, pos, color = (0, 0, 0, 255)):
-        self.points = [ (0., pos) ];
+        self._setup(color);
+
+        self.count = 0;
+        self.ts = np.empty(self.initial_capacity, dtype = np.float64);
+        self.positions = np.empty((self.initial_capacity, 2), dtype = np.float64);
+
+        self._push(0., pos);
+
+    @classmethod
+    def from_columns(cls, ts, positions, color = (0, 0, 0, 255), bounds = None):
+        """
+        A path over existing parameter and position columns, used as they
+        are: read-only arrays such as np.memmap views work, and are only
+        copied once the path grows. Passing bounds, when they are known,
+        saves reading every position.
+        """
+        path = cls.__new__(cls);
+        path._setup(color);
+
+        path.count = len(ts);
+        path.ts, path.positions = ts, positions;
+
+        if bounds is not None: path.bounds[:] = bounds;
+        elif path.count:
+            path.bounds[:2] = positions.min(axis = 0);
+            path.bounds[2:] = positions.max(axis = 0);
+
+        return path;
+
+    def _setup(self, color):
         self.color = color;
-        self.batch = None;
-    
+        self.parent = None;
+        self._vertices = None;
+        self.bounds = empty_bounds();
+        self._lod = { };
+
+    def __len__(self):
+        return self.count;
+
+    def _reserve(self, count):
+        capacity = len(self.ts);
+        if count <= capacity: return;
+
+        capacity = max(count, 2 * capacity);
+
+        ts = np.empty(capacity, dtype = np.float64);
+        ts[:self.count] = self.ts[:self.count];
+
+        positions = np.empty((capacity, 2), dtype = np.float64);
+        positions[:self.count] = self.positions[:self.count];
+
+        self.ts, self.positions = ts, positions;
+
+    def _push(self, t, p):
+        self._reserve(self.count + 1);
+        self.ts[self.count] = t;
+        self.positions[self.count] = p;
+        self.count += 1;
+
+        p = self.positions[self.count - 1];
+        np.minimum(self.bounds[:2], p, out = self.bounds[:2]);
+        np.maximum(self.bounds[2:], p, out = self.bounds[2:]);
+
     def append(self, p):
-        self.points.append((self.points[-1][0] + 1., p));
-        self.reset_batch();
-    
+        start = self.count;
+        self._push(self.ts[start - 1] + 1., p);
+
+        if self.parent is not None:
+            p = self.positions[start];
+            self.parent.extend_bounds((p[0], p[1], p[0], p[1]));
+            self.parent.notify('path_extended', self, start);
+
+    @property
+    def parameters(self):
+        return self._view(self.ts);
+
+    def _view(self, column):
+        view = column[:self.count];
+        view.flags.writeable = False;
+        return view;
+
     def evaluate(self, t):
-        for p, n in _pairwise(self.points):
-            if p[0] <= t < n[0]:
-                return (1. - t) * p[1]  + t * p[1];
-    
-    def approximate(self):
-        return [ vec2i(*p) for t, p in self.points ];
+        """
+        Position at parameter t, linearly interpolated between the two
+        surrounding points. Returns None when t is outside the path.
+        """
+        ts = self.ts[:self.count];
+
+        if not ts[0] <= t <= ts[-1]: return None;
+
+        i = max(int(np.searchsorted(ts, t, side = 'right')) - 1, 0);
+        if i == self.count - 1: return self.positions[i].copy();
+
+        u = (t - ts[i]) / (ts[i + 1] - ts[i]);
+        return (1. - u) * self.positions[i] + u * self.positions[i + 1];
+
+    def evaluate_many(self, ts):
+        """
+        Vectorized evaluate: returns an (len(ts), 2) array of positions.
+        Parameters outside the path evaluate to nan.
+        """
+        ts = np.asarray(ts, dtype = np.float64);
+        params = self.ts[:self.count];
+        positions = self.positions[:self.count];
+
+        out = np.empty(ts.shape + (2,), dtype = np.float64);
+        out[..., 0] = np.interp(ts, params, positions[:, 0]);
+        out[..., 1] = np.interp(ts, params, positions[:, 1]);
 
-    def reset_batch(self):
-        from itertools import islice, cycle, chain;
+        out[(ts < params[0]) | (ts > params[-1])] = np.nan;
 
-        batch = pyglet.graphics.Batch();
-        points = self.approximate();
+        return out;
 
-        batch.add(
-            len(points), pyglet.gl.GL_LINE_STRIP, None,
-            ('v2i', tuple(chain(*points))),
-            ('c4B', tuple(islice(cycle(self.color), 0, len(self.color) * len(points))))
-        );
+    def approximate(self, level = 0):
+        """
+        Read-only positions at a level of detail (see victor.lod). Level 0 is
+        a view of every position, no copy made; coarser levels are simplified
+        with Douglas-Peucker and cached until the path grows.
+        """
+        if level <= 0: return self._view(self.positions);
 
-        self.batch = batch;
+        cached = self._lod.get(level);
+
+        if cached is None or cached[0] != self.count:
+            positions = self.positions[:self.count];
+            simplified = positions[douglas_peucker(positions, tolerance(level))];
+            simplified.flags.writeable = False;
+
+            self._lod[level] = cached = (self.count, simplified);
+
+        return cached[1];
+
+    @property
+    def vertices(self):
+        # made on first use, so that paths can exist without pyglet, which
+        # needs a display to import
+        if self._vertices is None:
+            from victor.vertex_buffer import VertexBuffer;
+            self._vertices = VertexBuffer();
+
+        return self._vertices;
+
+    def upload(self):
+        """
+        Write the points appended since the last upload into the vertex buffer.
+        """
+        start = self.vertices.count;
+        if start == self.count: return;
+
+        colors = np.tile(np.array(self.color, dtype = np.uint8), (self.count - start, 1));
+        self.vertices.extend(self.positions[start:self.count], colors);
 
     def draw(self, batch = None):
-        if self.batch: self.batch.draw();
+        if self.count < 2: return;
+
+        import pyglet.gl as gl;
+
+        self.upload();
+        self.vertices.draw(gl.GL_LINE_STRIP);
@@ -1,21 +1,171 @@
+import numpy as np;
 from victor.path import Path;
 from victor.vector import *;
 
-__all__ = [ 'PathGroup' ];
+__all__ = [ 'PathGroup', 'PathGroupListener' ];
+
+class PathGroupListener(object):
+    """
+    Receives change notifications from a PathGroup and all of its descendants.
+    Subclasses override the callbacks they are interested in.
+    """
+    def child_added(self, group, child): pass;
+
+    def path_extended(self, path, start): pass;
+
+    def transform_changed(self, group): pass;
 
 class PathGroup(object):
     def __init__(self):
-        self.transform = identity();
+        self.parent = None;
         self.children = [ ];
-    
+        self.listeners = [ ];
+
+        self._transform = identity();
+        self._world = None;
+        self._bounds = None;
+
+    @property
+    def transform(self):
+        return self._transform;
+
+    @transform.setter
+    def transform(self, m):
+        self._transform = matrix3f(*m);
+        self.invalidate_world();
+        if self.parent is not None: self.parent.invalidate_bounds();
+        self.notify('transform_changed', self);
+
+    def translate(self, x, y):
+        self.transform = self._transform.dot(translate(x, y));
+
+    def scale(self, x, y):
+        self.transform = self._transform.dot(scale(x, y));
+
+    @property
+    def world(self):
+        """
+        The transform composed with those of all ancestors. Cached until this
+        group's or an ancestor's transform changes.
+        """
+        if self._world is None:
+            if self.parent is None: self._world = self._transform;
+            else: self._world = self._transform.dot(self.parent.world);
+
+        return self._world;
+
+    def invalidate_world(self):
+        # a cached world below an uncached one is impossible, so stop early
+        if self._world is None: return;
+
+        self._world = None;
+        for child in self.children:
+            if isinstance(child, PathGroup): child.invalidate_world();
+
+    @property
+    def bounds(self):
+        """
+        The (x0, y0, x1, y1) box around everything below this group, in the
+        group's own coordinates (before its transform). Cached; appending
+        extends the cache, while a transform change below drops it.
+        """
+        if self._bounds is None:
+            bounds = empty_bounds();
+
+            for child in self.children:
+                box = child_bounds(child);
+                np.minimum(bounds[:2], box[:2], out = bounds[:2]);
+                np.maximum(bounds[2:], box[2:], out = bounds[2:]);
+
+            self._bounds = bounds;
+
+        return self._bounds;
+
+    @property
+    def world_bounds(self):
+        return transform_bounds(self.bounds, self.world);
+
+    def extend_bounds(self, box):
+        """
+        Grow the cached bounds of this group and its ancestors to include
+        box, given in this group's coordinates.
+        """
+        group = self;
+
+        # an uncached group has no cached ancestors to update
+        while group is not None and group._bounds is not None:
+            bounds = group._bounds;
+            if (bounds[0] <= box[0] and bounds[1] <= box[1]
+                    and box[2] <= bounds[2] and box[3] <= bounds[3]):
+                return;
+
+            np.minimum(bounds[:2], box[:2], out = bounds[:2]);
+            np.maximum(bounds[2:], box[2:], out = bounds[2:]);
+
+            box = transform_bounds(box, group._transform);
+            group = group.parent;
+
+    def invalidate_bounds(self):
+        group = self;
+        while group is not None and group._bounds is not None:
+            group._bounds = None;
+            group = group.parent;
+
     def append_path(self, p):
-        self.children.append(p);
-        return p;
+        return self._append(p);
+
+    def append_group(self, group = None):
+        return self._append(PathGroup() if group is None else group);
+
+    def _append(self, child):
+        child.parent = self;
+        self.children.append(child);
+
+        if isinstance(child, PathGroup): child.invalidate_world();
+        self.extend_bounds(child_bounds(child));
+
+        self.notify('child_added', self, child);
+        return child;
+
+    def notify(self, callback, *args):
+        """
+        Invoke callback on the listeners of this group and of every ancestor.
+        """
+        group = self;
+        while group is not None:
+            for listener in group.listeners:
+                getattr(listener, callback)(*args);
+            group = group.parent;
+
+    def walk_paths(self):
+        for child in self.children:
+            if isinstance(child, PathGroup):
+                for p in child.walk_paths(): yield p;
+            else:
+                yield child;
+
+    def draw(self, rect = None):
+        """
+        Draw the tree. When rect, a world (x0, y0, x1, y1) box, is given,
+        subtrees and paths entirely outside it are skipped.
+        """
+        if rect is not None and not intersects(self.world_bounds, rect): return;
+
+        # not imported with the module: pyglet needs a display to import
+        import pyglet.gl as gl;
+
+        gl.glPushMatrix();
+        gl.glMultMatrixf((gl.GLfloat * 16)(*affine4f(self._transform).flat));
+
+        for child in self.children:
+            if isinstance(child, PathGroup): child.draw(rect);
+            elif rect is None or intersects(transform_bounds(child.bounds, self.world), rect): child.draw();
 
-    def append_group(self):
-        g = PathGroup();
-        self.children.append(g);
-        return g;
+        gl.glPopMatrix();
 
-    def draw(self):
-        for child in self.children: child.draw();
+def child_bounds(child):
+    """
+    The bounds of a path or group in its parent's coordinates.
+    """
+    if isinstance(child, PathGroup): return transform_bounds(child.bounds, child._transform);
+    return child.bounds;
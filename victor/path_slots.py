@@ -0,0 +1,266 @@
+import numpy as np
+
+from victor.path_group import PathGroup, PathGroupListener
+from victor.vector import intersects, transform_bounds
+
+__all__ = [
+    'PathSlot',
+    'PathSlots',
+]
+
+
+class PathSlot(object):
+    """
+    The range of the shared vertex buffer reserved for one path. uploaded
+    counts the path's points already in the buffer and rows the buffer rows
+    they occupy; the two differ when the path is simplified.
+    """
+    __slots__ = ('offset', 'capacity', 'uploaded', 'rows', 'index')
+
+    def __init__(self, offset, capacity):
+        self.offset = offset
+        self.capacity = capacity
+        self.uploaded = 0
+        self.rows = 0
+        self.index = None
+
+
+class PathSlots(PathGroupListener):
+    """
+    Keeps every path below a PathGroup in one shared vertex buffer.
+
+    Each path owns a slot of the buffer with room to grow; a path that
+    outgrows its slot is moved to a new slot of twice the size at the end of
+    the buffer. Only vertices appended since the last update are uploaded.
+
+    Paths are laid out group by group: firsts and counts give each path's
+    range in layout order, and runs the (group, start, stop) slices of them
+    that share a group. Subclasses draw the buffer.
+
+    cull(rect) finds the paths that may be visible in a world rectangle,
+    skipping whole subtrees whose cached bounds miss it. bounds holds each
+    path's bounds in layout order, kept up to date as paths change, so a
+    cull never visits the paths themselves.
+
+    level selects a level of detail (see victor.lod). At level 0 paths are
+    uploaded incrementally; at coarser levels each changed path is replaced
+    by its simplified positions, which Path caches per level.
+    """
+
+    min_capacity = 4
+
+    def __init__(self, root, vertices):
+        self.root = root
+        self.vertices = vertices
+
+        self.slots = { }
+        self.end = 0
+        self.garbage = 0
+
+        # insertion ordered, so new paths are packed in the order they arrive
+        self.dirty = dict.fromkeys(root.walk_paths())
+        self.layout_dirty = True
+        self.level = 0
+
+        self.paths = [ ]
+        self.runs = [ ]
+        self.subtrees = [ ]
+        self.firsts = np.zeros(0, dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.int32)
+        self.bounds = np.zeros((0, 4))
+
+        root.listeners.append(self)
+
+
+    def child_added(self, group, child):
+        if isinstance(child, PathGroup):
+            self.dirty.update(dict.fromkeys(child.walk_paths()))
+        else:
+            self.dirty[child] = None
+
+        self.layout_dirty = True
+
+
+    def path_extended(self, path, start):
+        self.dirty[path] = None
+
+
+    def set_level(self, level):
+        if level == self.level:
+            return
+
+        self.level = level
+
+        for path, slot in self.slots.items():
+            slot.uploaded = 0
+            self.dirty[path] = None
+
+
+    def update(self):
+        for path in self.dirty:
+            self._sync(path)
+
+        self.dirty.clear()
+
+        if self.garbage > self.end // 2:
+            self._compact()
+
+        if self.layout_dirty:
+            self._layout()
+
+
+    def cull(self, rect):
+        """
+        A boolean mask over self.paths of the paths whose bounds meet rect,
+        a world (x0, y0, x1, y1) box. Call after update().
+        """
+        visible = np.zeros(len(self.paths), dtype=bool)
+        subtrees = self.subtrees
+        i = 0
+
+        while i < len(subtrees):
+            group, start, stop, skip = subtrees[i]
+
+            if not intersects(group.world_bounds, rect):
+                i = skip
+                continue
+
+            if stop > start:
+                try:
+                    inverse = np.linalg.inv(group.world)
+                except np.linalg.LinAlgError:
+                    # a singular transform flattens the group, whose world
+                    # bounds already meet rect, so draw all of it
+                    visible[start:stop] = True
+                    i += 1
+                    continue
+
+                # rect in the group's coordinates, against its paths' bounds
+                local = transform_bounds(rect, inverse)
+                bounds = self.bounds[start:stop]
+
+                visible[start:stop] = (
+                    (bounds[:, 0] <= local[2]) & (local[0] <= bounds[:, 2])
+                    & (bounds[:, 1] <= local[3]) & (local[1] <= bounds[:, 3])
+                )
+
+            i += 1
+
+        return visible
+
+
+    def _merged_runs(self):
+        merged = [ ]
+
+        for group, start, stop in self.runs:
+            world = group.world
+
+            if merged and merged[-1][2] == start and np.array_equal(merged[-1][0], world):
+                merged[-1][2] = stop
+            else:
+                merged.append([ world, start, stop ])
+
+        return merged
+
+
+    def _allocate(self, count):
+        slot = PathSlot(self.end, max(2 * count, self.min_capacity))
+        self.end += slot.capacity
+        return slot
+
+
+    def _sync(self, path):
+        slot = self.slots.get(path)
+        count = len(path)
+
+        if slot is None or count > slot.capacity:
+            if slot is not None:
+                self.garbage += slot.capacity
+
+            slot = self.slots[path] = self._allocate(count)
+            self.layout_dirty = True
+
+        self._upload(path, slot)
+
+        if not self.layout_dirty:
+            self.counts[slot.index] = slot.rows
+            self.bounds[slot.index] = path.bounds
+
+
+    def _upload(self, path, slot):
+        stop = len(path)
+        if slot.uploaded == stop:
+            return
+
+        if self.level:
+            start, positions = 0, path.approximate(self.level)
+        else:
+            start, positions = slot.uploaded, path.positions[slot.uploaded:stop]
+
+        self._write(path, slot, start, positions)
+
+        slot.uploaded = stop
+        slot.rows = start + len(positions)
+
+
+    def _write(self, path, slot, start, positions):
+        """
+        Store positions as rows start, start + 1, ... of path's slot.
+        """
+        colors = np.tile(np.array(path.color, dtype=np.uint8), (len(positions), 1))
+        self.vertices.set_region(slot.offset + start, positions, colors)
+
+
+    def _compact(self):
+        self.end = self.garbage = 0
+
+        for path in self.root.walk_paths():
+            slot = self.slots[path] = self._allocate(len(path))
+            self._upload(path, slot)
+
+        self.layout_dirty = True
+
+
+    def _layout(self):
+        self.paths = paths = [ ]
+        self.runs = [ ]
+        self.subtrees = [ ]
+        self._collect(self.root)
+
+        self.firsts = np.empty(len(paths), dtype=np.int32)
+        self.counts = np.empty(len(paths), dtype=np.int32)
+        self.bounds = np.empty((len(paths), 4))
+
+        for i, path in enumerate(paths):
+            slot = self.slots[path]
+            slot.index = i
+
+            self.firsts[i] = slot.offset
+            self.counts[i] = slot.rows
+            self.bounds[i] = path.bounds
+
+        self.layout_dirty = False
+
+
+    def _collect(self, group):
+        start = len(self.paths)
+        groups = [ ]
+
+        for child in group.children:
+            if isinstance(child, PathGroup):
+                groups.append(child)
+            else:
+                self.paths.append(child)
+
+        stop = len(self.paths)
+        if stop > start:
+            self.runs.append((group, start, stop))
+
+        # (group, its own paths' start and stop, index past its subtree)
+        index = len(self.subtrees)
+        self.subtrees.append(None)
+
+        for child in groups:
+            self._collect(child)
+
+        self.subtrees[index] = (group, start, stop, len(self.subtrees))
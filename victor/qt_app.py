@@ -1,14 +1,21 @@
 import sys
-import numpy as np
-import array
+import time
+
+import pyglet
+
+# the editor's key constants import pyglet.window, which would otherwise
+# open a shadow window that Qt never uses
+pyglet.options['shadow_window'] = False
 
-from math import cos, sin, sqrt, pi
+import pyglet.window.key as pkey
 
 from .util import method_cache
 
 from PyQt5.QtCore import (
     QEvent,
     QRect,
+    QTimer,
+    Qt,
 )
 
 from PyQt5.QtWidgets import (
@@ -22,6 +29,19 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+import numpy as np
+
+import victor.mode as vmode
+import victor.normal_dispatcher as vnd
+
+from .editor import Editor
+from .exceptions import CommandError
+from .path_group import PathGroupListener
+from .qt_scene_renderer import QtSceneRenderer
+from .qt_vertex_buffer import QtVertexBuffer
+from .scheduler import Ticker
+from .vector import affine4f, vec2f
+
 from PyQt5.QtGui import (
     QMatrix4x4,
     QOpenGLContext,
@@ -29,12 +49,14 @@ from PyQt5.QtGui import (
     QOpenGLShaderProgram,
     QOpenGLVersionProfile,
     QSurfaceFormat,
+    QVector2D,
+    QVector4D,
     QWindow,
 )
 
 
 class QTVictorApplication(QApplication):
-    def __init__(self):
+    def __init__(self, document=None):
         super().__init__(sys.argv)
 
         window = self.window = QWidget()
@@ -42,7 +64,7 @@ class QTVictorApplication(QApplication):
         window.setGeometry(300, 300, 512 + 150, 512)
         window.setWindowTitle('victor')
 
-        gl_window = QTVictorGLWindow(self)
+        gl_window = self.gl_window = QTVictorGLWindow(self)
 
         canvas = QWidget.createWindowContainer(gl_window)
 
@@ -67,9 +89,23 @@ class QTVictorApplication(QApplication):
         info.setFrameStyle(QFrame.Box | QFrame.Plain)
         info.setLineWidth(1)
 
-        hbox = QHBoxLayout(window)
-        hbox.addWidget(canvas)
-        # hbox.addWidget(info)
+        command_line = QLabel('')
+        command_line.setFrameStyle(QFrame.Box | QFrame.Plain)
+        gl_window.command_label = command_line
+
+        vbox = QVBoxLayout(window)
+        vbox.addWidget(canvas)
+        vbox.addWidget(command_line)
+        # vbox.addWidget(info)
+
+        if document is not None:
+            try:
+                gl_window.edit_document(document)
+            except CommandError as e:
+                sys.stderr.write('%s\n' % str(e))
+
+        canvas.setFocusPolicy(Qt.StrongFocus)
+        canvas.setFocus()
 
         window.show()
 
@@ -79,43 +115,289 @@ class QTVictorApplication(QApplication):
         return self.exec_()
 
 
-class QTVictorGLWindow(QWindow):
+class QtClock(object):
+    """
+    The part of pyglet's clock that Ticker uses, run by QTimers. A callback
+    scheduled without an interval is called once per frame at frame_rate.
+    """
+
+    frame_rate = 60.
+
+    def __init__(self):
+        self.timers = { }
+        self.last = { }
+
+
+    def schedule(self, callback):
+        self.schedule_interval(callback, 1. / self.frame_rate)
+
+
+    def schedule_interval(self, callback, interval):
+        self.unschedule(callback)
+
+        timer = QTimer()
+        timer.setInterval(int(1000 * interval))
+        timer.timeout.connect(lambda: self._tick(callback))
+
+        self.timers[callback] = timer
+        self.last[callback] = time.monotonic()
+        timer.start()
+
+
+    def unschedule(self, callback):
+        timer = self.timers.pop(callback, None)
+        self.last.pop(callback, None)
+
+        if timer is not None:
+            timer.stop()
+
+
+    def _tick(self, callback):
+        now = time.monotonic()
+        dt, self.last[callback] = now - self.last[callback], now
+        callback(dt)
+
+
+_qt_keys = {
+    Qt.Key_At           : pkey.AT,
+    Qt.Key_BracketLeft  : pkey.BRACKETLEFT,
+    Qt.Key_BracketRight : pkey.BRACKETRIGHT,
+    Qt.Key_Colon        : pkey.COLON,
+    Qt.Key_Comma        : pkey.COMMA,
+    Qt.Key_Equal        : pkey.EQUAL,
+    Qt.Key_Greater      : pkey.GREATER,
+    Qt.Key_Less         : pkey.LESS,
+    Qt.Key_Minus        : pkey.MINUS,
+    Qt.Key_Period       : pkey.PERIOD,
+    Qt.Key_Plus         : pkey.PLUS,
+    Qt.Key_Semicolon    : pkey.SEMICOLON,
+    Qt.Key_Slash        : pkey.SLASH,
+    Qt.Key_Space        : pkey.SPACE,
+}
+
+_qt_keys.update({ Qt.Key_A + i : getattr(pkey, chr(ord('A') + i)) for i in range(26) })
+_qt_keys.update({ Qt.Key_0 + i : getattr(pkey, '_{}'.format(i)) for i in range(10) })
+
+_qt_modifiers = (
+    (Qt.ShiftModifier, pkey.MOD_SHIFT),
+    (Qt.ControlModifier, pkey.MOD_CTRL),
+    (Qt.AltModifier, pkey.MOD_ALT),
+)
+
+
+def normal_event(kind, key, modifiers):
+    """
+    The NormalEvent of kind for a Qt key and keyboard modifiers, or None
+    for keys normal mode has no use for. Qt reports shifted characters as
+    keys of their own, so shift is kept for letters only, as pyglet does.
+    """
+    if key == Qt.Key_Escape or (key == Qt.Key_BracketLeft and modifiers & Qt.ControlModifier):
+        return vnd.ESCAPE_EVENT if kind == vnd.ON_KEY_PRESS else None
+
+    symbol = _qt_keys.get(key)
+    if symbol is None:
+        return None
+
+    mods = 0
+    for qt_modifier, modifier in _qt_modifiers:
+        if modifiers & qt_modifier:
+            mods |= modifier
+
+    if not Qt.Key_A <= key <= Qt.Key_Z:
+        mods &= ~pkey.MOD_SHIFT
+
+    return vnd.NormalEvent(kind, symbol, mods)
+
+
+class Invalidator(PathGroupListener):
+    """
+    Marks a window dirty whenever the watched path groups change.
+    """
+
+    def __init__(self, window):
+        self.window = window
+
+
+    def child_added(self, group, child):
+        self.window.invalidate()
+
+
+    def path_extended(self, path, start):
+        self.window.invalidate()
+
+
+    def transform_changed(self, group):
+        self.window.invalidate()
+
+
+GL_LINES = 0x0001
+GL_TRIANGLE_STRIP = 0x0005
+
+
+class QTVictorGLWindow(Editor, QWindow):
+    """
+    An Editor in a Qt window. Key presses go through the normal dispatcher
+    as they do in VIctorApp; ':' opens a command line, shown in
+    command_label when one is given, which Enter runs as an ex command.
+
+    Draws the document: the path groups below groups, the movement grid,
+    the cursor and the marks. Paths are drawn by a QtSceneRenderer in one
+    call and the cursor and marks overlay in one more, through the same
+    shader program. The grid is a single full window quad whose fragment
+    shader decides which pixels lie on grid lines.
+
+    Draws only when something changed.
+
+    Call invalidate() after changing anything the window shows; a frame is
+    drawn on the next pass through the event loop, and several invalidations
+    before then share one frame. While animating is set frames are drawn
+    continuously. max_fps, when set, spaces frames at least 1/max_fps seconds
+    apart. frames_drawn and frames_skipped count update requests that did
+    and did not produce a frame.
+    """
+
     memoize = method_cache()
 
-    def __init__(self, app, parent=None):
-        super().__init__(parent)
+    def __init__(self, app, parent=None, max_fps=None):
+        QWindow.__init__(self, parent)
 
         self.app = app
 
         self.animating = False
         self.update_pending = False
+        self.dirty = True
 
-        self.setSurfaceType(QWindow.OpenGLSurface)
+        self.max_fps = max_fps
+        self.last_frame = None
+        self.frames_drawn = 0
+        self.frames_skipped = 0
 
-        self.height_scale = 1.
-        self.width_scale = 1.
-        self.zoom = 1/3.
+        self.setSurfaceType(QWindow.OpenGLSurface)
 
+        self.width_, self.height_ = 512, 512
         self.frame_no = 0
 
+        self.overlay = QtVertexBuffer()
+        self.overlay_dirty = True
+
+        self.command_text = ''
+        self.command_label = None
+
+        Editor.__init__(self, self.width_, self.height_)
+        self.cursor.position = vec2f(self.width_ / 2, self.height_ / 2)
+
+        self.motion_timer = Ticker(QtClock(), self.on_timer_fire)
+
+
+    def set_document(self, groups, marks=()):
+        Editor.set_document(self, groups, marks)
+
+        self.scene_renderer = QtSceneRenderer(groups)
+        self.watch(groups)
+
+        # a window not yet shown draws when it is exposed
+        self.overlay_dirty = self.dirty = True
+        if self.isExposed():
+            self.render_later()
+
+
+    def dispatch(self, event):
+        """
+        Send a NormalEvent to the dispatcher, running the motion timer for as
+        long as the dispatcher's state asks for timer events. Any event may
+        have moved the cursor, set a mark or changed the grid or view, so the
+        window is redrawn after each.
+        """
+        self.motion_timer.set_running(Editor.dispatch(self, event))
+
+        self.overlay_dirty = True
+        self.invalidate()
+
+
+    def on_timer_fire(self, dt):
+        self.dispatch(vnd.TIMER_EVENT)
+
+
+    def switch_to_ex_mode(self):
+        Editor.switch_to_ex_mode(self)
+        self.set_command_text('')
+
+
+    def set_command_text(self, text):
+        self.command_text = text
+
+        if self.command_label is not None:
+            self.command_label.setText(':' + text if self.mode == vmode.EX else '')
+
+
+    def run_command(self):
+        try:
+            self.run_ex_command(self.command_text)
+        except CommandError as e:
+            sys.stderr.write('%s\n' % str(e))
+
+        self.mode = vmode.NORMAL
+        self.set_command_text('')
+        self.overlay_dirty = True
+        self.invalidate()
+
+
+    def keyPressEvent(self, event):
+        if self.mode == vmode.EX:
+            self.command_key(event)
+            return
+
+        # a held key is pressed once and released once, as in pyglet
+        if event.isAutoRepeat():
+            return
+
+        normal = normal_event(vnd.ON_KEY_PRESS, event.key(), event.modifiers())
+        if normal is not None:
+            self.dispatch(normal)
+
+
+    def keyReleaseEvent(self, event):
+        if self.mode != vmode.NORMAL or event.isAutoRepeat():
+            return
+
+        normal = normal_event(vnd.ON_KEY_RELEASE, event.key(), event.modifiers())
+        if normal is not None and normal is not vnd.ESCAPE_EVENT:
+            self.dispatch(normal)
+
+
+    def command_key(self, event):
+        key = event.key()
+
+        if key in (Qt.Key_Return, Qt.Key_Enter):
+            self.run_command()
+        elif key == Qt.Key_Escape:
+            self.mode = vmode.NORMAL
+            self.set_command_text('')
+        elif key == Qt.Key_Backspace:
+            if not self.command_text:
+                self.mode = vmode.NORMAL
+
+            self.set_command_text(self.command_text[:-1])
+        elif event.text().isprintable():
+            self.set_command_text(self.command_text + event.text())
+
 
     @property
     @memoize
     def program(self):
-        print('hi')
         program = QOpenGLShaderProgram(self)
 
         program.addShaderFromSourceCode(
             QOpenGLShader.Vertex,
             r'''
-                attribute highp vec4 posAttr;
-                attribute lowp  vec4 colAttr;
+                attribute highp vec2 position;
+                attribute lowp  vec4 color;
                 varying   lowp  vec4 col;
                 uniform   highp mat4 matrix;
 
                 void main() {
-                    col = colAttr;
-                    gl_Position = matrix * posAttr;
+                    col = color;
+                    gl_Position = matrix * vec4(position, 0., 1.);
                 }
             '''
         )
@@ -136,11 +418,119 @@ class QTVictorGLWindow(QWindow):
         return program
 
 
+    @property
+    @memoize
+    def grid_program(self):
+        program = QOpenGLShaderProgram(self)
+
+        program.addShaderFromSourceCode(
+            QOpenGLShader.Vertex,
+            r'''
+                attribute highp vec2 position;
+
+                void main() {
+                    gl_Position = vec4(position, 0., 1.);
+                }
+            '''
+        )
+
+        # a pixel is on a line when it is in the first row or column of its
+        # cell; origin is where the grid's (0, 0) falls in window pixels
+        program.addShaderFromSourceCode(
+            QOpenGLShader.Fragment,
+            r'''
+                uniform highp vec2  origin;
+                uniform highp float spacing;
+                uniform lowp  vec4  color;
+
+                void main() {
+                    highp vec2 cell = mod(floor(gl_FragCoord.xy - origin), spacing);
+
+                    if (min(cell.x, cell.y) >= 1.) {
+                        discard;
+                    }
+
+                    gl_FragColor = color;
+                }
+            '''
+        )
+
+        program.link()
+
+        return program
+
+
+    @property
+    @memoize
+    def grid_locations(self):
+        program = self.grid_program
+
+        return {
+            'position' : program.attributeLocation('position'),
+            'origin'   : program.uniformLocation('origin'),
+            'spacing'  : program.uniformLocation('spacing'),
+            'color'    : program.uniformLocation('color'),
+        }
+
+
+    @property
+    @memoize
+    def grid_quad(self):
+        quad = QtVertexBuffer(capacity=4)
+        quad.extend([ (-1, -1), (1, -1), (-1, 1), (1, 1) ], np.zeros((4, 4)))
+
+        # the grid program takes no color attribute; Qt ignores location -1
+        quad.attach(self.grid_program, self.grid_locations['position'], -1)
+
+        return quad
+
+
+    @property
+    @memoize
+    def locations(self):
+        program = self.program
+
+        return {
+            'position' : program.attributeLocation('position'),
+            'color'    : program.attributeLocation('color'),
+            'matrix'   : program.uniformLocation('matrix'),
+        }
+
+
+    def invalidate(self):
+        self.dirty = True
+        self.render_later()
+
+
+    def watch(self, group):
+        """
+        Redraw whenever group or anything below it changes.
+        """
+        group.listeners.append(Invalidator(self))
+
+
     def render_later(self):
         if self.update_pending:
             return
 
         self.update_pending = True
+
+        delay = self.frame_delay()
+
+        if delay > 0:
+            QTimer.singleShot(int(1000 * delay) + 1, self.post_update)
+        else:
+            self.post_update()
+
+
+    def frame_delay(self):
+        if not self.max_fps or self.last_frame is None:
+            return 0.
+
+        return self.last_frame + 1. / self.max_fps - time.monotonic()
+
+
+    def post_update(self):
         self.app.postEvent(self, QEvent(QEvent.UpdateRequest))
 
 
@@ -164,18 +554,31 @@ class QTVictorGLWindow(QWindow):
 
 
     def render_now(self):
+        self.update_pending = False
+
         if not self.isExposed():
             return
 
-        self.update_pending = False
+        if not (self.dirty or self.animating):
+            self.frames_skipped += 1
+            return
 
+        self.dirty = False
+        self.last_frame = time.monotonic()
+
+        self.paint()
+        self.frames_drawn += 1
+
+        if self.animating:
+            self.render_later()
+
+
+    def paint(self):
         self.gl_context.makeCurrent(self)
 
         self.render()
         self.gl_context.swapBuffers(self)
 
-        self.render_later()
-
 
     def event(self, event):
         if event.type() == QEvent.UpdateRequest:
@@ -186,77 +589,122 @@ class QTVictorGLWindow(QWindow):
 
 
     def exposeEvent(self, event):
+        self.dirty = True
         self.render_now()
 
 
     def resizeEvent(self, event):
         size = event.size()
-        width, height = size.width(), size.height()
-
-        self.height_scale = height / 512
-        self.width_scale =  width / 512
+        self.width_, self.height_ = size.width(), size.height()
+        self.grid.resize(self.width_, self.height_)
+        self.viewport.resize(self.width_, self.height_)
+        self.overlay_dirty = True
 
+        self.dirty = True
         self.render_now()
 
 
     def render(self):
-        self.gl.glClearColor(1., 1., 1., 1.)
-        self.gl.glClear(self.gl.GL_COLOR_BUFFER_BIT)
+        gl = self.gl
+
+        gl.glClearColor(1., 1., 1., 1.)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
 
-        self.program.bind()
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
 
-        matrix = QMatrix4x4()
+        self.draw_grid()
 
-        height = self.height_scale / 2 / self.zoom
-        width  = self.width_scale / 2 / self.zoom
+        program, locations = self.program, self.locations
+        program.bind()
 
-        matrix.ortho(-width, width, -height, height, .1, 100.)
-        matrix.translate(0, 0, -3)
+        window = QMatrix4x4()
+        window.ortho(0., self.width_, 0., self.height_, -1., 1.)
 
-        matrix.rotate(
-            100 * self.frame_no / self.screen().refreshRate(),
-            0, 0, 1
+        # affine4f is laid out for row vectors; Qt wants the transpose
+        view = QMatrix4x4(*affine4f(self.viewport.matrix).T.flat)
+
+        program.setUniformValue(locations['matrix'], window * view)
+        self.scene_renderer.set_level(self.viewport.level)
+        self.scene_renderer.draw(
+            gl, program, locations['position'], locations['color'],
+            self.viewport.visible_rect()
         )
 
-        matrix.translate(-.5, -.5, 0)
+        program.setUniformValue(locations['matrix'], window)
+        self.draw_overlay()
 
-        matrixUniform = self.program.uniformLocation('matrix')
-        self.program.setUniformValue(matrixUniform, matrix)
+        program.release()
 
-        half_pi = pi / 2
-        delta = 2 * pi / 3
+        self.frame_no += 1
 
-        vertices = np.array([
-            [ 0, 0, ],
-            [ 0, 1, ],
-            [ 1, 1, ],
-            [ 1, 0, ],
-        ], dtype=np.float32)
 
-        v = array.array('f')
-        v.frombytes(vertices.tobytes())
+    def draw_lines(self, vertices):
+        locations = self.locations
+        vertices.attach(self.program, locations['position'], locations['color'])
+        vertices.draw(self.gl, GL_LINES)
 
-        colors = np.array([
-            [ 1, 0, 0 ],
-            [ 0, 1, 0 ],
-            [ 1, 0, 0 ],
-            [ 0, 0, 1 ],
-        ], dtype=np.float32)
 
-        c = array.array('f')
-        c.frombytes(colors.tobytes())
+    def draw_grid(self):
+        grid, viewport = self.grid, self.viewport
+        spacing = grid.spacing * viewport.zoom
 
-        posAttr = self.program.attributeLocation('posAttr')
-        self.gl.glVertexAttribPointer(posAttr, 2, self.gl.GL_FLOAT, False, 0, v)
-        self.gl.glEnableVertexAttribArray(posAttr)
+        if not grid.shown(viewport.zoom):
+            return
 
-        colAttr = self.program.attributeLocation('colAttr')
-        self.gl.glVertexAttribPointer(colAttr, 3, self.gl.GL_FLOAT, False, 0, c)
-        self.gl.glEnableVertexAttribArray(colAttr)
+        program, locations = self.grid_program, self.grid_locations
+        program.bind()
 
-        self.gl.glDrawArrays(self.gl.GL_TRIANGLES, 0, 3)
-        self.gl.glDrawArrays(self.gl.GL_LINE_LOOP, 0, 4)
+        r, g, b, a = (c / 255. for c in grid.color)
 
-        self.program.release()
+        x, y = viewport.to_window((0., 0.))
 
-        self.frame_no += 1
+        program.setUniformValue(locations['origin'], QVector2D(x, y))
+        program.setUniformValue(locations['spacing'], float(spacing))
+        program.setUniformValue(locations['color'], QVector4D(r, g, b, a))
+
+        self.grid_quad.draw(self.gl, GL_TRIANGLE_STRIP)
+
+        program.release()
+
+
+    def draw_overlay(self):
+        if self.overlay_dirty:
+            viewport = self.viewport
+            positions, colors = overlay_lines(
+                viewport.to_window(self.cursor.position),
+                [ viewport.to_window(pos) for pos in self.marks.values() ]
+            )
+
+            self.overlay.clear()
+            self.overlay.extend(positions, colors)
+            self.overlay_dirty = False
+
+        self.draw_lines(self.overlay)
+
+
+cursor_color = (0, 0, 0, 255)
+mark_color = (0, 0, 255, 255)
+
+
+def _cross(pos, size, diagonal=False):
+    x, y = pos
+    if diagonal:
+        return [ (x - size, y - size), (x + size, y + size), (x - size, y + size), (x + size, y - size) ]
+
+    return [ (x - size, y), (x + size, y), (x, y - size), (x, y + size) ]
+
+
+def overlay_lines(cursor, marks):
+    """
+    GL_LINES positions and colors for the cursor, a cross, and the marks,
+    small diagonal crosses, all given in window pixels.
+    """
+    positions = _cross(cursor, 6)
+    colors = [ cursor_color ] * 4
+
+    for pos in marks:
+        positions.extend(_cross(pos, 3, diagonal=True))
+        colors.extend([ mark_color ] * 4)
+
+    return np.array(positions, np.float32), np.array(colors, np.uint8)
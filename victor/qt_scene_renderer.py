@@ -0,0 +1,142 @@
+import numpy as np
+
+from PyQt5.QtGui import QOpenGLBuffer
+
+from victor.path_slots import PathSlots
+from victor.qt_vertex_buffer import GL_UNSIGNED_INT, QtArrayBuffer, QtVertexBuffer
+
+__all__ = [ 'QtSceneRenderer' ]
+
+GL_LINES = 0x0001
+
+
+class QtSceneRenderer(PathSlots):
+    """
+    Draws every path below a PathGroup with a single glDrawElements call.
+
+    Unlike SceneRenderer, which draws each group under its world matrix,
+    this stores vertices in world coordinates, and each path's line strip is
+    spelled out as GL_LINES pairs in an index buffer that parallels the
+    vertex buffer: segment k of the slot at offset o lives at indices
+    2 * (o + k). Unused and abandoned slots hold zero length lines, which
+    draw nothing, so the whole buffer is always drawn at once. Changing a
+    group's transform re-uploads the vertices below it.
+
+    Given a visible rectangle, draw() culls: when some paths fall outside
+    it, the segments of the rest are gathered into a second index buffer
+    and only those are drawn.
+    """
+
+    def __init__(self, root, vertices=None, indices=None, visible_indices=None):
+        if vertices is None:
+            vertices = QtVertexBuffer()
+
+        if indices is None:
+            indices = QtArrayBuffer(np.uint32, 1, QOpenGLBuffer.IndexBuffer)
+
+        if visible_indices is None:
+            visible_indices = QtArrayBuffer(np.uint32, 1, QOpenGLBuffer.IndexBuffer)
+
+        self.indices = indices
+        self.visible_indices = visible_indices
+
+        super().__init__(root, vertices)
+
+
+    def transform_changed(self, group):
+        for path in group.walk_paths():
+            slot = self.slots.get(path)
+
+            if slot is not None:
+                slot.uploaded = 0
+                self.dirty[path] = None
+
+
+    def draw(self, gl, program, position_location, color_location, rect=None):
+        self.update()
+
+        if not self.end:
+            return
+
+        indices, count = self.indices, 2 * self.end
+
+        if rect is not None:
+            visible = self.cull(rect)
+
+            if not visible.all():
+                segments = self.visible_segments(visible)
+                if not len(segments):
+                    return
+
+                self.visible_indices.count = 0
+                self.visible_indices.set_region(0, segments)
+                indices, count = self.visible_indices, len(segments)
+
+        self.vertices.attach(program, position_location, color_location)
+
+        self.vertices.bind()
+        indices.bind()
+        gl.glDrawElements(GL_LINES, count, GL_UNSIGNED_INT, None)
+        self.vertices.unbind()
+        indices.release()
+
+
+    def visible_segments(self, visible):
+        """
+        The index pairs of the segments of the paths selected by visible, a
+        mask over self.paths, gathered from the index buffer.
+        """
+        slots = [ self.slots[self.paths[i]] for i in np.flatnonzero(visible) ]
+
+        starts = np.array([ 2 * slot.offset for slot in slots ], dtype=np.int64)
+        lengths = np.array([ 2 * max(slot.rows - 1, 0) for slot in slots ], dtype=np.int64)
+
+        # concatenated ranges [start, start + length) without a Python loop
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        rows = np.arange(total) + offsets
+
+        return self.indices.data[rows, 0]
+
+
+    def _allocate(self, count):
+        slot = super()._allocate(count)
+        self._blank(slot)
+        return slot
+
+
+    def _blank(self, slot):
+        self.indices.set_region(
+            2 * slot.offset,
+            np.full(2 * slot.capacity, slot.offset, dtype=np.uint32)
+        )
+
+
+    def _sync(self, path):
+        old = self.slots.get(path)
+        super()._sync(path)
+
+        if old is not None and self.slots[path] is not old:
+            self._blank(old)
+
+
+    def _write(self, path, slot, start, positions):
+        if start == 0 and slot.rows:
+            # rewriting the whole path, possibly with fewer rows than before
+            self._blank(slot)
+
+        world = path.parent.world if path.parent is not None else np.identity(3)
+        positions = positions.dot(world[:2, :2]) + world[2, :2]
+
+        colors = np.tile(np.array(path.color, dtype=np.uint8), (len(positions), 1))
+        self.vertices.set_region(slot.offset + start, positions, colors)
+
+        # the segment ending at the first new row, and every one after it
+        stop = start + len(positions)
+        segments = np.arange(max(start - 1, 0), stop - 1, dtype=np.uint32) + slot.offset
+
+        if len(segments):
+            self.indices.set_region(
+                2 * int(segments[0]),
+                np.stack([ segments, segments + 1 ], axis=1)
+            )
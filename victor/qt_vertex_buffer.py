@@ -0,0 +1,218 @@
+import numpy as np
+
+from PyQt5.QtGui import (
+    QOpenGLBuffer,
+    QOpenGLVertexArrayObject,
+)
+
+__all__ = [
+    'QtArrayBuffer',
+    'QtVertexBuffer',
+]
+
+GL_UNSIGNED_BYTE = 0x1401
+GL_UNSIGNED_INT = 0x1405
+GL_FLOAT = 0x1406
+
+
+class QtArrayBuffer(object):
+    """
+    A growable array of rows of `size` components in one QOpenGLBuffer.
+
+    Capacity doubles when exhausted and only the rows that are written get
+    uploaded. A copy of the data is kept on the CPU so growing can re-upload
+    it, as OpenGL ES offers no way to read a buffer back. The buffer is
+    created on the first write, which must happen with the GL context
+    current.
+    """
+
+    def __init__(self, dtype, size, kind=QOpenGLBuffer.VertexBuffer, capacity=16):
+        self.dtype = np.dtype(dtype)
+        self.size = size
+        self.kind = kind
+
+        self.count = 0
+        self.capacity = 0
+        self.initial_capacity = capacity
+
+        self.data = np.zeros((0, size), self.dtype)
+        self.buffer = None
+
+
+    @property
+    def stride(self):
+        return self.size * self.dtype.itemsize
+
+
+    def reserve(self, count):
+        if count <= self.capacity:
+            return
+
+        capacity = max(count, 2 * self.capacity, self.initial_capacity)
+
+        data = np.zeros((capacity, self.size), self.dtype)
+        data[:self.count] = self.data[:self.count]
+
+        self.data = data
+        self.capacity = capacity
+
+        if self.buffer is None:
+            self.buffer = QOpenGLBuffer(self.kind)
+            self.buffer.create()
+            self.buffer.setUsagePattern(QOpenGLBuffer.DynamicDraw)
+
+        self.buffer.bind()
+        self.buffer.allocate(data.nbytes)
+
+        if self.count:
+            self.buffer.write(0, data[:self.count], self.count * self.stride)
+
+        self.buffer.release()
+
+
+    def set_region(self, start, rows):
+        rows = np.ascontiguousarray(rows, self.dtype).reshape(-1, self.size)
+
+        stop = start + len(rows)
+        self.reserve(stop)
+
+        self.data[start:stop] = rows
+
+        self.buffer.bind()
+        self.buffer.write(start * self.stride, rows, rows.nbytes)
+        self.buffer.release()
+
+        self.count = max(self.count, stop)
+
+
+    def bind(self):
+        self.buffer.bind()
+
+
+    def release(self):
+        self.buffer.release()
+
+
+    def destroy(self):
+        if self.buffer is not None:
+            self.buffer.destroy()
+
+        self.buffer = None
+        self.count = self.capacity = 0
+
+
+class QtVertexBuffer(object):
+    """
+    Growable 2d position / RGBA color arrays in QOpenGLBuffers, bound to a
+    shader program's attributes through a vertex array object.
+
+    This is the Qt counterpart of victor.vertex_buffer.VertexBuffer: capacity
+    doubles when exhausted and only the rows that are written get uploaded.
+    """
+
+    position_dtype = np.dtype(np.float32)
+    color_dtype = np.dtype(np.uint8)
+
+    position_size = 2
+    color_size = 4
+
+    def __init__(self, capacity=16):
+        self.positions = QtArrayBuffer(self.position_dtype, self.position_size, capacity=capacity)
+        self.colors = QtArrayBuffer(self.color_dtype, self.color_size, capacity=capacity)
+
+        self.count = 0
+        self.vao = None
+        self.attached = None
+
+
+    @property
+    def capacity(self):
+        return self.positions.capacity
+
+
+    def reserve(self, count):
+        self.positions.reserve(count)
+        self.colors.reserve(count)
+
+        if self.vao is None:
+            self.vao = QOpenGLVertexArrayObject()
+            self.vao.create()
+
+
+    def set_region(self, start, positions, colors):
+        positions = np.ascontiguousarray(positions, self.position_dtype).reshape(-1, self.position_size)
+        self.reserve(start + len(positions))
+
+        self.positions.set_region(start, positions)
+        self.colors.set_region(start, colors)
+
+        self.count = max(self.count, start + len(positions))
+
+
+    def extend(self, positions, colors):
+        self.set_region(self.count, positions, colors)
+
+
+    def clear(self):
+        """
+        Forget the contents but keep the buffers for reuse.
+        """
+        self.count = self.positions.count = self.colors.count = 0
+
+
+    def attach(self, program, position_location, color_location):
+        """
+        Record in the vertex array object where program finds positions and
+        colors; needs doing once per program, not per frame.
+        """
+        key = (id(program), position_location, color_location)
+        if self.attached == key:
+            return
+
+        self.vao.bind()
+
+        self.positions.bind()
+        program.enableAttributeArray(position_location)
+        program.setAttributeBuffer(position_location, GL_FLOAT, 0, self.position_size, 0)
+
+        # unsigned byte attributes are normalized to [0, 1]
+        self.colors.bind()
+        program.enableAttributeArray(color_location)
+        program.setAttributeBuffer(color_location, GL_UNSIGNED_BYTE, 0, self.color_size, 0)
+
+        self.vao.release()
+        self.colors.release()
+
+        self.attached = key
+
+
+    def bind(self):
+        self.vao.bind()
+
+
+    def unbind(self):
+        self.vao.release()
+
+
+    def draw(self, gl, mode, first=0, count=None):
+        if count is None:
+            count = self.count - first
+
+        if count <= 0:
+            return
+
+        self.bind()
+        gl.glDrawArrays(mode, first, count)
+        self.unbind()
+
+
+    def delete(self):
+        self.positions.destroy()
+        self.colors.destroy()
+
+        if self.vao is not None:
+            self.vao.destroy()
+
+        self.vao = None
+        self.attached = None
+        self.count = 0
@@ -0,0 +1,280 @@
+"""
+Rasterize PathGroup trees to PNG without a window or GL context.
+
+The image is rendered in horizontal strips of `tile` rows, which are
+compressed into the PNG as they are finished, so the full image is never in
+memory at once. Strips can be rendered and compressed by a pool of
+processes, each of which opens the document itself; native documents are
+memory mapped, so the workers share their points through the page cache.
+
+Lines are one pixel wide and not anti-aliased: each segment is sampled at
+least once per pixel it crosses and the samples are blended over the
+background with the path's color. Paths are simplified to the level of
+detail that matches the image's scale (see victor.lod), and paths whose
+bounds miss a strip are skipped.
+"""
+
+import collections
+import math
+import multiprocessing
+import struct
+import zlib
+
+import numpy as np
+
+import victor.document as document
+import victor.svg as svg
+from victor.lod import level_for_zoom
+from victor.path_group import PathGroup
+from victor.vector import *
+
+__all__ = [
+    'encode_strip',
+    'fit',
+    'load',
+    'render',
+    'render_group',
+    'render_strip',
+    'write_png',
+]
+
+BACKGROUND = (255, 255, 255, 255)
+
+
+def load(filename):
+    """
+    The root PathGroup of a native document or, by extension, an SVG file.
+    """
+    if filename.lower().endswith('.svg'):
+        return svg.read(filename)
+
+    root, _ = document.load(filename)
+    return root
+
+
+def fit(bounds, size, margin=0):
+    """
+    The (width, height, matrix) of an image whose longer side is size pixels
+    and which shows bounds, a world box, inside a margin; matrix maps world
+    coordinates to pixels, whose y grows downwards.
+    """
+    x0, y0, x1, y1 = bounds
+
+    if x0 > x1:
+        return size, size, scale(1, -1).dot(translate(0, size))
+
+    if size <= 2 * margin + 1:
+        raise ValueError('size must exceed twice the margin')
+
+    w, h = x1 - x0, y1 - y0
+    longest = max(w, h)
+
+    # the far edges fall inside the last pixels
+    s = (size - 2 * margin - 1) / longest if longest else 1.
+    width = int(round(w * s)) + 2 * margin + 1
+    height = int(round(h * s)) + 2 * margin + 1
+
+    return width, height, np.array([
+        [ s, 0, 0 ],
+        [ 0, -s, 0 ],
+        [ margin - x0 * s, margin + y1 * s, 1 ],
+    ])
+
+
+def _pixels(points):
+    """
+    Integer pixel coordinates along the polyline through points, at least
+    one per pixel each segment crosses.
+    """
+    a, b = points[:-1], points[1:]
+
+    steps = np.maximum(np.ceil(np.abs(b - a).max(axis=1)), 1).astype(np.int64)
+    segment = np.repeat(np.arange(len(a)), steps)
+    t = np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)
+
+    samples = a[segment] + (b - a)[segment] * (t / steps[segment])[:, None]
+    samples = np.concatenate([ samples, points[-1:] ])
+
+    return np.floor(samples).astype(np.int64)
+
+
+def _visible_paths(group, matrix, rect):
+    """
+    The paths below group whose bounds may meet rect, a pixel box, each
+    with the matrix taking its points to pixels.
+    """
+    m = group.transform.dot(matrix)
+
+    for child in group.children:
+        if isinstance(child, PathGroup):
+            if intersects(transform_bounds(child.bounds, child.transform.dot(m)), rect):
+                yield from _visible_paths(child, m, rect)
+
+        elif len(child) > 1 and intersects(transform_bounds(child.bounds, m), rect):
+            yield child, m
+
+
+def render_strip(root, matrix, width, top, bottom, background=BACKGROUND):
+    """
+    Rows top to bottom of the image of root under matrix, as a
+    (bottom - top, width, 4) uint8 array.
+    """
+    strip = np.empty((bottom - top, width, 4), dtype=np.uint8)
+    strip[:] = background
+
+    # one pixel of slack for the floor() rounding
+    rect = (-1, top - 1, width + 1, bottom + 1)
+    level = level_for_zoom(math.sqrt(abs(np.linalg.det(np.asarray(matrix)[:2, :2]))) or 1.)
+
+    for path, m in _visible_paths(root, np.asarray(matrix, dtype=np.float64), rect):
+        points = path.approximate(level)
+        pixels = _pixels(points.dot(m[:2, :2]) + m[2, :2])
+
+        x, y = pixels[:, 0], pixels[:, 1] - top
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < len(strip))
+        x, y = x[inside], y[inside]
+
+        color = np.array(path.color, dtype=np.float64)
+        alpha = color[3] / 255
+
+        under = strip[y, x].astype(np.float64)
+        blended = color * alpha + under * (1 - alpha)
+        blended[:, 3] = 255 * alpha + under[:, 3] * (1 - alpha)
+
+        strip[y, x] = np.round(blended).astype(np.uint8)
+
+    return strip
+
+
+def _chunk(kind, data):
+    chunk = kind + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def _adler32_combine(a, b, length):
+    # the adler32 of two strings from theirs and the second one's length
+    base = 65521
+    low = ((a & 0xffff) + (b & 0xffff) - 1) % base
+    high = ((a >> 16) + (b >> 16) + length * ((a & 0xffff) - 1)) % base
+    return (high << 16) | low
+
+
+def encode_strip(strip):
+    """
+    The PNG rows of a (rows, width, 4) uint8 strip, deflated on their own
+    and ending on a byte boundary, so encoded strips can be compressed in
+    parallel and concatenated by write_png(). Returns the deflated data and
+    the adler32 and length of the rows.
+    """
+    # each row starts with filter type 0, none
+    rows = np.zeros((len(strip), 1 + strip.shape[1] * 4), dtype=np.uint8)
+    rows[:, 1:] = strip.reshape(len(strip), -1)
+    rows = rows.tobytes()
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    data = compressor.compress(rows) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+    return data, zlib.adler32(rows), len(rows)
+
+
+def write_png(fd, width, height, strips):
+    """
+    Write an RGBA PNG to the binary file fd from strips, an iterable of
+    encode_strip() results covering the image from the top.
+    """
+    fd.write(b'\x89PNG\r\n\x1a\n')
+    fd.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+
+    # the zlib header for deflate with the default compression level
+    fd.write(_chunk(b'IDAT', b'\x78\x9c'))
+
+    checksum, size = zlib.adler32(b''), 0
+
+    for data, adler, length in strips:
+        fd.write(_chunk(b'IDAT', data))
+        checksum = _adler32_combine(checksum, adler, length)
+        size += length
+
+    if size != height * (1 + 4 * width):
+        raise ValueError('strips cover {} bytes of {}'.format(size, height * (1 + 4 * width)))
+
+    # an empty final block, then the checksum of everything
+    end = zlib.compressobj(6, zlib.DEFLATED, -15).flush()
+    fd.write(_chunk(b'IDAT', end + struct.pack('>I', checksum)))
+    fd.write(_chunk(b'IEND', b''))
+
+
+_worker = None
+
+
+def _start_worker(source, matrix, width, background):
+    global _worker
+    _worker = (load(source), matrix, width, background)
+
+
+def _render_worker_strip(rows):
+    root, matrix, width, background = _worker
+    return encode_strip(render_strip(root, matrix, width, rows[0], rows[1], background))
+
+
+def _strips(height, tile):
+    return [ (top, min(top + tile, height)) for top in range(0, height, tile) ]
+
+
+def _in_order(pool, func, items, window):
+    """
+    func(item) for each of items, computed by pool and yielded in order,
+    with at most window of them in flight, so finished results never pile
+    up behind a slow one.
+    """
+    pending = collections.deque()
+
+    for item in items:
+        if len(pending) == window:
+            yield pending.popleft().get()
+
+        pending.append(pool.apply_async(func, (item,)))
+
+    while pending:
+        yield pending.popleft().get()
+
+
+def render_group(root, output, size, tile=256, margin=0, background=BACKGROUND):
+    """
+    Render the tree below root to the PNG file output in this process, as
+    render() does a document file. Returns the image's (width, height).
+    """
+    width, height, matrix = fit(root.world_bounds, size, margin)
+
+    with open(output, 'wb') as fd:
+        write_png(fd, width, height, (
+            encode_strip(render_strip(root, matrix, width, top, bottom, background))
+            for top, bottom in _strips(height, tile)
+        ))
+
+    return width, height
+
+
+def render(source, output, size, tile=256, processes=1, margin=0, background=BACKGROUND):
+    """
+    Render the document in the file source to the PNG file output, with a
+    longer side of size pixels, in strips of tile rows spread over
+    processes worker processes. Returns the image's (width, height).
+    """
+    root = load(source)
+
+    if processes <= 1:
+        return render_group(root, output, size, tile, margin, background)
+
+    width, height, matrix = fit(root.world_bounds, size, margin)
+
+    with open(output, 'wb') as fd:
+        with multiprocessing.Pool(
+            processes, _start_worker, (source, matrix, width, background)
+        ) as pool:
+            # two strips per worker keep them all busy while one is
+            # written; the workers compress them too
+            strips = _in_order(pool, _render_worker_strip, _strips(height, tile), 2 * processes)
+            write_png(fd, width, height, strips)
+
+    return width, height
@@ -0,0 +1,147 @@
+import collections
+import hashlib
+import os
+import threading
+
+from victor.scene_codec import encode
+
+__all__ = [ 'RenderCache', 'scene_key' ]
+
+
+def scene_key(scene, settings=None):
+    """
+    A stable hex digest of a scene dictionary and the render settings, taken
+    over their scene_codec encoding, which writes dict keys sorted and
+    arrays as raw blocks. RenderWorker computes it on its own thread.
+    """
+    return hashlib.sha256(encode({ 'scene' : scene, 'settings' : settings })).hexdigest()
+
+
+class RenderCache(object):
+    """
+    Rendered images keyed by scene_key().
+
+    Recently used images are kept in memory, and every image is also written
+    to directory under its key. Both tiers evict least recently used entries
+    once they exceed their byte budget; the directory is listed once, when
+    the cache is made, and the disk tier's sizes are tracked from then on.
+    hits and misses count get() results.
+
+    A cache may be shared between threads: the render worker fills it while
+    the UI thread looks images up.
+    """
+
+    def __init__(self, directory, memory_bytes=256 << 20, disk_bytes=1 << 30):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self.memory = collections.OrderedDict()
+        self.memory_used = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.disk = collections.OrderedDict()
+        self.disk_used = 0
+
+        entries = [ ]
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.partial'): continue
+
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for mtime, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_used += size
+
+
+    def __contains__(self, key):
+        return key in self.memory or os.path.exists(self._path(key))
+
+
+    def get(self, key):
+        with self.lock:
+            data = self.memory.get(key)
+
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return data
+
+        path = self._path(key)
+
+        try:
+            with open(path, 'rb') as fd:
+                data = fd.read()
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        os.utime(path)
+
+        with self.lock:
+            if key in self.disk:
+                self.disk.move_to_end(key)
+
+            self._remember(key, data)
+            self.hits += 1
+
+        return data
+
+
+    def put(self, key, data):
+        with self.lock:
+            self._remember(key, data)
+
+        path = self._path(key)
+        partial = '{}.{}.partial'.format(path, threading.get_ident())
+
+        with open(partial, 'wb') as fd:
+            fd.write(data)
+
+        os.replace(partial, path)
+
+        with self.lock:
+            self.disk_used += len(data) - self.disk.pop(key, 0)
+            self.disk[key] = len(data)
+            self._evict_disk()
+
+
+    @property
+    def stats(self):
+        return { 'hits' : self.hits, 'misses' : self.misses, 'entries' : len(self.memory) }
+
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+
+    def _remember(self, key, data):
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= len(old)
+
+        self.memory[key] = data
+        self.memory_used += len(data)
+
+        while self.memory_used > self.memory_bytes and len(self.memory) > 1:
+            _, data = self.memory.popitem(last=False)
+            self.memory_used -= len(data)
+
+
+    def _evict_disk(self):
+        # the newest entry stays, whatever its size
+        while self.disk_used > self.disk_bytes and len(self.disk) > 1:
+            key, size = self.disk.popitem(last=False)
+            self.disk_used -= size
+
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,249 @@
+"""
+A long-lived renderer process.
+
+    python -m victor.render_server SPEC [--frames DIRECTORY]
+
+reads render requests from stdin and writes images to stdout, one framed
+message each. A SCENE request carries a whole scene in the binary encoding of
+victor.scene_codec; a PATCH request carries the diff against the scene of the
+previous request, so an edit costs what it changed rather than a fresh copy of
+the scene. SPEC selects the renderer: "script:PATH" runs a script that
+takes a scene path and an output path on its command line, like the
+handsome examples, and "MODULE:FUNCTION" calls FUNCTION(scene). Either way
+the interpreter and the renderer's imports are paid for once.
+
+A renderer returns either encoded image bytes, which are sent back as they
+are, or raw pixels: a RawFrame or a (height, width, 4) uint8 array. With
+--frames, raw pixels are written to memory mapped files in DIRECTORY and
+only their name and size travel over the pipe.
+
+SIGINT cancels the render in progress without ending the process. It is
+ignored while a request is being read, as a read cut short would lose the
+stream's place between messages.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import runpy
+import signal
+import struct
+import sys
+import tempfile
+import traceback
+
+from victor.frame import FrameWriter, RawFrame
+from victor.scene_codec import apply_patch, decode
+
+__all__ = [
+    'CANCELLED',
+    'ERROR',
+    'FRAME',
+    'OK',
+    'PATCH',
+    'SCENE',
+    'load_renderer',
+    'read_message',
+    'write_message',
+]
+
+OK        = 0x0
+ERROR     = 0x1
+CANCELLED = 0x2
+FRAME     = 0x3
+
+SCENE     = 0x10
+PATCH     = 0x11
+
+_header = struct.Struct('<BI')
+_frame_header = struct.Struct('<II')
+
+
+def write_message(stream, status, payload):
+    stream.write(_header.pack(status, len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def _read_exactly(stream, size):
+    chunks = [ ]
+
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            return None
+
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b''.join(chunks)
+
+
+def read_message(stream):
+    """
+    Return (status, payload), or None at end of stream.
+    """
+    header = _read_exactly(stream, _header.size)
+    if header is None:
+        return None
+
+    status, size = _header.unpack(header)
+    payload = _read_exactly(stream, size)
+
+    if payload is None:
+        return None
+
+    return status, payload
+
+
+def _tolist(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def script_renderer(path):
+    directory = tempfile.mkdtemp(prefix='victor-render-')
+    scene_path = os.path.join(directory, 'victor_scene.json')
+    render_path = os.path.join(directory, 'victor_render.tiff')
+
+    def render(scene):
+        with open(scene_path, 'w') as fd:
+            json.dump(scene, fd, default=_tolist)
+
+        argv, sys.argv = sys.argv, [ path, scene_path, render_path ]
+
+        try:
+            runpy.run_path(path, run_name='__main__')
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise RuntimeError('{} exited with {}'.format(path, e.code))
+        finally:
+            sys.argv = argv
+
+        with open(render_path, 'rb') as fd:
+            data = fd.read()
+
+        os.remove(render_path)
+        return data
+
+    return render
+
+
+def load_renderer(spec):
+    kind, _, target = spec.partition(':')
+
+    if kind == 'script':
+        return script_renderer(target)
+
+    return getattr(importlib.import_module(kind), target)
+
+
+def encode_frame(width, height, name):
+    return _frame_header.pack(width, height) + name.encode('utf-8')
+
+
+def decode_frame(payload):
+    width, height = _frame_header.unpack_from(payload)
+    return width, height, payload[_frame_header.size:].decode('utf-8')
+
+
+def _reply(stdout, image, frames):
+    if isinstance(image, (bytes, bytearray)):
+        write_message(stdout, OK, image)
+        return
+
+    if not isinstance(image, RawFrame):
+        image = RawFrame.from_array(image)
+
+    if frames is None:
+        write_message(stdout, OK, image.to_bytes())
+    else:
+        name = frames.write(image)
+        write_message(stdout, FRAME, encode_frame(image.width, image.height, name))
+
+
+class Interrupt(object):
+    """
+    A SIGINT handler that raises KeyboardInterrupt only while armed. Reads
+    interrupted by a disarmed handler carry on where they were.
+    """
+    def __init__(self):
+        self.armed = False
+
+    def __call__(self, signum, frame):
+        if self.armed:
+            raise KeyboardInterrupt()
+
+
+def serve(render, stdin, stdout, frames=None, interrupt=None):
+    interrupt = interrupt or Interrupt()
+    scene = None
+
+    while True:
+        message = read_message(stdin)
+
+        if message is None:
+            return 0
+
+        status, payload = message
+
+        try:
+            interrupt.armed = True
+
+            if status == SCENE:
+                scene = None
+                scene = decode(payload)
+            elif status == PATCH:
+                if scene is None:
+                    raise ValueError('patch without a scene')
+                scene = apply_patch(scene, decode(payload))
+            else:
+                raise ValueError('unknown request {:#x}'.format(status))
+
+            image = render(scene)
+            interrupt.armed = False
+        except KeyboardInterrupt:
+            # the scene may be half patched; the client resends it whole
+            interrupt.armed = False
+            scene = None
+            write_message(stdout, CANCELLED, b'')
+        except BaseException:
+            interrupt.armed = False
+            scene = None
+            write_message(stdout, ERROR, traceback.format_exc().encode('utf-8'))
+        else:
+            _reply(stdout, image, frames)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(prog='victor.render_server')
+    parser.add_argument('spec')
+    parser.add_argument('--frames')
+    args = parser.parse_args(argv)
+
+    render = load_renderer(args.spec)
+    frames = FrameWriter(args.frames) if args.frames else None
+
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+    # anything the renderer prints must not end up in the reply stream
+    sys.stdout = sys.stderr
+
+    interrupt = Interrupt()
+    signal.signal(signal.SIGINT, interrupt)
+
+    try:
+        return serve(render, stdin, stdout, frames, interrupt)
+    finally:
+        if frames is not None:
+            frames.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,403 @@
+import json
+import os
+import signal
+import subprocess as sp
+import sys
+import threading
+
+import victor.render_server as server
+from victor.exceptions import RenderCancelled, RenderError
+from victor.frame import FrameReader, RawFrame
+from victor.render_cache import scene_key
+from victor.scene_codec import diff, encode
+
+__all__ = [
+    'CommandRenderer',
+    'RenderProcess',
+    'RenderWorker',
+]
+
+
+def _kill_group(process, sig=signal.SIGTERM):
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, sig)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+class CommandRenderer(object):
+    """
+    Renders by running a shell command per scene.
+
+    command is a template with {scene_path} and {render_path} fields.
+    begin() starts a request: a cancel() after it, even one before render()
+    runs the command, cancels the render.
+    """
+
+    def __init__(self, command, directory):
+        self.command = command
+        self.directory = directory
+        self.process = None
+        self.cancelled = False
+        self.count = 0
+
+
+    @property
+    def description(self):
+        return self.command
+
+
+    def begin(self):
+        self.cancelled = False
+
+
+    def render(self, scene):
+        self.count += 1
+        scene_path = os.path.join(self.directory, 'victor_scene_{}.json'.format(self.count))
+        render_path = os.path.join(self.directory, 'victor_render_{}.tiff'.format(self.count))
+
+        with open(scene_path, 'w') as fd:
+            json.dump(scene, fd)
+
+        try:
+            command = self.command.format(scene_path=scene_path, render_path=render_path)
+
+            if self.cancelled:
+                raise RenderCancelled()
+
+            self.process = process = sp.Popen(
+                command, shell=True, stderr=sp.PIPE, start_new_session=True
+            )
+
+            # a cancel that came while it started found no process to end
+            if self.cancelled:
+                _kill_group(process)
+
+            _, err = process.communicate()
+            self.process = None
+
+            if self.cancelled:
+                raise RenderCancelled()
+
+            if process.returncode != 0:
+                raise RenderError(err.decode(errors='replace'))
+
+            with open(render_path, 'rb') as fd:
+                return fd.read()
+
+        finally:
+            for path in (scene_path, render_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+    def cancel(self):
+        self.cancelled = True
+
+        process = self.process
+        if process is not None:
+            _kill_group(process)
+
+
+    def close(self):
+        self.cancel()
+
+
+class RenderProcess(object):
+    """
+    Renders through a long-lived victor.render_server process.
+
+    The process is started on the first render and restarted on the next
+    render after it dies. begin() starts a request, and a cancel() after it
+    cancels the request's render without ending the process: one before
+    render() is called sends nothing, and one during the render interrupts
+    the process. The process is only interrupted once the request has been
+    written whole, as a signal while it reads would leave the message
+    stream out of step; a cancel during the write is held until then. When
+    frames names a directory, raw pixel renders come back as RawFrames
+    mapped from files there rather than through the pipe.
+
+    The process keeps the last scene it was sent, so after the first render
+    only the diff against that scene goes over the pipe. A fresh process, an
+    error or a cancel falls back to sending the whole scene. Scenes are
+    compared against the last one rendered, so build a new scene for each
+    render rather than mutating the previous one.
+    """
+
+    def __init__(self, spec, python=sys.executable, frames=None):
+        self.spec = spec
+        self.python = python
+        self.frames = frames
+        self.reader = FrameReader(frames) if frames else None
+        self.process = None
+        self.rendering = False
+        self.interrupted = False
+        self.lock = threading.Lock()
+        self.sent = None
+
+
+    @property
+    def description(self):
+        return self.spec
+
+
+    def begin(self):
+        with self.lock:
+            self.interrupted = False
+
+
+    def start(self):
+        env = dict(os.environ)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [ root, env.get('PYTHONPATH') ]))
+
+        argv = [ self.python, '-m', 'victor.render_server', self.spec ]
+        if self.frames:
+            argv += [ '--frames', self.frames ]
+
+        self.process = sp.Popen(
+            argv,
+            stdin=sp.PIPE, stdout=sp.PIPE, env=env, start_new_session=True
+        )
+
+
+    def _request(self, scene):
+        if self.sent is None:
+            return server.SCENE, encode(scene)
+
+        return server.PATCH, encode(diff(self.sent, scene))
+
+
+    def render(self, scene):
+        with self.lock:
+            if self.interrupted:
+                raise RenderCancelled()
+
+        for attempt in (0, 1):
+            if self.process is None or self.process.poll() is not None:
+                self._reap()
+                self.start()
+
+            status, payload = self._request(scene)
+
+            try:
+                server.write_message(self.process.stdin, status, payload)
+                break
+
+            except OSError:
+                # it died while idle; start a fresh one and try again
+                self._reap()
+
+        else:
+            raise RenderError('unable to start renderer {}'.format(self.spec))
+
+        with self.lock:
+            self.rendering = True
+
+            if self.interrupted:
+                self.process.send_signal(signal.SIGINT)
+
+        message = server.read_message(self.process.stdout)
+
+        with self.lock:
+            self.rendering = False
+
+        if message is None:
+            self._reap()
+            raise RenderError('renderer {} exited'.format(self.spec))
+
+        status, data = message
+        self.sent = scene
+
+        if status == server.CANCELLED:
+            self.sent = None
+            raise RenderCancelled()
+
+        if status == server.ERROR:
+            self.sent = None
+            raise RenderError(data.decode('utf-8', errors='replace'))
+
+        if status == server.FRAME:
+            width, height, name = server.decode_frame(data)
+            return self.reader.read(name, width, height)
+
+        return data
+
+
+    def cancel(self):
+        with self.lock:
+            self.interrupted = True
+
+            if self.rendering:
+                self.process.send_signal(signal.SIGINT)
+
+
+    def close(self):
+        if self.process is None:
+            return
+
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except (OSError, sp.TimeoutExpired):
+            _kill_group(self.process, signal.SIGKILL)
+
+        self._reap()
+
+
+    def _reap(self):
+        process, self.process = self.process, None
+        self.sent = None
+
+        if process is None:
+            return
+
+        for stream in (process.stdin, process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+        process.wait()
+
+
+class RenderWorker(object):
+    """
+    Runs a renderer on a background thread, one job at a time.
+
+    Submitting a scene supersedes the job that is waiting or running; the
+    running render is cancelled and its output is never published. Call
+    poll() from the UI thread to pick up the newest finished image.
+
+    Given a RenderCache, the worker keys each job on its scene and the
+    renderer's description, unless submit() was given a key, and answers it
+    from the cache when it can. Images it renders are stored in the cache
+    after they are published. Hashing the scene, copying the frame and the
+    disk write all happen on the worker's thread rather than the UI's.
+    """
+
+    def __init__(self, renderer, cache=None):
+        self.renderer = renderer
+        self.cache = cache
+
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.pending = None
+        self.running = False
+        self.finished = None
+        self.error = None
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name='victor-render', daemon=True)
+        self.thread.start()
+
+
+    def submit(self, scene, key=None):
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, scene, key)
+            self._cancel()
+            self.condition.notify()
+
+        return self.generation
+
+
+    def cancel(self):
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+            self._cancel()
+
+
+    def poll(self):
+        """
+        Return (key, image) for an image finished since the last poll, or
+        None. key is the value given to the matching submit(); image is either
+        encoded image bytes or a RawFrame.
+        """
+        with self.condition:
+            finished, self.finished = self.finished, None
+
+        return finished
+
+
+    @property
+    def busy(self):
+        with self.condition:
+            return self.pending is not None or self.running
+
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.pending = None
+            self._cancel()
+            self.condition.notify()
+
+        self.thread.join()
+        self.renderer.close()
+
+
+    def _cancel(self):
+        if self.running:
+            self.renderer.cancel()
+
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+
+                if self.closed:
+                    return
+
+                generation, scene, key = self.pending
+                self.pending = None
+                self.running = True
+
+                # cancels from here on are this job's
+                self.renderer.begin()
+
+            data = None
+            cached = False
+
+            try:
+                if self.cache is not None:
+                    if key is None:
+                        key = scene_key(scene, { 'renderer' : self.renderer.description })
+
+                    data = self.cache.get(key)
+                    cached = data is not None
+
+                if data is None:
+                    data = self.renderer.render(scene)
+            except RenderCancelled:
+                data = None
+            except Exception as e:
+                # anything else must not end the thread, or busy stays set
+                data = None
+                self.error = str(e) or type(e).__name__
+                sys.stderr.write('render failed: {}\n'.format(self.error))
+
+            with self.condition:
+                self.running = False
+
+                if data is not None and generation == self.generation:
+                    self.finished = (key, data)
+
+            if data is not None and not cached and self.cache is not None:
+                self._store(key, data)
+
+
+    def _store(self, key, data):
+        if isinstance(data, RawFrame):
+            data = data.to_bytes()
+
+        try:
+            self.cache.put(key, data)
+        except OSError as e:
+            sys.stderr.write('unable to cache render: {}\n'.format(e))
@@ -0,0 +1,242 @@
+"""
+A compact binary encoding for scene dictionaries, and patches between them.
+
+encode()/decode() handle None, bools, ints, floats, strings, bytes, lists,
+dicts with string keys and numpy arrays; arrays are stored as raw little
+endian blocks rather than as nested lists. Dict keys are written sorted, so
+equal scenes encode to equal bytes.
+
+diff(old, new) returns the operations that turn old into new, and
+apply_patch() performs them:
+
+    [ 'set',    path, value ]
+    [ 'append', path, value ]   # append value to the list at path
+    [ 'delete', path ]
+
+where path is a list of dict keys and list indices from the root.
+"""
+
+import struct
+
+import numpy as np
+
+__all__ = [
+    'apply_patch',
+    'decode',
+    'diff',
+    'encode',
+]
+
+_u8 = struct.Struct('<B')
+_u32 = struct.Struct('<I')
+_i64 = struct.Struct('<q')
+_f64 = struct.Struct('<d')
+
+
+def _encode(obj, out):
+    if obj is None:
+        out.append(b'N')
+
+    elif obj is True:
+        out.append(b'T')
+
+    elif obj is False:
+        out.append(b'F')
+
+    elif isinstance(obj, (int, np.integer)):
+        out.append(b'i')
+        out.append(_i64.pack(int(obj)))
+
+    elif isinstance(obj, (float, np.floating)):
+        out.append(b'd')
+        out.append(_f64.pack(float(obj)))
+
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        out.append(b's')
+        out.append(_u32.pack(len(data)))
+        out.append(data)
+
+    elif isinstance(obj, (bytes, bytearray)):
+        out.append(b'b')
+        out.append(_u32.pack(len(obj)))
+        out.append(bytes(obj))
+
+    elif isinstance(obj, np.ndarray):
+        array = np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder('<'))
+        dtype = array.dtype.str.encode('ascii')
+
+        out.append(b'a')
+        out.append(_u8.pack(len(dtype)))
+        out.append(dtype)
+        out.append(_u8.pack(array.ndim))
+        out.append(struct.pack('<{}I'.format(array.ndim), *array.shape))
+        out.append(array.tobytes())
+
+    elif isinstance(obj, (list, tuple)):
+        out.append(b'l')
+        out.append(_u32.pack(len(obj)))
+        for item in obj:
+            _encode(item, out)
+
+    elif isinstance(obj, dict):
+        out.append(b'm')
+        out.append(_u32.pack(len(obj)))
+        for key in sorted(obj):
+            _encode(key, out)
+            _encode(obj[key], out)
+
+    else:
+        raise TypeError('cannot encode {!r}'.format(obj))
+
+
+def encode(obj):
+    out = [ ]
+    _encode(obj, out)
+    return b''.join(out)
+
+
+def _decode(data, i):
+    tag = data[i:i + 1]
+    i += 1
+
+    if tag == b'N': return None, i
+    if tag == b'T': return True, i
+    if tag == b'F': return False, i
+
+    if tag == b'i':
+        return _i64.unpack_from(data, i)[0], i + _i64.size
+
+    if tag == b'd':
+        return _f64.unpack_from(data, i)[0], i + _f64.size
+
+    if tag in (b's', b'b'):
+        size, = _u32.unpack_from(data, i)
+        i += _u32.size
+        value = bytes(data[i:i + size])
+        return (value.decode('utf-8') if tag == b's' else value), i + size
+
+    if tag == b'a':
+        size, = _u8.unpack_from(data, i)
+        dtype = np.dtype(bytes(data[i + 1:i + 1 + size]).decode('ascii'))
+        i += 1 + size
+
+        ndim, = _u8.unpack_from(data, i)
+        shape = struct.unpack_from('<{}I'.format(ndim), data, i + 1)
+        i += 1 + 4 * ndim
+
+        count = int(np.prod(shape, dtype=np.int64))
+        array = np.frombuffer(data, dtype=dtype, count=count, offset=i).reshape(shape).copy()
+        return array, i + count * dtype.itemsize
+
+    if tag == b'l':
+        size, = _u32.unpack_from(data, i)
+        i += _u32.size
+        out = [ ]
+
+        for _ in range(size):
+            item, i = _decode(data, i)
+            out.append(item)
+
+        return out, i
+
+    if tag == b'm':
+        size, = _u32.unpack_from(data, i)
+        i += _u32.size
+        out = { }
+
+        for _ in range(size):
+            key, i = _decode(data, i)
+            out[key], i = _decode(data, i)
+
+        return out, i
+
+    raise ValueError('bad tag {!r} at {}'.format(tag, i - 1))
+
+
+def decode(data):
+    obj, i = _decode(memoryview(data), 0)
+
+    if i != len(data):
+        raise ValueError('{} trailing bytes'.format(len(data) - i))
+
+    return obj
+
+
+def _same(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (isinstance(a, np.ndarray) and isinstance(b, np.ndarray)
+                and a.dtype == b.dtype and np.array_equal(a, b))
+
+    if type(a) is not type(b):
+        return False
+
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key]) for key in a)
+
+    return a == b
+
+
+def diff(old, new, path=()):
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [ ]
+
+        for key, value in new.items():
+            if key not in old:
+                ops.append([ 'set', list(path) + [ key ], value ])
+            else:
+                ops.extend(diff(old[key], value, path + (key,)))
+
+        for key in old:
+            if key not in new:
+                ops.append([ 'delete', list(path) + [ key ] ])
+
+        return ops
+
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)) and len(new) >= len(old):
+        ops = [ ]
+
+        for i, (a, b) in enumerate(zip(old, new)):
+            ops.extend(diff(a, b, path + (i,)))
+
+        for value in new[len(old):]:
+            ops.append([ 'append', list(path), value ])
+
+        return ops
+
+    if _same(old, new):
+        return [ ]
+
+    return [ [ 'set', list(path), new ] ]
+
+
+def apply_patch(scene, ops):
+    """
+    Apply diff() output to scene in place and return the patched scene.
+    """
+    for op in ops:
+        kind, path = op[0], op[1]
+
+        if not path:
+            if kind != 'set':
+                raise ValueError('cannot {} the root'.format(kind))
+            scene = op[2]
+            continue
+
+        parent = scene
+        for key in path[:-1]:
+            parent = parent[key]
+
+        if kind == 'set':
+            parent[path[-1]] = op[2]
+        elif kind == 'append':
+            parent[path[-1]].append(op[2])
+        elif kind == 'delete':
+            del parent[path[-1]]
+        else:
+            raise ValueError('unknown patch operation {!r}'.format(kind))
+
+    return scene
@@ -0,0 +1,48 @@
+import pyglet.gl as gl
+
+from victor.path_slots import PathSlots
+from victor.vector import affine4f
+from victor.vertex_buffer import VertexBuffer
+
+__all__ = [ 'SceneRenderer' ]
+
+
+class SceneRenderer(PathSlots):
+    """
+    Draws every path below a PathGroup out of one shared vertex buffer.
+
+    Each group's paths are drawn with one glMultiDrawArrays call under the
+    group's cached world matrix. Neighbouring groups with equal world
+    matrices share a call, so an untransformed tree is drawn in one call
+    however deep it is.
+    """
+
+    def __init__(self, root, vertices=None):
+        super().__init__(root, vertices if vertices is not None else VertexBuffer())
+
+
+    def draw(self, rect=None):
+        """
+        Draw the paths; given rect, a world (x0, y0, x1, y1) box, only
+        those that may be visible in it.
+        """
+        self.update()
+
+        visible = self.cull(rect) if rect is not None else None
+
+        for world, start, stop in self._merged_runs():
+            firsts, counts = self.firsts[start:stop], self.counts[start:stop]
+
+            if visible is not None:
+                mask = visible[start:stop]
+                if not mask.any():
+                    continue
+
+                firsts, counts = firsts[mask], counts[mask]
+
+            gl.glPushMatrix()
+            gl.glMultMatrixf((gl.GLfloat * 16)(*affine4f(world).flat))
+
+            self.vertices.multi_draw(gl.GL_LINE_STRIP, firsts, counts)
+
+            gl.glPopMatrix()
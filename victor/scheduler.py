@@ -0,0 +1,44 @@
+__all__ = [
+    'Ticker',
+]
+
+
+class Ticker(object):
+    """
+    Calls callback(dt) through a pyglet style clock, but only while running.
+
+    An interval of 0 ticks once per clock tick, that is once per frame in a
+    pyglet event loop, so animation keeps pace with the display whatever its
+    refresh rate. When nothing is running the clock has nothing scheduled
+    and an idle application sleeps until the next input event.
+    """
+
+    def __init__(self, clock, callback, interval=0):
+        self.clock = clock
+        self.callback = callback
+        self.interval = interval
+        self.running = False
+
+
+    def set_running(self, running):
+        running = bool(running)
+
+        if running == self.running:
+            return
+
+        if not running:
+            self.clock.unschedule(self.callback)
+        elif self.interval:
+            self.clock.schedule_interval(self.callback, self.interval)
+        else:
+            self.clock.schedule(self.callback)
+
+        self.running = running
+
+
+    def start(self):
+        self.set_running(True)
+
+
+    def stop(self):
+        self.set_running(False)
@@ -0,0 +1,159 @@
+"""
+Run VIctor scripts against an Editor, without a window or display.
+
+A script is a text file of lines, each of which is one of:
+
+    # a comment, which is skipped, as are blank lines
+    :an ex command, run as if typed on the command line
+    normal mode keys, pressed and released one after another
+
+Keys are written as in vim mappings: a character stands for its key, an
+uppercase letter for the key with shift held, and the special keys are
+<Esc>, <Space> and <lt> (for <). <C-x>, <S-x> and <A-x> hold control, shift
+or alt while x is pressed. Whitespace between keys is ignored, so
+
+    b 10l a 5k a
+    :export out.svg
+
+starts a path, draws an L shape and writes it out as SVG.
+
+Keys are sent through the editor's macro recorder to its dispatcher, as
+the window would send them, but no timer runs, so a held key moves the
+cursor once and never accelerates.
+"""
+
+import re
+
+import pyglet
+
+# the keyboard constants import pyglet.window, which otherwise opens a
+# display for its shadow window
+pyglet.options['shadow_window'] = False
+
+import pyglet.window.key as pkey
+
+import victor.mode as vmode
+import victor.normal_dispatcher as vnd
+
+from victor.exceptions import CommandError, ScriptError
+
+__all__ = [
+    'parse_keys',
+    'run_script',
+    'write_output',
+]
+
+
+_key_pattern = re.compile(r'<([^>]+)>|(\S)')
+
+_modifiers = {
+    'A' : pkey.MOD_ALT,
+    'C' : pkey.MOD_CTRL,
+    'S' : pkey.MOD_SHIFT,
+}
+
+_symbols = {
+    '@' : (pkey.AT, 0),
+    '<' : (pkey.LESS, 0),
+    '>' : (pkey.GREATER, 0),
+    '[' : (pkey.BRACKETLEFT, 0),
+    ']' : (pkey.BRACKETRIGHT, 0),
+    '-' : (pkey.MINUS, 0),
+    '=' : (pkey.EQUAL, 0),
+    '+' : (pkey.PLUS, 0),
+    ',' : (pkey.COMMA, 0),
+    '.' : (pkey.PERIOD, 0),
+    '/' : (pkey.SLASH, 0),
+    "'" : (pkey.APOSTROPHE, 0),
+    ';' : (pkey.SEMICOLON, 0),
+    'lt' : (pkey.LESS, 0),
+    'space' : (pkey.SPACE, 0),
+}
+
+
+def _key(name):
+    """
+    The (symbol, modifiers) of a key name: a character or one of the names
+    understood between angle brackets.
+    """
+    if len(name) == 1:
+        if name.isalpha():
+            return getattr(pkey, name.upper()), pkey.MOD_SHIFT if name.isupper() else 0
+
+        if name.isdigit():
+            return getattr(pkey, '_' + name), 0
+
+    key = _symbols.get(name) or _symbols.get(name.lower())
+    if key is None:
+        raise CommandError('unknown key {!r}'.format(name))
+
+    return key
+
+
+def parse_keys(text):
+    """
+    The NormalEvents for the keys written in text, a press and a release
+    for each.
+    """
+    events = [ ]
+
+    for special, character in _key_pattern.findall(text):
+        if special.lower() == 'esc':
+            events.append(vnd.ESCAPE_EVENT)
+            continue
+
+        modifiers = 0
+        name = special or character
+
+        # <C-S-x> holds several modifiers, but <-> is the minus key
+        while len(name) > 2 and name[1] == '-' and name[0].upper() in _modifiers:
+            modifiers |= _modifiers[name[0].upper()]
+            name = name[2:]
+
+        symbol, shift = _key(name)
+        modifiers |= shift
+
+        events.append(vnd.NormalEvent(vnd.ON_KEY_PRESS, symbol, modifiers))
+        events.append(vnd.NormalEvent(vnd.ON_KEY_RELEASE, symbol, modifiers))
+
+    return events
+
+
+def run_script(editor, lines):
+    """
+    Run the script lines, an iterable of strings, against editor. Raises
+    ScriptError, carrying the line number, for the first line that fails.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+
+        if not line or line.startswith('#'):
+            continue
+
+        try:
+            if line.startswith(':'):
+                editor.run_ex_command(line)
+            else:
+                for event in parse_keys(line):
+                    editor.dispatch(event)
+        except CommandError as e:
+            raise ScriptError(number, e)
+
+        # a key may have asked for the command line, which scripts write out
+        editor.mode = vmode.NORMAL
+
+
+def write_output(editor, filename, size=1024):
+    """
+    Write the editor's document to filename as SVG, as a PNG image size
+    pixels along its longer side, or as a VIctor document, according to
+    the file name's extension.
+    """
+    from victor.raster import render_group
+
+    if filename.lower().endswith('.svg'):
+        editor.export_svg(filename)
+    elif filename.lower().endswith('.png'):
+        render_group(editor.groups, filename, size)
+    else:
+        editor.write_document(filename)
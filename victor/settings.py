@@ -1 +1,36 @@
+import os
+
 TEXT_STYLE = dict(font_name='Courier', font_size=11, color=(0, 0, 0, 255))
+
+HANDSOME_PATH = os.environ.get('VICTOR_HANDSOME_PATH', '/Users/bracket/src/handsome')
+
+# 'server' keeps a victor.render_server process running RENDER_SERVER_SPEC
+# with RENDER_PYTHON; 'command' runs RENDER_COMMAND once per render
+RENDER_BACKEND = os.environ.get('VICTOR_RENDER_BACKEND', 'server')
+
+RENDER_PYTHON = os.environ.get(
+    'VICTOR_RENDER_PYTHON',
+    os.path.join(HANDSOME_PATH, 'venv', 'bin', 'python')
+)
+
+RENDER_SERVER_SPEC = os.environ.get(
+    'VICTOR_RENDER_SERVER',
+    'script:' + os.path.join(HANDSOME_PATH, 'examples', '005_scene.py')
+)
+
+# Shell command that renders {scene_path} into {render_path}
+RENDER_COMMAND = os.environ.get(
+    'VICTOR_RENDER_COMMAND',
+    'source {activate} && python {renderer} {{scene_path}} {{render_path}}'.format(
+        activate = os.path.join(HANDSOME_PATH, 'venv', 'bin', 'activate'),
+        renderer = os.path.join(HANDSOME_PATH, 'examples', '005_scene.py'),
+    )
+)
+
+RENDER_CACHE_PATH = os.environ.get(
+    'VICTOR_RENDER_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'victor', 'renders')
+)
+
+RENDER_CACHE_MEMORY_BYTES = 256 << 20
+RENDER_CACHE_DISK_BYTES = 1 << 30
@@ -0,0 +1,352 @@
+import heapq
+import itertools
+
+from collections.abc import MutableMapping
+from math import hypot
+
+from victor.path_group import PathGroup, PathGroupListener
+
+__all__ = [
+    'QuadTree',
+    'SpatialIndex',
+]
+
+
+def _segment_distance(x, y, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+
+    if length:
+        t = min(max(((x - ax) * dx + (y - ay) * dy) / length, 0.), 1.)
+        ax, ay = ax + t * dx, ay + t * dy
+
+    return hypot(x - ax, y - ay)
+
+
+class _Node(object):
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'items', 'children')
+
+    def __init__(self, x0, y0, x1, y1):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.items = { }
+        self.children = None
+
+    def contains(self, x0, y0, x1, y1):
+        return self.x0 <= x0 and self.y0 <= y0 and x1 <= self.x1 and y1 <= self.y1
+
+    def child_containing(self, x0, y0, x1, y1):
+        mx, my = (self.x0 + self.x1) / 2, (self.y0 + self.y1) / 2
+
+        if x1 <= mx: i = 0
+        elif x0 >= mx: i = 1
+        else: return None
+
+        if y1 <= my: pass
+        elif y0 >= my: i += 2
+        else: return None
+
+        return self.children[i]
+
+    def distance(self, x, y):
+        dx = max(self.x0 - x, 0., x - self.x1)
+        dy = max(self.y0 - y, 0., y - self.y1)
+        return hypot(dx, dy)
+
+    def intersects(self, x0, y0, x1, y1):
+        return self.x0 <= x1 and x0 <= self.x1 and self.y0 <= y1 and y0 <= self.y1
+
+
+class QuadTree(object):
+    """
+    A loose region quadtree over segments; a point is a segment of length 0.
+
+    Each item lives in the deepest node that fully contains its bounding box,
+    and leaves split once they hold more than `capacity` items. The root
+    doubles in size whenever an item falls outside of it, so the tree needs no
+    bounds up front. Items are addressed by a hashable key for removal.
+    """
+
+    capacity = 16
+    min_size = 1. / 64
+
+    def __init__(self, extent=512.):
+        self.root = _Node(0., 0., extent, extent)
+        self.nodes = { }
+
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+    def __contains__(self, key):
+        return key in self.nodes
+
+
+    def insert(self, key, a, b=None):
+        if key in self.nodes:
+            self.remove(key)
+
+        ax, ay = float(a[0]), float(a[1])
+        bx, by = (ax, ay) if b is None else (float(b[0]), float(b[1]))
+        item = (ax, ay, bx, by)
+        rect = (min(ax, bx), min(ay, by), max(ax, bx), max(ay, by))
+
+        while not self.root.contains(*rect):
+            self._grow(*rect)
+
+        node = self.root
+        while node.children is not None:
+            child = node.child_containing(*rect)
+            if child is None: break
+            node = child
+
+        node.items[key] = item
+        self.nodes[key] = node
+
+        if node.children is None and len(node.items) > self.capacity:
+            self._split(node)
+
+
+    def remove(self, key):
+        node = self.nodes.pop(key, None)
+        if node is not None:
+            del node.items[key]
+
+
+    def nearest(self, pos, k=1, accept=None):
+        """
+        Return up to k (distance, key) pairs closest to pos, nearest first.
+        If accept is given, only keys for which accept(key) is true count.
+        """
+        x, y = float(pos[0]), float(pos[1])
+        counter = itertools.count()
+        heap = [ (self.root.distance(x, y), next(counter), self.root, None) ]
+        out = [ ]
+
+        while heap and len(out) < k:
+            d, _, node, key = heapq.heappop(heap)
+
+            if node is None:
+                out.append((d, key))
+                continue
+
+            for key, item in node.items.items():
+                if accept is None or accept(key):
+                    heapq.heappush(heap, (_segment_distance(x, y, *item), next(counter), None, key))
+
+            for child in node.children or ():
+                heapq.heappush(heap, (child.distance(x, y), next(counter), child, None))
+
+        return out
+
+
+    def within(self, pos, radius, accept=None):
+        """
+        Return the (distance, key) pairs no further than radius from pos.
+        """
+        x, y = float(pos[0]), float(pos[1])
+        out = [ ]
+        stack = [ self.root ]
+
+        while stack:
+            node = stack.pop()
+            if node.distance(x, y) > radius: continue
+
+            for key, item in node.items.items():
+                if accept is not None and not accept(key): continue
+
+                d = _segment_distance(x, y, *item)
+                if d <= radius: out.append((d, key))
+
+            stack.extend(node.children or ())
+
+        out.sort(key=lambda pair: pair[0])
+        return out
+
+
+    def in_rect(self, x0, y0, x1, y1, accept=None):
+        """
+        Return the keys whose bounding boxes intersect the rectangle.
+        """
+        out = [ ]
+        stack = [ self.root ]
+
+        while stack:
+            node = stack.pop()
+            if not node.intersects(x0, y0, x1, y1): continue
+
+            for key, (ax, ay, bx, by) in node.items.items():
+                if accept is not None and not accept(key): continue
+
+                if (min(ax, bx) <= x1 and x0 <= max(ax, bx)
+                        and min(ay, by) <= y1 and y0 <= max(ay, by)):
+                    out.append(key)
+
+            stack.extend(node.children or ())
+
+        return out
+
+
+    def _split(self, node):
+        if node.x1 - node.x0 <= self.min_size:
+            return
+
+        mx, my = (node.x0 + node.x1) / 2, (node.y0 + node.y1) / 2
+
+        node.children = [
+            _Node(node.x0, node.y0, mx, my),
+            _Node(mx, node.y0, node.x1, my),
+            _Node(node.x0, my, mx, node.y1),
+            _Node(mx, my, node.x1, node.y1),
+        ]
+
+        for key, item in list(node.items.items()):
+            ax, ay, bx, by = item
+            child = node.child_containing(min(ax, bx), min(ay, by), max(ax, bx), max(ay, by))
+
+            if child is not None:
+                del node.items[key]
+                child.items[key] = item
+                self.nodes[key] = child
+
+
+    def _grow(self, x0, y0, x1, y1):
+        old = self.root
+        size = old.x1 - old.x0
+
+        left = x0 < old.x0
+        down = y0 < old.y0
+
+        nx0 = old.x0 - size if left else old.x0
+        ny0 = old.y0 - size if down else old.y0
+
+        root = _Node(nx0, ny0, nx0 + 2 * size, ny0 + 2 * size)
+        mx, my = nx0 + size, ny0 + size
+
+        root.children = [
+            _Node(nx0, ny0, mx, my),
+            _Node(mx, ny0, root.x1, my),
+            _Node(nx0, my, mx, root.y1),
+            _Node(mx, my, root.x1, root.y1),
+        ]
+
+        root.children[int(left) + 2 * int(down)] = old
+        self.root = root
+
+
+class Marks(MutableMapping):
+    """
+    A dict of mark name to position that keeps a SpatialIndex up to date.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.positions = { }
+
+    def __getitem__(self, name):
+        return self.positions[name]
+
+    def __setitem__(self, name, pos):
+        self.positions[name] = pos
+        self.index.tree.insert(('mark', name), pos)
+
+    def __delitem__(self, name):
+        del self.positions[name]
+        self.index.tree.remove(('mark', name))
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class SpatialIndex(PathGroupListener):
+    """
+    Indexes marks, path vertices and path segments in world coordinates.
+
+    Add it to the listeners of a PathGroup and it follows every path added to
+    or extended below that group. Keys are ('mark', name),
+    ('vertex', path, i) and ('segment', path, i), the latter joining vertices
+    i and i + 1. Paths below a group whose transform changed are re-indexed
+    lazily, on the next query, once however often it changed.
+    """
+
+    def __init__(self, extent=512.):
+        self.tree = QuadTree(extent)
+        self.marks = Marks(self)
+        # insertion ordered, so groups are re-indexed in the order they moved
+        self.stale = { }
+
+
+    def child_added(self, group, child):
+        paths = child.walk_paths() if isinstance(child, PathGroup) else [ child ]
+
+        for path in paths:
+            self._index_path(path, 0)
+
+
+    def path_extended(self, path, start):
+        self._index_path(path, start)
+
+
+    def transform_changed(self, group):
+        self.stale[group] = None
+
+
+    def nearest(self, pos, k=1, kinds=None):
+        self._flush()
+        return self.tree.nearest(pos, k, self._accept(kinds))
+
+
+    def within(self, pos, radius, kinds=None):
+        self._flush()
+        return self.tree.within(pos, radius, self._accept(kinds))
+
+
+    def in_rect(self, x0, y0, x1, y1, kinds=None):
+        self._flush()
+        return self.tree.in_rect(x0, y0, x1, y1, self._accept(kinds))
+
+
+    def _accept(self, kinds):
+        if kinds is None: return None
+        if isinstance(kinds, str): kinds = (kinds,)
+
+        return lambda key: key[0] in kinds
+
+
+    def _index_path(self, path, start):
+        points = path.approximate()
+
+        if path.parent is not None:
+            world = path.parent.world
+            points = points.dot(world[:2, :2]) + world[2, :2]
+
+        insert = self.tree.insert
+
+        for i in range(start, len(points)):
+            insert(('vertex', path, i), points[i])
+
+        for i in range(max(start, 1), len(points)):
+            insert(('segment', path, i - 1), points[i - 1], points[i])
+
+
+    def _flush(self):
+        stale, self.stale = self.stale, { }
+        remove = self.tree.remove
+
+        for group in stale:
+            # a stale ancestor re-indexes this subtree already
+            parent = group.parent
+            while parent is not None and parent not in stale:
+                parent = parent.parent
+
+            if parent is not None:
+                continue
+
+            for path in group.walk_paths():
+                for i in range(len(path)):
+                    remove(('vertex', path, i))
+                    remove(('segment', path, i))
+
+                self._index_path(path, 0)
@@ -0,0 +1,443 @@
+"""
+SVG export and import for PathGroup trees.
+
+Groups become <g> elements carrying their transform and paths become
+<polyline> elements. The document is wrapped in a group flipping y, as
+VIctor's y axis points up and SVG's points down.
+
+Both directions stream: iter_svg() is a generator of text chunks that
+write() hands to the file as they are made, and read() builds the tree from
+iterparse events, dropping each element once it has been turned into a
+path, so neither holds the whole document as a string or a DOM.
+
+read() understands <g>, <polyline>, <polygon>, <line> and <path> with all
+of the path data commands (absolute or relative), curves and arcs being
+flattened into line segments, and the stroke color and opacity, including
+those given through style attributes and inherited from groups. Elements
+stroked with none are skipped, as are other elements.
+"""
+
+import math
+import re
+
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+from victor.exceptions import DocumentError
+from victor.path import Path
+from victor.path_group import PathGroup
+from victor.vector import *
+
+__all__ = [
+    'iter_svg',
+    'read',
+    'write',
+]
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+
+# points per chunk of a polyline's points attribute
+CHUNK = 1024
+
+# line segments per curve when flattening path data
+CURVE_SEGMENTS = 16
+
+FLIP = scale(1, -1)
+
+
+def _number(x):
+    text = repr(float(x))
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _matrix(m):
+    # SVG's matrix(a b c d e f) maps x to a x + c y + e, y to b x + d y + f
+    values = (m[0][0], m[0][1], m[1][0], m[1][1], m[2][0], m[2][1])
+    return 'matrix({})'.format(' '.join('{:.9g}'.format(v) for v in values))
+
+
+def _stroke(color):
+    r, g, b, a = (int(c) for c in color)
+    text = 'stroke="#{:02x}{:02x}{:02x}"'.format(r, g, b)
+
+    if a != 255:
+        text += ' stroke-opacity="{:.6g}"'.format(a / 255)
+
+    return text
+
+
+def _iter_group(group, indent):
+    yield '{}<g transform="{}">\n'.format(indent, _matrix(group.transform))
+
+    for child in group.children:
+        if isinstance(child, PathGroup):
+            yield from _iter_group(child, indent + '  ')
+            continue
+
+        yield '{}  <polyline fill="none" {} points="'.format(indent, _stroke(child.color))
+
+        positions = child.approximate()
+        for start in range(0, len(positions), CHUNK):
+            yield ' '.join(
+                _number(x) + ',' + _number(y)
+                for x, y in positions[start:start + CHUNK].tolist()
+            )
+            if start + CHUNK < len(positions): yield ' '
+
+        yield '"/>\n'
+
+    yield '{}</g>\n'.format(indent)
+
+
+def iter_svg(root):
+    """
+    Generate the SVG text for the tree below root, chunk by chunk.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<svg xmlns="{}" version="1.1"'.format(SVG_NAMESPACE)
+
+    x0, y0, x1, y1 = root.world_bounds
+    if x0 <= x1:
+        yield ' viewBox="{} {} {} {}"'.format(*map(_number, (x0, -y1, x1 - x0, y1 - y0)))
+
+    yield '>\n'
+    yield '  <g transform="{}">\n'.format(_matrix(FLIP))
+    yield from _iter_group(root, '    ')
+    yield '  </g>\n'
+    yield '</svg>\n'
+
+
+def write(filename, root):
+    with open(filename, 'w', encoding='utf-8') as fd:
+        fd.writelines(iter_svg(root))
+
+
+_number_pattern = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_transform_pattern = re.compile(r'(\w+)\s*\(([^)]*)\)')
+_path_pattern = re.compile(r'([AaCcHhLlMmQqSsTtVvZz])|([^AaCcHhLlMmQqSsTtVvZz]+)')
+
+
+def _numbers(text):
+    return [ float(x) for x in _number_pattern.findall(text) ]
+
+
+def parse_transform(text):
+    """
+    The row vector matrix of an SVG transform attribute.
+    """
+    m = identity().astype(np.float64)
+
+    # the rightmost transform applies first
+    for name, args in _transform_pattern.findall(text or ''):
+        args = _numbers(args)
+
+        if name == 'matrix' and len(args) == 6:
+            a, b, c, d, e, f = args
+            step = np.array([ [ a, b, 0 ], [ c, d, 0 ], [ e, f, 1 ] ])
+        elif name == 'translate' and args:
+            step = translate(args[0], args[1] if len(args) > 1 else 0.)
+        elif name == 'scale' and args:
+            step = scale(args[0], args[1] if len(args) > 1 else args[0])
+        elif name == 'rotate' and args:
+            angle = math.radians(args[0])
+            c, s = math.cos(angle), math.sin(angle)
+            step = np.array([ [ c, s, 0 ], [ -s, c, 0 ], [ 0, 0, 1 ] ])
+
+            if len(args) == 3:
+                cx, cy = args[1:]
+                step = translate(-cx, -cy).dot(step).dot(translate(cx, cy))
+        else:
+            raise DocumentError('unsupported transform {}({})'.format(name, ', '.join(map(_number, args))))
+
+        m = np.asarray(step, dtype=np.float64).dot(m)
+
+    return m
+
+
+def _float(name, text):
+    try:
+        return float(text)
+    except ValueError:
+        raise DocumentError('malformed {} {!r}'.format(name, text))
+
+
+def _parse_color(text):
+    text = text.strip().lower()
+
+    try:
+        if text.startswith('#') and len(text) == 4:
+            return tuple(int(c * 2, 16) for c in text[1:])
+
+        if text.startswith('#') and len(text) == 7:
+            return tuple(int(text[i:i + 2], 16) for i in (1, 3, 5))
+    except ValueError:
+        raise DocumentError('malformed color {!r}'.format(text))
+
+    if text.startswith('rgb('):
+        return tuple(int(round(min(max(x, 0), 255))) for x in _numbers(text)[:3])
+
+    return { 'black' : (0, 0, 0), 'white' : (255, 255, 255), 'red' : (255, 0, 0),
+             'green' : (0, 128, 0), 'blue' : (0, 0, 255) }.get(text, (0, 0, 0))
+
+
+def _style(element, inherited):
+    """
+    The stroke properties of element: its attributes and style declarations
+    over those of its ancestors.
+    """
+    style = dict(inherited)
+
+    for name in ('stroke', 'stroke-opacity', 'opacity'):
+        if name in element.attrib:
+            style[name] = element.attrib[name]
+
+    for declaration in element.attrib.get('style', '').split(';'):
+        name, _, value = declaration.partition(':')
+        if name.strip() in ('stroke', 'stroke-opacity', 'opacity'):
+            style[name.strip()] = value.strip()
+
+    return style
+
+
+# strokes that draw nothing
+_unstroked = ('none', 'transparent')
+
+
+def _color(style):
+    r, g, b = _parse_color(style.get('stroke', 'black'))
+
+    alpha = _float('stroke-opacity', style.get('stroke-opacity', 1)) * _float('opacity', style.get('opacity', 1))
+    return (r, g, b, int(round(255 * min(max(alpha, 0.), 1.))))
+
+
+def _flatten(start, controls, end):
+    t = np.linspace(0, 1, CURVE_SEGMENTS + 1)[1:, None]
+    points = [ start ] + controls + [ end ]
+
+    # de Casteljau, on every parameter at once
+    points = [ np.asarray(p, dtype=np.float64) for p in points ]
+    while len(points) > 1:
+        points = [ (1 - t) * a + t * b for a, b in zip(points, points[1:]) ]
+
+    return points[0].tolist()
+
+
+def _arc(start, rx, ry, angle, large, sweep, end):
+    """
+    The points of an elliptical arc from start to end, without start, as
+    the SVG implementation notes convert it to its center.
+    """
+    (x1, y1), (x2, y2) = start, end
+    rx, ry = abs(rx), abs(ry)
+
+    if start == end:
+        return [ ]
+
+    if not rx or not ry:
+        return [ end ]
+
+    phi = math.radians(angle)
+    c, s = math.cos(phi), math.sin(phi)
+
+    # the start in a frame centered between the ends and turned by -angle
+    dx, dy = (x1 - x2) / 2., (y1 - y2) / 2.
+    px, py = c * dx + s * dy, -s * dx + c * dy
+
+    # radii too small to reach are scaled up until they just do
+    reach = (px / rx) ** 2 + (py / ry) ** 2
+    if reach > 1:
+        rx, ry = rx * math.sqrt(reach), ry * math.sqrt(reach)
+
+    rx2, ry2 = rx * rx, ry * ry
+    num = rx2 * ry2 - rx2 * py * py - ry2 * px * px
+    coef = math.sqrt(max(num, 0.) / (rx2 * py * py + ry2 * px * px))
+    if bool(large) == bool(sweep):
+        coef = -coef
+
+    cx, cy = coef * rx * py / ry, -coef * ry * px / rx
+
+    theta = math.atan2((py - cy) / ry, (px - cx) / rx)
+    delta = math.atan2((-py - cy) / ry, (-px - cx) / rx) - theta
+
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    t = theta + delta * np.linspace(0, 1, CURVE_SEGMENTS + 1)[1:]
+    ex, ey = rx * np.cos(t) + cx, ry * np.sin(t) + cy
+
+    xs = c * ex - s * ey + (x1 + x2) / 2.
+    ys = s * ex + c * ey + (y1 + y2) / 2.
+
+    points = list(zip(xs.tolist(), ys.tolist()))
+    points[-1] = end
+
+    return points
+
+
+def parse_path_data(text):
+    """
+    The subpaths of SVG path data, as lists of points.
+    """
+    subpaths = [ ]
+    points = None
+    x = y = 0.
+    command = None
+
+    # the last command drawn, its final control point, and whether the
+    # subpath has been closed
+    previous = control = None
+    closed = False
+
+    for letter, args in _path_pattern.findall(text):
+        if letter:
+            command = letter
+
+            if command in 'Zz' and points and not closed:
+                points.append(points[0])
+                x, y = points[0]
+                previous, closed = 'Z', True
+            continue
+
+        args = _numbers(args)
+        if not args:
+            continue
+
+        if command is None:
+            raise DocumentError('path data must start with a command')
+        relative = command.islower()
+        kind = command.upper()
+
+        size = { 'M' : 2, 'L' : 2, 'H' : 1, 'V' : 1, 'C' : 6, 'S' : 4, 'Q' : 4, 'T' : 2, 'A' : 7 }.get(kind)
+        if size is None or len(args) % size:
+            raise DocumentError('unsupported path data {!r}'.format(command))
+
+        for i in range(0, len(args), size):
+            values = args[i:i + size]
+
+            if points is None and kind != 'M':
+                raise DocumentError('path data must start with a move')
+
+            if closed and kind != 'M':
+                # drawing on after a close starts a new subpath where it closed
+                points = [ (x, y) ]
+                subpaths.append(points)
+
+            closed = False
+
+            if kind == 'H':
+                x = values[0] + (x if relative else 0.)
+            elif kind == 'V':
+                y = values[0] + (y if relative else 0.)
+            elif kind == 'A':
+                end = (values[5] + (x if relative else 0.), values[6] + (y if relative else 0.))
+                points.extend(_arc((x, y), *(values[:5] + [ end ]))[:-1])
+                x, y = end
+            else:
+                pairs = [ (values[j] + (x if relative else 0.), values[j + 1] + (y if relative else 0.))
+                          for j in range(0, size, 2) ]
+
+                # smooth curves reflect the previous curve's last control
+                # point, or start from the current point
+                if kind in 'ST':
+                    follows = ('C', 'S') if kind == 'S' else ('Q', 'T')
+                    pairs.insert(0, (2 * x - control[0], 2 * y - control[1]) if previous in follows else (x, y))
+
+                if kind == 'M' and i == 0:
+                    points = [ ]
+                    subpaths.append(points)
+                elif kind in 'CSQT':
+                    points.extend(_flatten((x, y), pairs[:-1], pairs[-1])[:-1])
+                    control = pairs[-2]
+
+                x, y = pairs[-1]
+
+            points.append((x, y))
+            previous = kind
+
+        # further coordinate pairs after a move are lines
+        if kind == 'M':
+            command = 'l' if relative else 'L'
+
+    return [ points for points in subpaths if len(points) ]
+
+
+def _shapes(tag, attrib):
+    """
+    The point lists drawn by a shape element, or None for other elements.
+    """
+    if tag in ('polyline', 'polygon'):
+        numbers = _numbers(attrib.get('points', ''))
+        points = list(zip(numbers[0::2], numbers[1::2]))
+
+        if tag == 'polygon' and points:
+            points.append(points[0])
+
+        return [ points ] if points else [ ]
+
+    if tag == 'line':
+        get = lambda name: _float(name, attrib.get(name, 0))
+        return [ [ (get('x1'), get('y1')), (get('x2'), get('y2')) ] ]
+
+    if tag == 'path':
+        return parse_path_data(attrib.get('d', ''))
+
+    return None
+
+
+def read(source):
+    """
+    Parse the SVG file or file object source into a new PathGroup, which
+    flips y back into VIctor's coordinates.
+    """
+    root = group = PathGroup()
+    root.transform = FLIP
+
+    # one entry per open element: (element, group, style)
+    stack = [ ]
+    style = { }
+
+    try:
+        for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+            tag = element.tag.rsplit('}', 1)[-1]
+
+            if event == 'start':
+                style = _style(element, style)
+
+                if tag == 'g':
+                    group = group.append_group()
+                    group.transform = parse_transform(element.attrib.get('transform'))
+
+                stack.append((element, group, style))
+                continue
+
+            stack.pop()
+
+            shapes = _shapes(tag, element.attrib)
+            if shapes and style.get('stroke', '').strip().lower() not in _unstroked:
+                target = group
+                transform = element.attrib.get('transform')
+
+                if transform:
+                    target = group.append_group()
+                    target.transform = parse_transform(transform)
+
+                for points in shapes:
+                    path = Path(points[0], _color(style))
+                    for p in points[1:]:
+                        path.append(p)
+
+                    target.append_path(path)
+
+            if stack:
+                parent, group, style = stack[-1]
+
+                # every earlier sibling is already gone, so this drops element
+                del parent[:]
+
+    except ElementTree.ParseError as e:
+        raise DocumentError(str(e))
+
+    return root
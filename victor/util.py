@@ -0,0 +1,35 @@
+import functools
+
+__all__ = [
+    'method_cache',
+]
+
+
+def method_cache():
+    """
+    Decorator factory memoizing a method per instance and arguments.
+
+        class Window(object):
+            memoize = method_cache()
+
+            @property
+            @memoize
+            def program(self):
+                ...
+    """
+    def decorator(method):
+        name = '_cache_' + method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            cache = self.__dict__.setdefault(name, { })
+
+            try:
+                return cache[args]
+            except KeyError:
+                value = cache[args] = method(self, *args)
+                return value
+
+        return wrapper
+
+    return decorator
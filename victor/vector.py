@@ -8,6 +8,8 @@ __all__ = [
     'matrix3f', 'matrix3i',
     'matrix4f', 'matrix4i',
     'identity', 'translate', 'scale',
+    'affine4f',
+    'empty_bounds', 'transform_bounds', 'intersects',
 ];
 
 def vec2i(x = 0, y = 0):
@@ -54,3 +56,32 @@ def translate(x, y):
 
 def scale(x, y):
     return matrix3f([ x, 0, 0 ], [ 0, y, 0 ], [ 0, 0, 1 ]);
+
+def affine4f(m):
+    return matrix4f(
+        [ m[0][0], m[0][1], 0, 0 ],
+        [ m[1][0], m[1][1], 0, 0 ],
+        [ 0,       0,       1, 0 ],
+        [ m[2][0], m[2][1], 0, 1 ],
+    );
+
+def empty_bounds():
+    """
+    An (x0, y0, x1, y1) box containing nothing; any union with it is the
+    other box.
+    """
+    return np.array([ np.inf, np.inf, -np.inf, -np.inf ]);
+
+def transform_bounds(box, m):
+    """
+    The axis aligned box around box's corners under the row vector affine
+    matrix m.
+    """
+    x0, y0, x1, y1 = box;
+    if x0 > x1: return empty_bounds();
+
+    corners = np.array([ [ x0, y0, 1 ], [ x1, y0, 1 ], [ x0, y1, 1 ], [ x1, y1, 1 ] ]).dot(m);
+    return np.concatenate([ corners[:, :2].min(axis = 0), corners[:, :2].max(axis = 0) ]);
+
+def intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3];
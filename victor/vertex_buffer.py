@@ -0,0 +1,140 @@
+import ctypes
+
+import numpy as np
+import pyglet.gl as gl
+import pyglet.graphics.vertexbuffer as vertexbuffer
+
+__all__ = [ 'VertexBuffer' ]
+
+
+class VertexBuffer(object):
+    """
+    Growable 2d position / RGBA color arrays stored in GPU buffers.
+
+    Capacity doubles whenever it is exhausted, so appending n vertices costs
+    amortized O(1) per vertex, and only the rows that are written get uploaded.
+    GPU buffers are created lazily on the first write, so a VertexBuffer can
+    be constructed before a GL context exists.
+    """
+
+    position_dtype = np.dtype(np.float32)
+    color_dtype = np.dtype(np.uint8)
+
+    position_size = 2
+    color_size = 4
+
+    position_stride = position_size * position_dtype.itemsize
+    color_stride = color_size * color_dtype.itemsize
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.capacity = 0
+        self.initial_capacity = capacity
+
+        self.position_buffer = None
+        self.color_buffer = None
+
+
+    def reserve(self, count):
+        if count <= self.capacity:
+            return
+
+        capacity = max(count, 2 * self.capacity, self.initial_capacity)
+
+        if self.position_buffer is None:
+            self.position_buffer = vertexbuffer.create_buffer(capacity * self.position_stride)
+            self.color_buffer = vertexbuffer.create_buffer(capacity * self.color_stride)
+        else:
+            self.position_buffer.resize(capacity * self.position_stride)
+            self.color_buffer.resize(capacity * self.color_stride)
+
+        self.capacity = capacity
+
+
+    def set_region(self, start, positions, colors):
+        positions = np.ascontiguousarray(positions, self.position_dtype).reshape(-1, self.position_size)
+        colors = np.ascontiguousarray(colors, self.color_dtype).reshape(-1, self.color_size)
+
+        stop = start + len(positions)
+        self.reserve(stop)
+
+        self.position_buffer.set_data_region(
+            positions.ctypes.data_as(ctypes.c_void_p),
+            start * self.position_stride,
+            len(positions) * self.position_stride
+        )
+
+        self.color_buffer.set_data_region(
+            colors.ctypes.data_as(ctypes.c_void_p),
+            start * self.color_stride,
+            len(colors) * self.color_stride
+        )
+
+        self.count = max(self.count, stop)
+
+
+    def extend(self, positions, colors):
+        self.set_region(self.count, positions, colors)
+
+
+    def clear(self):
+        """
+        Forget the contents but keep the buffers for reuse.
+        """
+        self.count = 0
+
+
+    def bind(self):
+        gl.glPushClientAttrib(gl.GL_CLIENT_VERTEX_ARRAY_BIT)
+
+        self.position_buffer.bind()
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glVertexPointer(self.position_size, gl.GL_FLOAT, 0, self.position_buffer.ptr)
+
+        self.color_buffer.bind()
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+        gl.glColorPointer(self.color_size, gl.GL_UNSIGNED_BYTE, 0, self.color_buffer.ptr)
+
+
+    def unbind(self):
+        self.color_buffer.unbind()
+        gl.glPopClientAttrib()
+
+
+    def draw(self, mode, first=0, count=None):
+        if count is None:
+            count = self.count - first
+
+        if count <= 0:
+            return
+
+        self.bind()
+        gl.glDrawArrays(mode, first, count)
+        self.unbind()
+
+
+    def multi_draw(self, mode, firsts, counts):
+        """
+        Draw several ranges of the buffer with a single glMultiDrawArrays call.
+        firsts and counts must be contiguous int32 arrays.
+        """
+        if not len(counts):
+            return
+
+        self.bind()
+        gl.glMultiDrawArrays(
+            mode,
+            firsts.ctypes.data_as(ctypes.POINTER(gl.GLint)),
+            counts.ctypes.data_as(ctypes.POINTER(gl.GLsizei)),
+            len(counts)
+        )
+        self.unbind()
+
+
+    def delete(self):
+        if self.position_buffer is not None:
+            self.position_buffer.delete()
+            self.color_buffer.delete()
+
+        self.position_buffer = self.color_buffer = None
+        self.count = self.capacity = 0
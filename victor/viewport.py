@@ -0,0 +1,85 @@
+import numpy as np
+
+from victor.lod import level_for_zoom
+from victor.vector import scale, translate
+
+__all__ = [ 'Viewport' ]
+
+
+class Viewport(object):
+    """
+    Maps world coordinates to window pixels: the world point center appears
+    in the middle of a width x height window, magnified zoom times. The
+    default view maps world coordinates to pixels one to one.
+    """
+
+    min_zoom = 2. ** -16
+    max_zoom = 2. ** 8
+
+    def __init__(self, width, height, center=None, zoom=1.):
+        self.width = width
+        self.height = height
+
+        if center is None:
+            center = (width / 2., height / 2.)
+
+        self.center = np.array(center, dtype=np.float64)
+        self.zoom = zoom
+
+
+    def resize(self, width, height):
+        self.width, self.height = width, height
+
+
+    def pan(self, dx, dy):
+        """
+        Move the view by (dx, dy) window pixels.
+        """
+        self.center += np.array([ dx, dy ]) / self.zoom
+
+
+    def zoom_by(self, factor, about=None):
+        """
+        Multiply the zoom by factor, keeping the world point about, by
+        default the center, where it is in the window.
+        """
+        zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        about = self.center if about is None else np.asarray(about, dtype=np.float64)
+
+        self.center = about + (self.center - about) * (self.zoom / zoom)
+        self.zoom = zoom
+
+
+    @property
+    def level(self):
+        return level_for_zoom(self.zoom)
+
+
+    @property
+    def matrix(self):
+        """
+        The world to window transform as a row vector affine matrix.
+        """
+        return (
+            translate(-self.center[0], -self.center[1])
+            .dot(scale(self.zoom, self.zoom))
+            .dot(translate(self.width / 2., self.height / 2.))
+        )
+
+
+    def to_window(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        return (points - self.center) * self.zoom + (self.width / 2., self.height / 2.)
+
+
+    def to_world(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        return (points - (self.width / 2., self.height / 2.)) / self.zoom + self.center
+
+
+    def visible_rect(self):
+        """
+        (x0, y0, x1, y1), the world rectangle the window shows.
+        """
+        (x0, y0), (x1, y1) = self.to_world([ (0., 0.), (self.width, self.height) ])
+        return x0, y0, x1, y1